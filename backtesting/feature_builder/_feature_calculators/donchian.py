@@ -1,5 +1,5 @@
 import numpy as np
-from numba import njit
+from numba import njit, prange
 
 
 @njit
@@ -70,6 +70,112 @@ def donchian(n, seconds, prices, times):
     return ha_pct_arr, la_pct_arr, dir_arr, h_arr, l_arr,
 
 
+def donchian_multi(n, windows_seconds, prices, times, parallel=False):
+    """
+    多個窗口的 donchian，回傳與 donchian 相同順序的 5 個 (k, n) 陣列，
+    第 j 列與 donchian(n, windows_seconds[j], prices, times) 相同。
+    parallel=False：一次掃描，每個窗口各自的 deque / 左指標 / ha、la 狀態
+    parallel=True ：各窗口以 prange 分到不同 thread 各掃一次
+    """
+    windows_seconds = np.asarray(windows_seconds, dtype=np.float64)
+    if parallel:
+        return _donchian_multi_parallel(n, windows_seconds, prices, times)
+    return _donchian_multi(n, windows_seconds, prices, times)
+
+
+@njit
+def _donchian_multi(n, windows_seconds, prices, times):
+    k = len(windows_seconds)
+    h_arr = np.zeros((k, n), dtype=np.float64)
+    l_arr = np.zeros((k, n), dtype=np.float64)
+    dir_arr = np.zeros((k, n), dtype=np.float64)
+    ha_pct_arr = np.zeros((k, n), dtype=np.float64)
+    la_pct_arr = np.zeros((k, n), dtype=np.float64)
+
+    h_q = np.empty((k, n), dtype=np.int64)
+    l_q = np.empty((k, n), dtype=np.int64)
+    h_heads = np.zeros(k, dtype=np.int64)
+    h_tails = np.zeros(k, dtype=np.int64)
+    l_heads = np.zeros(k, dtype=np.int64)
+    l_tails = np.zeros(k, dtype=np.int64)
+
+    has = np.zeros(k, dtype=np.int64)
+    las = np.zeros(k, dtype=np.int64)
+    directions = np.zeros(k, dtype=np.int64)
+    left_ptrs = np.zeros(k, dtype=np.int64)
+
+    for i in range(n):
+        ts = times[i]
+        price = prices[i]
+
+        for j in range(k):
+            window_left = ts - windows_seconds[j]
+            h_head, h_tail = h_heads[j], h_tails[j]
+            l_head, l_tail = l_heads[j], l_tails[j]
+            left_ptr = left_ptrs[j]
+            ha, la, direction = has[j], las[j], directions[j]
+
+            while h_head < h_tail and times[h_q[j, h_head]] < window_left: h_head += 1
+            while l_head < l_tail and times[l_q[j, l_head]] < window_left: l_head += 1
+            while left_ptr < i and times[left_ptr] < window_left: left_ptr += 1
+
+            h = prices[h_q[j, h_head]] if h_head < h_tail else price
+            l = prices[l_q[j, l_head]] if l_head < l_tail else price
+
+            if price > h:
+                if la == 0:
+                    ha += 1
+                else:
+                    ha, la = 1, 0
+                direction = 1
+            elif price < l:
+                if ha == 0:
+                    la += 1
+                else:
+                    la, ha = 1, 0
+                direction = -1
+
+            while h_head < h_tail and prices[h_q[j, h_tail - 1]] <= price: h_tail -= 1
+            h_q[j, h_tail] = i
+            h_tail += 1
+            while l_head < l_tail and prices[l_q[j, l_tail - 1]] >= price: l_tail -= 1
+            l_q[j, l_tail] = i
+            l_tail += 1
+
+            h_arr[j, i] = h
+            l_arr[j, i] = l
+            dir_arr[j, i] = direction
+
+            window_tick_count = float(i - left_ptr + 1)
+            ha_pct_arr[j, i] = ha / window_tick_count
+            la_pct_arr[j, i] = la / window_tick_count
+
+            h_heads[j], h_tails[j] = h_head, h_tail
+            l_heads[j], l_tails[j] = l_head, l_tail
+            left_ptrs[j] = left_ptr
+            has[j], las[j], directions[j] = ha, la, direction
+
+    return ha_pct_arr, la_pct_arr, dir_arr, h_arr, l_arr
+
+
+@njit(parallel=True)
+def _donchian_multi_parallel(n, windows_seconds, prices, times):
+    k = len(windows_seconds)
+    h_arr = np.zeros((k, n), dtype=np.float64)
+    l_arr = np.zeros((k, n), dtype=np.float64)
+    dir_arr = np.zeros((k, n), dtype=np.float64)
+    ha_pct_arr = np.zeros((k, n), dtype=np.float64)
+    la_pct_arr = np.zeros((k, n), dtype=np.float64)
+    for j in prange(k):
+        ha_pct, la_pct, direction, h, l = donchian(n, windows_seconds[j], prices, times)
+        ha_pct_arr[j] = ha_pct
+        la_pct_arr[j] = la_pct
+        dir_arr[j] = direction
+        h_arr[j] = h
+        l_arr[j] = l
+    return ha_pct_arr, la_pct_arr, dir_arr, h_arr, l_arr
+
+
 # @njit
 # def donchian(n, seconds, prices, times):
 #     """
@@ -1,25 +1,95 @@
 import numpy as np
+from numba import njit, prange
 
 
-def momentum(n,window_seconds,times,closes):
+@njit
+def momentum(n, window_seconds, times, closes):
     """
-           計算價格動量（相對變化率）。
+    計算價格動量（相對變化率）。
 
-           momentum = (current_price - price_N_minutes_ago) / price_N_minutes_ago
-           """
+    momentum = (current_price - price_N_minutes_ago) / price_N_minutes_ago
+    price_N_minutes_ago 為窗口 (times[i] - window_seconds, times[i]] 內的第一筆
 
-    result = np.full(n, 0.0, dtype=np.float64)
+    雙指標取代逐筆 np.searchsorted，時間複雜度 O(n)
+    """
+    result = np.zeros(n, dtype=np.float64)
 
+    left = 0
     for i in range(n):
-        hi = times[i]
-        lo = hi - window_seconds
-        left = int(np.searchsorted(times, lo, side='right'))
+        lo = times[i] - window_seconds
+        while left <= i and times[left] <= lo:
+            left += 1
 
         if left < i:
             past_price = closes[left]
             if past_price > 0:
                 result[i] = (closes[i] - past_price) / past_price
-            else:
-                result[i] = 0.0
 
-    return result
\ No newline at end of file
+    return result
+
+
+def momentum_multi(n, windows_seconds, times, closes, parallel=False):
+    """
+    多個窗口一次掃描，每個窗口各自的左指標。
+    result[j] 與 momentum(n, windows_seconds[j], times, closes) 相同
+    parallel=True 時各窗口以 prange 分到不同 thread 各掃一次
+    """
+    windows_seconds = np.asarray(windows_seconds, dtype=np.float64)
+    if parallel:
+        return _momentum_multi_parallel(n, windows_seconds, times, closes)
+    return _momentum_multi(n, windows_seconds, times, closes)
+
+
+@njit
+def _momentum_multi(n, windows_seconds, times, closes):
+    k = len(windows_seconds)
+    result = np.zeros((k, n), dtype=np.float64)
+    lefts = np.zeros(k, dtype=np.int64)
+
+    for i in range(n):
+        for j in range(k):
+            lo = times[i] - windows_seconds[j]
+            left = lefts[j]
+            while left <= i and times[left] <= lo:
+                left += 1
+            lefts[j] = left
+
+            if left < i:
+                past_price = closes[left]
+                if past_price > 0:
+                    result[j, i] = (closes[i] - past_price) / past_price
+
+    return result
+
+
+@njit(parallel=True)
+def _momentum_multi_parallel(n, windows_seconds, times, closes):
+    k = len(windows_seconds)
+    result = np.zeros((k, n), dtype=np.float64)
+    for j in prange(k):
+        result[j] = momentum(n, windows_seconds[j], times, closes)
+    return result
+
+
+# def momentum(n,window_seconds,times,closes):
+#     """
+#            計算價格動量（相對變化率）。
+#
+#            momentum = (current_price - price_N_minutes_ago) / price_N_minutes_ago
+#            """
+#
+#     result = np.full(n, 0.0, dtype=np.float64)
+#
+#     for i in range(n):
+#         hi = times[i]
+#         lo = hi - window_seconds
+#         left = int(np.searchsorted(times, lo, side='right'))
+#
+#         if left < i:
+#             past_price = closes[left]
+#             if past_price > 0:
+#                 result[i] = (closes[i] - past_price) / past_price
+#             else:
+#                 result[i] = 0.0
+#
+#     return result
@@ -1,5 +1,5 @@
 import numpy as np
-from numba import njit
+from numba import njit, prange
 
 
 @njit
@@ -44,6 +44,62 @@ def net_buy_ratio(times, tick_types, volumes, window_seconds):
     return result
 
 
+def net_buy_ratio_multi(times, tick_types, volumes, windows_seconds, parallel=False):
+    """
+    多個窗口的淨買比率，result[j] 與 net_buy_ratio(..., windows_seconds[j]) 相同。
+    parallel=False：一次掃描，每個窗口各自的左指標與累加值
+    parallel=True ：各窗口以 prange 分到不同 thread 各掃一次
+    """
+    windows_seconds = np.asarray(windows_seconds, dtype=np.float64)
+    if parallel:
+        return _net_buy_ratio_multi_parallel(times, tick_types, volumes, windows_seconds)
+    return _net_buy_ratio_multi(times, tick_types, volumes, windows_seconds)
+
+
+@njit
+def _net_buy_ratio_multi(times, tick_types, volumes, windows_seconds):
+    n = len(times)
+    k = len(windows_seconds)
+    result = np.zeros((k, n), dtype=np.float64)
+
+    buy_vols = np.zeros(k, dtype=np.int64)
+    sell_vols = np.zeros(k, dtype=np.int64)
+    lefts = np.zeros(k, dtype=np.int64)
+
+    for right in range(n):
+        buy = volumes[right] if tick_types[right] == 1 else 0
+        sell = volumes[right] if tick_types[right] == 2 else 0
+
+        for j in range(k):
+            buy_vols[j] += buy
+            sell_vols[j] += sell
+
+            limit_time = times[right] - windows_seconds[j]
+            left = lefts[j]
+            while left < right and times[left] <= limit_time:
+                if tick_types[left] == 1:
+                    buy_vols[j] -= volumes[left]
+                elif tick_types[left] == 2:
+                    sell_vols[j] -= volumes[left]
+                left += 1
+            lefts[j] = left
+
+            total_vol = buy_vols[j] + sell_vols[j]
+            if total_vol > 0:
+                result[j, right] = (buy_vols[j] - sell_vols[j]) / total_vol
+
+    return result
+
+
+@njit(parallel=True)
+def _net_buy_ratio_multi_parallel(times, tick_types, volumes, windows_seconds):
+    k = len(windows_seconds)
+    result = np.zeros((k, len(times)), dtype=np.float64)
+    for j in prange(k):
+        result[j] = net_buy_ratio(times, tick_types, volumes, windows_seconds[j])
+    return result
+
+
 # def net_buy_ratio(n, window_seconds, times, tick_types, volumes):
 #     """
 #         計算滾動窗口內的淨買比率。
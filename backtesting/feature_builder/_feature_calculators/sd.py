@@ -1,28 +1,110 @@
 import numpy as np
+from numba import njit, prange
 
 
-def sd(n, window_seconds, times, closes):
-    """45分鐘滾動標準差"""
-
-    result = np.full(n, 0.0, dtype=np.float64)
-
+def _prefix_sums(closes):
+    # 前綴和維持在 numpy 算 (與原本的實作、streaming 版本同一個加總順序)
+    n = len(closes)
     cum_c = np.zeros(n + 1, dtype=np.float64)
     cum_c2 = np.zeros(n + 1, dtype=np.float64)
     np.cumsum(closes, out=cum_c[1:])
     np.cumsum(closes ** 2, out=cum_c2[1:])
+    return cum_c, cum_c2
+
+
+def sd(n, window_seconds, times, closes):
+    """45分鐘滾動標準差 (前綴和 + 雙指標，O(n))"""
+    cum_c, cum_c2 = _prefix_sums(closes)
+    return _sd(n, window_seconds, times, cum_c, cum_c2)
+
+
+def sd_multi(n, windows_seconds, times, closes, parallel=False):
+    """
+    多個窗口一次掃描 (前綴和共用)，result[j] 與 sd(n, windows_seconds[j], times, closes) 相同
+    parallel=True 時各窗口以 prange 分到不同 thread 各掃一次
+    """
+    cum_c, cum_c2 = _prefix_sums(closes)
+    windows_seconds = np.asarray(windows_seconds, dtype=np.float64)
+    if parallel:
+        return _sd_multi_parallel(n, windows_seconds, times, cum_c, cum_c2)
+    return _sd_multi(n, windows_seconds, times, cum_c, cum_c2)
+
+
+@njit
+def _window_sd(cum_c, cum_c2, left, right):
+    cnt = right - left
+    if cnt <= 1:
+        return 0.0
+
+    mean = (cum_c[right] - cum_c[left]) / cnt
+    mean2 = (cum_c2[right] - cum_c2[left]) / cnt
+    var = mean2 - mean * mean
+    return np.sqrt(var) if var > 0 else 0.0
+
 
+@njit
+def _sd(n, window_seconds, times, cum_c, cum_c2):
+    result = np.zeros(n, dtype=np.float64)
+
+    left = 0
     for i in range(n):
         lo = times[i] - window_seconds
-        left = int(np.searchsorted(times, lo, side='right'))
-        right = i + 1
-        n = right - left
-        if n <= 1:
-            result[i] = 0.0
-            continue
-
-        mean = (cum_c[right] - cum_c[left]) / n
-        mean2 = (cum_c2[right] - cum_c2[left]) / n
-        var = mean2 - mean * mean
-        result[i] = np.sqrt(var) if var > 0 else 0.0
+        while left <= i and times[left] <= lo:
+            left += 1
+        result[i] = _window_sd(cum_c, cum_c2, left, i + 1)
+
+    return result
+
+
+@njit
+def _sd_multi(n, windows_seconds, times, cum_c, cum_c2):
+    k = len(windows_seconds)
+    result = np.zeros((k, n), dtype=np.float64)
+    lefts = np.zeros(k, dtype=np.int64)
+
+    for i in range(n):
+        for j in range(k):
+            lo = times[i] - windows_seconds[j]
+            left = lefts[j]
+            while left <= i and times[left] <= lo:
+                left += 1
+            lefts[j] = left
+            result[j, i] = _window_sd(cum_c, cum_c2, left, i + 1)
+
+    return result
 
+
+@njit(parallel=True)
+def _sd_multi_parallel(n, windows_seconds, times, cum_c, cum_c2):
+    k = len(windows_seconds)
+    result = np.zeros((k, n), dtype=np.float64)
+    for j in prange(k):
+        result[j] = _sd(n, windows_seconds[j], times, cum_c, cum_c2)
     return result
+
+
+# def sd(n, window_seconds, times, closes):
+#     """45分鐘滾動標準差"""
+#
+#     result = np.full(n, 0.0, dtype=np.float64)
+#
+#     cum_c = np.zeros(n + 1, dtype=np.float64)
+#     cum_c2 = np.zeros(n + 1, dtype=np.float64)
+#     np.cumsum(closes, out=cum_c[1:])
+#     np.cumsum(closes ** 2, out=cum_c2[1:])
+#
+#     for i in range(n):
+#         lo = times[i] - window_seconds
+#         left = int(np.searchsorted(times, lo, side='right'))
+#         right = i + 1
+#         n = right - left
+#         if n <= 1:
+#             result[i] = 0.0
+#             continue
+#
+#         mean = (cum_c[right] - cum_c[left]) / n
+#         mean2 = (cum_c2[right] - cum_c2[left]) / n
+#         var = mean2 - mean * mean
+#         result[i] = np.sqrt(var) if var > 0 else 0.0
+#
+#     return result
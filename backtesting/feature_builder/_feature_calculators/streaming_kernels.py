@@ -0,0 +1,335 @@
+"""
+Streaming kernels — _feature_calculators 的逐筆 (增量) 版本
+
+每個 kernel 保存批次版本迴圈中的狀態 (視窗指標、累加值、單調 deque)，
+update(i) 只處理第 i 筆，運算順序與批次版本完全相同，因此結果 bit-identical。
+
+資料列存放在共用的 RowHistory (絕對 index)，
+kernel 的 min_index() 回報仍需要的最舊資料列，RowHistory 依此回收。
+"""
+import math
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from backtesting.feature_builder.feature_name import FeatureName
+
+
+class RowHistory:
+    """
+    append-only 的欄位 list，index 為絕對 index (第一筆為 0)。
+    trim(keep_from) 之後 keep_from 之前的資料不可再存取。
+    """
+    COLUMNS = ('times', 'closes', 'volumes', 'tick_types', 'imb')
+
+    def __init__(self):
+        self.base = 0
+        self.n = 0
+        for c in self.COLUMNS:
+            setattr(self, c, [])
+
+        # 批次版本中 np.cumsum 的 exclusive prefix (第 k 筆之前的合計)
+        self.pre_c = []
+        self.pre_c2 = []
+        self.pre_vol = []
+        self._c = 0.0
+        self._c2 = 0.0
+        self._vol = 0
+
+    def append(self, ts, close, volume, tick_type):
+        self.times.append(ts)
+        self.closes.append(close)
+        self.volumes.append(volume)
+        self.tick_types.append(tick_type)
+        self.imb.append(0.0)
+
+        self.pre_c.append(self._c)
+        self.pre_c2.append(self._c2)
+        self.pre_vol.append(self._vol)
+        self._c += close
+        self._c2 += close * close
+        self._vol += volume
+        self.n += 1
+
+    def trim(self, keep_from: int):
+        drop = keep_from - self.base
+        # 至少累積一半才搬移，amortized O(1)
+        if drop <= 0 or drop * 2 < self.n - self.base:
+            return
+        for c in (*self.COLUMNS, 'pre_c', 'pre_c2', 'pre_vol'):
+            del getattr(self, c)[:drop]
+        self.base = keep_from
+
+
+class NetBuyRatioKernel:
+    """net_buy_ratio.net_buy_ratio"""
+
+    def __init__(self, h: RowHistory, window_seconds):
+        self.h = h
+        self.window_seconds = window_seconds
+        self.buy = 0
+        self.sell = 0
+        self.left = 0
+
+    def min_index(self):
+        return self.left
+
+    def update(self, right):
+        h = self.h
+        b = h.base
+        times, types, vols = h.times, h.tick_types, h.volumes
+
+        if types[right - b] == 1:
+            self.buy += vols[right - b]
+        elif types[right - b] == 2:
+            self.sell += vols[right - b]
+
+        limit_time = times[right - b] - self.window_seconds
+        left = self.left
+        while left < right and times[left - b] <= limit_time:
+            if types[left - b] == 1:
+                self.buy -= vols[left - b]
+            elif types[left - b] == 2:
+                self.sell -= vols[left - b]
+            left += 1
+        self.left = left
+
+        total = self.buy + self.sell
+        return (self.buy - self.sell) / total if total > 0 else 0.0
+
+
+class WindowLeft:
+    """
+    np.searchsorted(times, times[i] - window_seconds, side='right') 的指標版本
+    (times 非遞減，左界只會往右)
+    """
+
+    def __init__(self, h: RowHistory, window_seconds):
+        self.h = h
+        self.window_seconds = window_seconds
+        self.left = 0
+
+    def min_index(self):
+        return self.left
+
+    def update(self, i):
+        h = self.h
+        b = h.base
+        times = h.times
+        lo = times[i - b] - self.window_seconds
+        left = self.left
+        while left <= i and times[left - b] <= lo:
+            left += 1
+        self.left = left
+        return left
+
+
+class SdKernel(WindowLeft):
+    """sd.sd"""
+
+    def update(self, i):
+        left = super().update(i)
+        h = self.h
+        b = h.base
+        n = i + 1 - left
+        if n <= 1:
+            return 0.0
+
+        mean = (h._c - h.pre_c[left - b]) / n
+        mean2 = (h._c2 - h.pre_c2[left - b]) / n
+        var = mean2 - mean * mean
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class MomentumKernel(WindowLeft):
+    """momentum.momentum"""
+
+    def update(self, i):
+        left = super().update(i)
+        if left >= i:
+            return 0.0
+        h = self.h
+        past_price = h.closes[left - h.base]
+        if past_price > 0:
+            return (h.closes[i - h.base] - past_price) / past_price
+        return 0.0
+
+
+class VolumeRatioKernel(WindowLeft):
+    """volume_ratio.volume_ratio"""
+
+    def __init__(self, h: RowHistory, window_seconds, iiva_lookups):
+        super().__init__(h, window_seconds)
+        self.iiva_lookups = iiva_lookups
+
+    def update(self, i):
+        left = super().update(i)
+        h = self.h
+        rolling_vol_sum = float(h._vol - h.pre_vol[left - h.base])
+
+        ts = datetime.fromtimestamp(h.times[i - h.base])
+        iiva = float(self.iiva_lookups[ts.date()].get(ts))
+        return rolling_vol_sum / iiva if iiva > 0 else 1.0
+
+
+class BidAskKernel:
+    """bid_ask_imbalance.bid_ask_features"""
+
+    def __init__(self, h: RowHistory, window_seconds):
+        self.h = h
+        self.window_seconds = window_seconds
+        self.rows = deque()  # 視窗內各筆的 (bid_v, ask_v, mid, spread)
+        self.sum_bid_v = 0.0
+        self.sum_ask_v = 0.0
+        self.sum_mid = 0.0
+        self.sum_spread = 0.0
+        self.start = 0
+
+    def min_index(self):
+        return self.start
+
+    def update(self, i, bid_v, ask_v, bid_p, ask_p):
+        bid_v = float(bid_v)
+        ask_v = float(ask_v)
+        mid = (float(bid_p) + float(ask_p)) / 2.0
+        spread = float(ask_p) - float(bid_p)
+        self.rows.append((bid_v, ask_v, mid, spread))
+        self.sum_bid_v += bid_v
+        self.sum_ask_v += ask_v
+        self.sum_mid += mid
+        self.sum_spread += spread
+
+        h = self.h
+        b = h.base
+        times = h.times
+        while times[i - b] - times[self.start - b] >= self.window_seconds:
+            o_bid_v, o_ask_v, o_mid, o_spread = self.rows.popleft()
+            self.sum_bid_v -= o_bid_v
+            self.sum_ask_v -= o_ask_v
+            self.sum_mid -= o_mid
+            self.sum_spread -= o_spread
+            self.start += 1
+
+        count = float(i - self.start + 1)
+        total_vol = self.sum_bid_v + self.sum_ask_v
+        imb = (self.sum_bid_v - self.sum_ask_v) / total_vol if total_vol > 0 else 0.0
+        return imb, self.sum_mid / count, self.sum_spread / count
+
+
+class ImbChangeRateKernel:
+    """bid_ask_imbalance.compute_imb_change_rate (讀取 RowHistory.imb)"""
+
+    def __init__(self, h: RowHistory, delta_seconds=5):
+        self.h = h
+        self.delta_seconds = delta_seconds
+        self.start = 0
+
+    def min_index(self):
+        return self.start
+
+    def update(self, i):
+        h = self.h
+        b = h.base
+        times = h.times
+        while times[i - b] - times[self.start - b] > self.delta_seconds:
+            if self.start + 1 < i and times[i - b] - times[self.start + 1 - b] >= self.delta_seconds:
+                self.start += 1
+            else:
+                break
+        return h.imb[i - b] - h.imb[self.start - b]
+
+
+class DonchianKernel:
+    """donchian.donchian，回傳 (ha_pct, la_pct, dir, h, l)"""
+
+    def __init__(self, h: RowHistory, seconds):
+        self.h = h
+        self.seconds = seconds
+        self.h_q = deque()  # 遞減，前端 = 視窗 max
+        self.l_q = deque()  # 遞增，前端 = 視窗 min
+        self.ha = 0
+        self.la = 0
+        self.direction = 0
+        self.left_ptr = 0
+
+    def min_index(self):
+        return min(
+            self.left_ptr,
+            self.h_q[0] if self.h_q else self.left_ptr,
+            self.l_q[0] if self.l_q else self.left_ptr,
+        )
+
+    def update(self, i):
+        hist = self.h
+        b = hist.base
+        times, prices = hist.times, hist.closes
+        h_q, l_q = self.h_q, self.l_q
+
+        ts = times[i - b]
+        price = prices[i - b]
+        window_left = ts - self.seconds
+
+        while h_q and times[h_q[0] - b] < window_left:
+            h_q.popleft()
+        while l_q and times[l_q[0] - b] < window_left:
+            l_q.popleft()
+        while self.left_ptr < i and times[self.left_ptr - b] < window_left:
+            self.left_ptr += 1
+
+        h = prices[h_q[0] - b] if h_q else price
+        l = prices[l_q[0] - b] if l_q else price
+
+        if price > h:
+            if self.la == 0:
+                self.ha += 1
+            else:
+                self.ha, self.la = 1, 0
+            self.direction = 1
+        elif price < l:
+            if self.ha == 0:
+                self.la += 1
+            else:
+                self.la, self.ha = 1, 0
+            self.direction = -1
+
+        while h_q and prices[h_q[-1] - b] <= price:
+            h_q.pop()
+        h_q.append(i)
+        while l_q and prices[l_q[-1] - b] >= price:
+            l_q.pop()
+        l_q.append(i)
+
+        window_tick_count = float(i - self.left_ptr + 1)
+        return (
+            self.ha / window_tick_count,
+            self.la / window_tick_count,
+            float(self.direction),
+            float(h),
+            float(l),
+        )
+
+
+class TimeFeatureKernel:
+    """
+    time_feature.extract_time_features_util 的查表版本。
+    sin / cos 以同一個向量化運算預先算好 1440 分鐘，逐筆只做查表。
+    """
+
+    TZ_OFFSET_S = 8 * 3600  # Asia/Taipei 無夏令時間
+
+    def __init__(self):
+        minutes = np.arange(1440, dtype=np.int32)
+        day_period = 1440.0
+        self.sin_table = np.sin(2 * np.pi * minutes / day_period).tolist()
+        self.cos_table = np.cos(2 * np.pi * minutes / day_period).tolist()
+
+    def update(self, ts) -> dict[str, float]:
+        minute_of_day = int((ts + self.TZ_OFFSET_S) // 60) % 1440
+        tws_market_minutes = minute_of_day - 540
+        return {
+            FeatureName.SIN_TIME: self.sin_table[minute_of_day],
+            FeatureName.COS_TIME: self.cos_table[minute_of_day],
+            FeatureName.IS_OP_30: 1.0 if 0 <= tws_market_minutes <= 30 else 0.0,
+            FeatureName.IS_CL_30: 1.0 if 240 <= tws_market_minutes <= 270 else 0.0,
+        }
@@ -1,27 +1,69 @@
 from datetime import datetime, date
 
 import numpy as np
+from numba import njit, prange
 
 from strategy.tools.kbar_indicators.intraday_interval_volume_avg.iiva_lookup import IIVALookup
 
 
+@njit
 def rolling_vol_sum_window(n, window_seconds, times, volumes):
-    """滾動窗口內的成交量總和（O(n) 累積和技巧）"""
+    """滾動窗口內的成交量總和（雙指標，O(n)）"""
 
-    result = np.full(n, 0.0, dtype=np.float64)
-    cum_vol = np.zeros(n + 1, dtype=np.int64)
-    np.cumsum(volumes, out=cum_vol[1:])
+    result = np.zeros(n, dtype=np.float64)
 
+    vol_sum = 0
+    left = 0
     for i in range(n):
-        hi = times[i]
-        lo = hi - window_seconds
-        left = int(np.searchsorted(times, lo, side='right'))
-        right = i + 1
-        result[i] = cum_vol[right] - cum_vol[left]
+        vol_sum += volumes[i]
+        lo = times[i] - window_seconds
+        while left <= i and times[left] <= lo:
+            vol_sum -= volumes[left]
+            left += 1
+        result[i] = vol_sum
 
     return result
 
 
+@njit
+def _rolling_vol_sum_multi(n, windows_seconds, times, volumes):
+    k = len(windows_seconds)
+    result = np.zeros((k, n), dtype=np.float64)
+
+    vol_sums = np.zeros(k, dtype=np.int64)
+    lefts = np.zeros(k, dtype=np.int64)
+    for i in range(n):
+        for j in range(k):
+            vol_sums[j] += volumes[i]
+            lo = times[i] - windows_seconds[j]
+            left = lefts[j]
+            while left <= i and times[left] <= lo:
+                vol_sums[j] -= volumes[left]
+                left += 1
+            lefts[j] = left
+            result[j, i] = vol_sums[j]
+
+    return result
+
+
+@njit(parallel=True)
+def _rolling_vol_sum_multi_parallel(n, windows_seconds, times, volumes):
+    k = len(windows_seconds)
+    result = np.zeros((k, n), dtype=np.float64)
+    for j in prange(k):
+        result[j] = rolling_vol_sum_window(n, windows_seconds[j], times, volumes)
+    return result
+
+
+def _iiva_array(n, times, iiva_lookups: dict[date, IIVALookup]):
+    # 建立 IIVA 查詢表
+    iiva_array = np.full(n, 1.0, dtype=np.float64)
+    for i in range(n):
+        ts = datetime.fromtimestamp(times[i])
+        iiva_array[i] = iiva_lookups[ts.date()].get(ts)
+    return iiva_array
+
+
 def volume_ratio(n, window_seconds, times, volumes, iiva_lookups: dict[date, IIVALookup]):
     """
             量比 = 滾動窗口內成交量總和 / IIVA（歷史同期均量）
@@ -34,11 +76,7 @@ def volume_ratio(n, window_seconds, times, volumes, iiva_lookups: dict[date, IIV
         n, window_seconds, times, volumes
     )
 
-    # 建立 IIVA 查詢表
-    iiva_array = np.full(n, 1.0, dtype=np.float64)
-    for i in range(n):
-        ts = datetime.fromtimestamp(times[i])
-        iiva_array[i] = iiva_lookups[ts.date()].get(ts)
+    iiva_array = _iiva_array(n, times, iiva_lookups)
 
     result = np.where(
         iiva_array > 0,
@@ -47,3 +85,23 @@ def volume_ratio(n, window_seconds, times, volumes, iiva_lookups: dict[date, IIV
     )
 
     return result
+
+
+def volume_ratio_multi(n, windows_seconds, times, volumes, iiva_lookups: dict[date, IIVALookup], parallel=False):
+    """
+    多個窗口的量比，result[j] 與 volume_ratio(n, windows_seconds[j], ...) 相同。
+    成交量總和一次掃描 (parallel=True 時各窗口以 prange 分到不同 thread)，IIVA 查詢表只建一次
+    """
+    windows_seconds = np.asarray(windows_seconds, dtype=np.float64)
+    if parallel:
+        rolling_vol_sums = _rolling_vol_sum_multi_parallel(n, windows_seconds, times, volumes)
+    else:
+        rolling_vol_sums = _rolling_vol_sum_multi(n, windows_seconds, times, volumes)
+
+    iiva_array = _iiva_array(n, times, iiva_lookups)
+
+    return np.where(
+        iiva_array > 0,
+        rolling_vol_sums / iiva_array,
+        1.0
+    )
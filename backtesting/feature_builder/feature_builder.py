@@ -20,11 +20,12 @@ import numpy as np
 from backtesting.feature_builder._feature_calculators.bid_ask_imbalance import bid_ask_features, compute_imb_change_rate
 from backtesting.feature_builder._feature_calculators.time_feature import extract_time_features_util
 from backtesting.feature_builder._feature_calculators.volume_ratio import volume_ratio
-from backtesting.feature_builder._feature_calculators.momentum import momentum
+from backtesting.feature_builder._feature_calculators.momentum import momentum_multi
 from backtesting.feature_builder._feature_calculators.sd import sd
 from backtesting.feature_builder._feature_config import FeatureConfig
 from backtesting.feature_builder._feature_calculators.donchian import donchian
-from backtesting.feature_builder._feature_calculators.net_buy_ratio import net_buy_ratio
+from backtesting.feature_builder._feature_calculators.net_buy_ratio import net_buy_ratio_multi
+from backtesting.feature_builder.feature_matrix import allocate, fill_column, build_matrix
 from backtesting.feature_builder.feature_name import FeatureName
 from backtesting.feature_builder.indicator_proxy import IndicatorsProxy
 from backtesting.feature_builder.labels.pnl_label import pnl_label
@@ -113,6 +114,7 @@ class FeatureBuilder:
 
         # 快取計算結果
         self._cache: dict = {}
+        self._store_binding = None
 
     def _init_attrs_by_tick_slice(self, ticks: NPTicks):
         # 解析 tick 資料
@@ -171,23 +173,60 @@ class FeatureBuilder:
         fb._bid_volumes = np.zeros(indicators.n, dtype=np.int64)
         fb._ask_volumes = np.zeros(indicators.n, dtype=np.int64)
         fb._cache = {}
+        fb._store_binding = None
 
         # 將 indicators 的屬性委託給 proxy
         fb._indicators_proxy = proxy
         return fb
 
+    def attach_store(self, binding):
+        """
+        之後 build_features 經由 feature store 讀寫 (只計算缺少的 (日期, 特徵))，見 feature_store.py
+        :param binding: feature_store.bind(symbol, days, day_edges(...), bar_interval_seconds)
+        """
+        self._store_binding = binding
+        return self
+
     # ─────────────────────────────────────────────
     #  核心計算方法
     # ─────────────────────────────────────────────
 
-    def build_features(self, feature_names: list[str] = None, return_mtx=False) -> dict | np.ndarray:
+    def build_features(self, feature_names: list[str] = None, return_mtx=False, mtx_dtype=np.float64) -> dict | np.ndarray:
         """
         計算所有特徵，回傳 dict[str,ndarray]。
 
+        :param return_mtx: 回傳預先配置的 column-major 矩陣 (feature_matrix.py)，不經過 np.hstack
+        :param mtx_dtype: 矩陣的 dtype，可用 np.float32
         :return: 特徵矩陣，每列是一個 tick，每行是一個特徵
         """
 
-        func_map = {
+        func_map = self._feature_funcs()
+
+        if not feature_names:
+            feature_names = list(func_map)
+        for n in feature_names:
+            if n not in func_map:
+                raise Exception("Unknown feature: {}".format(n))
+
+        if self._store_binding is not None:
+            data = self._store_binding.build(self, feature_names, func_map)
+        elif return_mtx:
+            # 算完一個特徵就寫入對應的 column，不保留整份 dict
+            mtx = allocate(self._n, len(feature_names), mtx_dtype)
+            for j, n in enumerate(feature_names):
+                fill_column(mtx, j, func_map[n]())
+            return mtx
+        else:
+            data: dict[str, np.ndarray] = {n: func_map[n]() for n in feature_names}
+
+        if return_mtx:
+            # mtx = np.hstack([data[k].reshape(-1, 1) for k in data])
+            return build_matrix(data, dtype=mtx_dtype)
+        return data
+
+    def _feature_funcs(self) -> dict[str, Callable[[], np.ndarray]]:
+        """特徵名稱 → 計算函式"""
+        return {
             'price': lambda: self._closes,
             'net_buy_ratio_s': self.net_buy_ratio_s,
             'net_buy_ratio_m': self.net_buy_ratio_m,
@@ -216,22 +255,6 @@ class FeatureBuilder:
             'ba_imb_cr': self.ba_imb_cr,
         }
 
-        if not feature_names:
-            data = {k: v() for k, v in func_map.items()}
-
-        else:
-            data: dict[str, np.ndarray] = {}
-            for n in feature_names:
-                if n not in func_map:
-                    raise Exception("Unknown feature: {}".format(n))
-                data[n] = func_map[n]()
-
-
-        if return_mtx:
-            mtx = np.hstack([data[k].reshape(-1, 1) for k in data])
-            return mtx
-        return data
-
     def build_label(self):
         label = self.tbl_label()
         valid = self.tbl_valid()
@@ -253,11 +276,17 @@ class FeatureBuilder:
         """10分鐘淨買比率"""
         return self._net_buy_ratio(self._config.net_buy_window_l)
 
-    @cache_result
     def _net_buy_ratio(self, window: timedelta) -> np.ndarray:
-        result = net_buy_ratio(self.times, self._tick_types, self._volumes, window.total_seconds())
+        return self._net_buy_ratios()[window]
 
-        return result
+    @cache_result
+    def _net_buy_ratios(self) -> dict[timedelta, np.ndarray]:
+        """s/m/l 三個窗口一次掃描"""
+        windows = (self._config.net_buy_window_s, self._config.net_buy_window_m, self._config.net_buy_window_l)
+        result = net_buy_ratio_multi(
+            self.times, self._tick_types, self._volumes, [w.total_seconds() for w in windows]
+        )
+        return dict(zip(windows, result))
 
     def net_buy_ratio_change(self) -> np.ndarray:
         """
@@ -317,7 +346,14 @@ class FeatureBuilder:
         return self._momentum(self._config.momentum_window_long)
 
     def _momentum(self, window: timedelta) -> np.ndarray:
-        return momentum(self._n, window.total_seconds(), self._times, self._closes)
+        return self._momentums()[window]
+
+    @cache_result
+    def _momentums(self) -> dict[timedelta, np.ndarray]:
+        """short/long 兩個窗口一次掃描"""
+        windows = (self._config.momentum_window_short, self._config.momentum_window_long)
+        result = momentum_multi(self._n, [w.total_seconds() for w in windows], self._times, self._closes)
+        return dict(zip(windows, result))
 
     def bid_ask_diff(self) -> np.ndarray:
         """買賣價差（ask_price - bid_price）"""
@@ -0,0 +1,178 @@
+"""
+FeatureStore — 依日期持久化的特徵快取 (qclaw/backtesting/npy_cache/feature_caches)
+
+key: {symbol}.feature.{tick|bar<N>s}.{feature}.{config hash}.{date}
+    config hash = 該特徵相依的 FeatureConfig 欄位 + KERNEL_VERSION (改了 kernel 就調 KERNEL_VERSION)
+value: 該日各列的特徵值 (float64)，以 mmap 讀取
+
+FeatureBuilder.attach_store 之後，build_features 只計算缺少的 (日期, 特徵)：
+    第 D 天的特徵用 [D 的第一列時間 - warmup, D 結束] 的資料計算 (warmup 取自前一天)，算完去掉 warmup 列後存入。
+    warmup 超出已載入的資料時 (通常是範圍的第一天) 只計算、不存入。
+    warmup = 特徵的回看窗口，窗口內的資料齊全，所以與整段合併計算的結果相同
+    (sd / ba_imb 以浮點累加，兩者只差在捨入誤差)。
+
+不存的特徵 (照常以整段資料計算)：
+    - price (原始值)
+    - donchian_ha / la / dir 及衍生 (dc_brkout_accu, dc_energy, dir_sd)：累計次數跨日延續，沒有固定的回看長度
+    - ba_imb_cr：回看「N 秒前最近的一筆」，可能落在任意遠的前一天
+    - bid_ask_imbalance：回傳 tuple
+
+volume_ratio 依賴外部的 iiva_lookups，store 假設同一天的 iiva 不變 (由 BacktestingContext 依日期查詢)。
+"""
+import hashlib
+import json
+from functools import cache
+from dataclasses import dataclass, fields, is_dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from backtesting.feature_builder._feature_config import FeatureConfig
+from backtesting.feature_builder.feature_builder import FeatureBuilder
+from backtesting.feature_builder.feature_name import FeatureName
+from qclaw.backtesting.npy_cache.npy_cache_manager import NpyCacheManager, npy_cache_manager
+from tools.logger.custom_logger import CustomLogger
+
+KERNEL_VERSION = 1
+
+_logger = CustomLogger.get_logger('feature_store')
+
+_NBR_WINDOWS = ('net_buy_window_s', 'net_buy_window_m', 'net_buy_window_l')
+
+# 特徵 → 相依的 FeatureConfig 欄位 (config hash 用)
+STORABLE_FEATURES: dict[str, tuple[str, ...]] = {
+    'net_buy_ratio_s': ('net_buy_window_s',),
+    'net_buy_ratio_m': ('net_buy_window_m',),
+    'net_buy_ratio_l': ('net_buy_window_l',),
+    'net_buy_ratio_change': ('net_buy_window_m', 'net_buy_window_l'),
+    'net_buy_ratio_regime': _NBR_WINDOWS,
+    'volume_ratio': ('volume_ratio_window', 'iiva_length', 'iiva_interval_minutes'),
+    'sd': ('sd_window',),
+    'momentum_short': ('momentum_window_short',),
+    'momentum_long': ('momentum_window_long',),
+    'bid_ask_diff': (),
+    'ba_imb': ('bid_ask_imb_window',),
+    'donchian_h': ('donchian_window',),
+    'donchian_l': ('donchian_window',),
+    FeatureName.SIN_TIME: (),
+    FeatureName.COS_TIME: (),
+    FeatureName.IS_OP_30: (),
+    FeatureName.IS_CL_30: (),
+}
+
+
+# 相依欄位中不是回看窗口的特徵 → 回看窗口欄位 (其餘特徵的相依欄位皆為回看窗口)
+# volume_ratio 的 iiva_length / iiva_interval_minutes 只影響外部的 iiva_lookups，不需要前面的資料
+LOOKBACK_FIELDS: dict[str, tuple[str, ...]] = {
+    'volume_ratio': ('volume_ratio_window',),
+}
+
+
+def warmup_seconds(feature: str, config: FeatureConfig) -> float:
+    """回看窗口 (秒)：計算第一列需要往前多少時間的資料"""
+    windows = [getattr(config, f) for f in LOOKBACK_FIELDS.get(feature, STORABLE_FEATURES[feature])]
+    return max((w.total_seconds() for w in windows if isinstance(w, timedelta)), default=0.0)
+
+
+def config_hash(feature: str, config: FeatureConfig) -> str:
+    deps = {f: str(getattr(config, f)) for f in STORABLE_FEATURES[feature]}
+    raw = json.dumps({'feature': str(feature), 'deps': deps, 'kernel': KERNEL_VERSION}, sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def day_edges(times: np.ndarray, day_last_times: list[float]) -> np.ndarray:
+    """
+    合併後資料 (ticks 或 bars) 中各日的列範圍，第 d 天為 [edges[d], edges[d + 1])。
+    以前一天最後一筆 tick 的時間切分，bar (時間為區間起點) 也適用。
+    :param day_last_times: 各日最後一筆 tick 的時間 (秒)，依日期排序
+    """
+    inner = np.searchsorted(times, np.asarray(day_last_times[:-1], dtype=np.float64), side='right')
+    return np.concatenate([[0], inner, [len(times)]]).astype(np.int64)
+
+
+def _slice_data(data, start: int, end: int):
+    if isinstance(data, list):
+        return data[start:end]
+    if not is_dataclass(data):
+        raise Exception(f'feature store does not support {type(data).__name__}')
+    return type(data)(**{f.name: getattr(data, f.name)[start:end] for f in fields(data)})
+
+
+class FeatureStore:
+    def __init__(self, root: str | Path = None):
+        self.cache = NpyCacheManager(root or npy_cache_manager.root.parent / 'feature_caches')
+
+    def key(self, symbol: str, dt: date, bar_interval_seconds: int, feature: str, config: FeatureConfig) -> str:
+        bar = f'bar{bar_interval_seconds}s' if bar_interval_seconds else 'tick'
+        return f"{symbol}.feature.{bar}.{feature}.{config_hash(feature, config)}.{dt.strftime('%Y-%m-%d')}"
+
+    def bind(self, symbol: str, days: list[date], edges: np.ndarray, bar_interval_seconds: int = 0) -> 'StoreBinding':
+        if len(edges) != len(days) + 1:
+            raise Exception(f'{len(days)} days need {len(days) + 1} edges, got {len(edges)}')
+        return StoreBinding(self, symbol, list(days), np.asarray(edges), bar_interval_seconds)
+
+
+@dataclass
+class StoreBinding:
+    """一個 FeatureBuilder 的資料與 store 中 (symbol, 日期, bar) 的對應"""
+    store: FeatureStore
+    symbol: str
+    days: list[date]
+    edges: np.ndarray
+    bar_interval_seconds: int
+
+    def build(self, fb: FeatureBuilder, names: list[str], func_map: dict[str, Callable[[], np.ndarray]]) -> dict[str, np.ndarray]:
+        config = fb._config
+        stored = [n for n in names if n in STORABLE_FEATURES]
+        keys = {
+            (n, d): self.store.key(self.symbol, dt, self.bar_interval_seconds, n, config)
+            for n in stored for d, dt in enumerate(self.days)
+        }
+        missing_keys = set(self.store.cache.missing(list(keys.values())))
+
+        missing_by_day: dict[int, list[str]] = {}
+        for (n, d), key in keys.items():
+            if key in missing_keys:
+                missing_by_day.setdefault(d, []).append(n)
+
+        # warmup 超出已載入資料的 (日期, 特徵) 是冷啟動的值，只用於這次，不存入 store
+        # (否則之後範圍較大的 build 會讀到冷啟動的值)
+        unsaved: dict[tuple[str, int], np.ndarray] = {}
+        for d, day_names in sorted(missing_by_day.items()):
+            start, end = int(self.edges[d]), int(self.edges[d + 1])
+            if start == end:
+                for n in day_names:
+                    self.store.cache.set(keys[(n, d)], np.empty(0, dtype=np.float64))
+                continue
+
+            warmup = max(warmup_seconds(n, config) for n in day_names)
+            warm_start = int(np.searchsorted(fb._times, fb._times[start] - warmup, side='left'))
+            sub = FeatureBuilder(_slice_data(fb._ticks, warm_start, end), fb._iiva_lookups, config)
+            computed = sub.build_features(day_names)
+            for n in day_names:
+                arr = np.ascontiguousarray(computed[n][start - warm_start:], dtype=np.float64)
+                if fb._times[0] <= fb._times[start] - warmup_seconds(n, config):
+                    self.store.cache.set(keys[(n, d)], arr)
+                else:
+                    unsaved[(n, d)] = arr
+            _logger.info(f'{self.days[d]} computed {day_names}')
+
+        data = {}
+        for n in names:
+            if n in STORABLE_FEATURES:
+                data[n] = np.concatenate([
+                    unsaved[(n, d)] if (n, d) in unsaved else self.store.cache.get(keys[(n, d)], mmap_mode='r')
+                    for d in range(len(self.days))
+                ])
+            else:
+                data[n] = func_map[n]()
+        return data
+
+
+
+@cache
+def feature_store() -> FeatureStore:
+    """共用的 store，第一次呼叫時才建立 (建立時會產生快取目錄)"""
+    return FeatureStore()
@@ -0,0 +1,136 @@
+"""
+依交易日 / 盤別分段，以 process pool 平行計算特徵
+
+    分段 : by='day'     交易日 (前一天 15:00 ~ 當天 13:45)
+           by='session' 夜盤 (15:00 ~ 05:00) 與日盤 (08:45 ~ 13:45) 分開
+    每段 : worker 以 [該段第一列時間 - warmup, 該段結束] 的資料建立 FeatureBuilder (warmup 取自前一段)，
+           去掉 warmup 列後直接寫入 SharedMemory 上的輸出矩陣 (n, k)，不經過 pickle 傳回
+    warmup 預設為各特徵的回看窗口 (feature_store.warmup_seconds)，與整段計算的結果相同 (sd / ba_imb 只差捨入誤差)
+
+沒有固定回看長度的特徵 (不在 STORABLE_FEATURES 中，例如 donchian_ha / ba_imb_cr) 在主 process 以整段資料計算。
+Windows (spawn) 下呼叫端的 script 需要 if __name__ == '__main__' 保護。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from backtesting.feature_builder.feature_builder import FeatureBuilder
+from backtesting.feature_builder.feature_matrix import allocate
+from backtesting.feature_builder.feature_store import STORABLE_FEATURES, warmup_seconds, _slice_data
+from tools.logger.custom_logger import CustomLogger
+from tools.time_utils import SJ_OFFSET_S
+
+_logger = CustomLogger.get_logger('parallel_feature_build')
+
+_DAY_S = 86_400
+_NIGHT_OPEN_S = 15 * 3600  # 15:00 之後屬於下一個交易日
+_DAY_SESSION_START_S = 6 * 3600  # 夜盤 05:00 收盤、日盤 08:45 開盤，以 06:00 切開
+
+
+def shard_edges(times: np.ndarray, by: str = 'day') -> np.ndarray:
+    """
+    各段的列範圍，第 i 段為 [edges[i], edges[i + 1])
+    :param times: Unix 秒 (排序)
+    """
+    local = times + SJ_OFFSET_S
+    trade_day = np.floor((local + (_DAY_S - _NIGHT_OPEN_S)) / _DAY_S).astype(np.int64)
+    if by == 'day':
+        keys = trade_day
+    elif by == 'session':
+        sod = np.mod(local, _DAY_S)
+        keys = trade_day * 2 + ((sod >= _DAY_SESSION_START_S) & (sod < _NIGHT_OPEN_S))
+    else:
+        raise Exception(f'unknown shard unit: {by}')
+
+    inner = np.flatnonzero(np.diff(keys)) + 1
+    return np.concatenate([[0], inner, [len(times)]]).astype(np.int64)
+
+
+def _build_shard(data, iiva_lookups, config, names, warm_rows, shm_name, shape, row_offset, cols) -> int:
+    f = FeatureBuilder(data, iiva_lookups, config).build_features(names)
+    shm = SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        for j, n in zip(cols, names):
+            col = f[n][warm_rows:]
+            out[row_offset:row_offset + len(col), j] = col
+        del out
+    finally:
+        shm.close()
+    return len(f[names[0]]) - warm_rows
+
+
+def build_features_parallel(
+        fb: FeatureBuilder,
+        feature_names: list[str] = None,
+        by: str = 'day',
+        warmup: timedelta = None,
+        workers: int = None,
+        return_mtx=False,
+        mtx_dtype=np.float64,
+) -> dict | np.ndarray:
+    """
+    與 fb.build_features 相同的輸出 (dict 時特徵皆為 float64)
+    :param by: 'day' 或 'session'
+    :param warmup: 每段向前多取的資料長度，None 依特徵的回看窗口
+    :param workers: process 數，None 為 cpu 數；1 以下或只有一段時直接呼叫 fb.build_features
+    """
+    func_map = fb._feature_funcs()
+    names = list(feature_names) if feature_names else list(func_map)
+    for n in names:
+        if n not in func_map:
+            raise Exception("Unknown feature: {}".format(n))
+
+    workers = workers or os.cpu_count()
+    edges = shard_edges(fb._times, by)
+    if workers <= 1 or len(edges) <= 2:
+        return fb.build_features(names, return_mtx, mtx_dtype)
+
+    sharded = [n for n in names if n in STORABLE_FEATURES]
+    rest = [n for n in names if n not in STORABLE_FEATURES]
+    if warmup is not None:
+        warmup_s = warmup.total_seconds()
+    else:
+        warmup_s = max((warmup_seconds(n, fb._config) for n in sharded), default=0.0)
+
+    n_rows, k = fb._n, len(names)
+    shm = SharedMemory(create=True, size=max(n_rows * k * 8, 1))
+    try:
+        out = np.ndarray((n_rows, k), dtype=np.float64, buffer=shm.buf)
+
+        if sharded:
+            cols = [names.index(n) for n in sharded]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = []
+                for start, end in zip(edges[:-1], edges[1:]):
+                    start, end = int(start), int(end)
+                    warm_start = int(np.searchsorted(fb._times, fb._times[start] - warmup_s, side='left'))
+                    futures.append(executor.submit(
+                        _build_shard,
+                        _slice_data(fb._ticks, warm_start, end), fb._iiva_lookups, fb._config, sharded,
+                        start - warm_start, shm.name, (n_rows, k), start, cols,
+                    ))
+                done = sum(f.result() for f in futures)
+            if done != n_rows:
+                raise Exception(f'shards wrote {done} rows, expected {n_rows}')
+            _logger.info(f'features built in {len(futures)} shards ({by}), {workers} workers')
+
+        if rest:
+            data = fb.build_features(rest)
+            for n in rest:
+                out[:, names.index(n)] = data[n]
+
+        # column-major，dict 的每個特徵也是連續的 column
+        mtx = allocate(n_rows, k, mtx_dtype if return_mtx else np.float64)
+        mtx[...] = out
+        del out
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if return_mtx:
+        return mtx
+    return {n: mtx[:, j] for j, n in enumerate(names)}
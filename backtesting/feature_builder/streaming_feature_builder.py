@@ -0,0 +1,212 @@
+"""
+Streaming Feature Builder - FeatureBuilder 的逐筆版本 (live inference 用)
+
+FeatureBuilder 每次都對整天的陣列從 index 0 重算；
+這裡每個 kernel 保存自己的狀態 (視窗指標、累加值、單調 deque)，
+每 append 一筆 tick / 1 秒 bar 就輸出一列特徵，amortized O(1)。
+
+同一天的資料逐筆重播，輸出與 FeatureBuilder.build_features 的對應列 bit-identical
+(運算順序與批次 kernel 完全相同，見 _feature_calculators/streaming_kernels.py)。
+
+使用方式：
+```python
+sfb = StreamingFeatureBuilder(feature_names, iiva_lookups)
+
+# live: 每筆 tick
+row = sfb.append(ts_seconds, close, volume, tick_type, bid_price, ask_price, bid_volume, ask_volume)
+
+# 重播: 與 FeatureBuilder(NPTicks / AggregatedBars) 相同的欄位轉換
+mtx = sfb.extend_npticks(np_ticks)
+```
+"""
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+from backtesting.feature_builder._feature_calculators.streaming_kernels import (
+    BidAskKernel,
+    DonchianKernel,
+    ImbChangeRateKernel,
+    MomentumKernel,
+    NetBuyRatioKernel,
+    RowHistory,
+    SdKernel,
+    TimeFeatureKernel,
+    VolumeRatioKernel,
+)
+from backtesting.feature_builder._feature_config import FeatureConfig
+from backtesting.feature_builder.feature_name import FeatureName
+from data_manager.history.statics.aggregated_bars import AggregatedBars
+from data_manager.history.statics.tick.np_ticks import NPTicks
+from strategy.tools.kbar_indicators.intraday_interval_volume_avg.iiva_lookup import IIVALookup
+
+
+class StreamingFeatureBuilder:
+    # 與 FeatureBuilder.build_features 的 func_map 相同
+    # ('bid_ask_imbalance' 在批次版回傳 tuple，不支援)
+    FEATURES = (
+        'price',
+        'net_buy_ratio_s',
+        'net_buy_ratio_m',
+        'net_buy_ratio_l',
+        'volume_ratio',
+        'sd',
+        'momentum_short',
+        'momentum_long',
+        'bid_ask_diff',
+        'net_buy_ratio_change',
+        'net_buy_ratio_regime',
+        'donchian_ha',
+        'donchian_la',
+        'donchian_dir',
+        'donchian_h',
+        'donchian_l',
+        FeatureName.SIN_TIME,
+        FeatureName.COS_TIME,
+        FeatureName.IS_OP_30,
+        FeatureName.IS_CL_30,
+        FeatureName.DIR_SD,
+        FeatureName.DC_BRKOUT_ACCU,
+        'dc_energy',
+        'ba_imb',
+        'ba_imb_cr',
+    )
+
+    def __init__(
+            self,
+            feature_names: list[str] = None,
+            iiva_lookups: dict[date, IIVALookup] = None,
+            config: Optional[FeatureConfig] = None,
+    ):
+        """
+        :param feature_names: 輸出欄位順序，None 表示 FEATURES 全部
+        :param iiva_lookups: volume_ratio 需要，未使用 volume_ratio 時可不傳
+        """
+        self._config = config or FeatureConfig()
+        self._feature_names = list(feature_names or self.FEATURES)
+        unknown = [n for n in self._feature_names if n not in self.FEATURES]
+        if unknown:
+            raise Exception(f'Unknown feature: {unknown}')
+        if 'volume_ratio' in self._feature_names and iiva_lookups is None:
+            raise Exception('volume_ratio requires iiva_lookups.')
+
+        c = self._config
+        h = self._h = RowHistory()
+        self._nbr_s = NetBuyRatioKernel(h, c.net_buy_window_s.total_seconds())
+        self._nbr_m = NetBuyRatioKernel(h, c.net_buy_window_m.total_seconds())
+        self._nbr_l = NetBuyRatioKernel(h, c.net_buy_window_l.total_seconds())
+        self._sd = SdKernel(h, c.sd_window.total_seconds())
+        self._mom_s = MomentumKernel(h, c.momentum_window_short.total_seconds())
+        self._mom_l = MomentumKernel(h, c.momentum_window_long.total_seconds())
+        self._donchian = DonchianKernel(h, c.donchian_window.total_seconds())
+        self._ba = BidAskKernel(h, c.bid_ask_imb_window.total_seconds())
+        self._imb_cr = ImbChangeRateKernel(h)
+        self._time = TimeFeatureKernel()
+        self._kernels = [
+            self._nbr_s, self._nbr_m, self._nbr_l, self._sd, self._mom_s, self._mom_l,
+            self._donchian, self._ba, self._imb_cr,
+        ]
+        if 'volume_ratio' in self._feature_names:
+            self._volume_ratio = VolumeRatioKernel(h, c.volume_ratio_window.total_seconds(), iiva_lookups)
+            self._kernels.append(self._volume_ratio)
+        else:
+            self._volume_ratio = None
+
+    @property
+    def feature_names(self) -> list[str]:
+        return self._feature_names
+
+    @property
+    def n(self) -> int:
+        return self._h.n
+
+    def append(self, ts, close, volume, tick_type, bid_price, ask_price, bid_volume, ask_volume) -> np.ndarray:
+        """
+        加入一筆 (ts 為 unix epoch 秒) 並回傳該筆的特徵列 (依 feature_names 排序)
+        """
+        h = self._h
+        i = h.n
+        h.append(ts, close, volume, tick_type)
+
+        nbr_s = self._nbr_s.update(i)
+        nbr_m = self._nbr_m.update(i)
+        nbr_l = self._nbr_l.update(i)
+        sd = self._sd.update(i)
+        ha, la, direction, dc_h, dc_l = self._donchian.update(i)
+        imb, _mid, _spread = self._ba.update(i, bid_volume, ask_volume, bid_price, ask_price)
+        h.imb[i - h.base] = imb
+
+        if (nbr_l > nbr_m) and (nbr_m > nbr_s) or (nbr_l < nbr_m) and (nbr_m < nbr_s):
+            regime = nbr_l - nbr_s
+        else:
+            regime = 0.0
+
+        values = {
+            'price': close,
+            'net_buy_ratio_s': nbr_s,
+            'net_buy_ratio_m': nbr_m,
+            'net_buy_ratio_l': nbr_l,
+            'volume_ratio': self._volume_ratio.update(i) if self._volume_ratio else None,
+            'sd': sd,
+            'momentum_short': self._mom_s.update(i),
+            'momentum_long': self._mom_l.update(i),
+            'bid_ask_diff': ask_price - bid_price,
+            'net_buy_ratio_change': nbr_m - nbr_l,
+            'net_buy_ratio_regime': regime,
+            'donchian_ha': ha,
+            'donchian_la': la,
+            'donchian_dir': direction,
+            'donchian_h': dc_h,
+            'donchian_l': dc_l,
+            **self._time.update(ts),
+            FeatureName.DIR_SD: direction * sd,
+            FeatureName.DC_BRKOUT_ACCU: ha - la,
+            'dc_energy': ha + la,
+            'ba_imb': imb,
+            'ba_imb_cr': self._imb_cr.update(i),
+        }
+
+        h.trim(min(k.min_index() for k in self._kernels))
+        return np.array([values[k] for k in self._feature_names], dtype=np.float64)
+
+    def extend(self, times, closes, volumes, tick_types, bid_prices, ask_prices, bid_volumes, ask_volumes) \
+            -> np.ndarray:
+        """逐筆 append，回傳 (n, n_features) 矩陣"""
+        rows = [
+            self.append(*row)
+            for row in zip(
+                times.tolist(), closes.tolist(), volumes.tolist(), tick_types.tolist(),
+                bid_prices.tolist(), ask_prices.tolist(), bid_volumes.tolist(), ask_volumes.tolist()
+            )
+        ]
+        if not rows:
+            return np.empty((0, len(self._feature_names)), dtype=np.float64)
+        return np.vstack(rows)
+
+    def extend_npticks(self, ticks: NPTicks, start=0) -> np.ndarray:
+        """欄位轉換同 FeatureBuilder._init_attrs_by_tick_slice"""
+        return self.extend(
+            ticks.ts_seconds()[start:],
+            ticks.close[start:],
+            ticks.volume[start:],
+            ticks.tick_type[start:],
+            ticks.bid_price[start:],
+            ticks.ask_price[start:],
+            ticks.bid_volume[start:],
+            ticks.ask_volume[start:],
+        )
+
+    def extend_bars(self, bars: AggregatedBars, start=0) -> np.ndarray:
+        """欄位轉換同 FeatureBuilder._init_attrs_by_aggregated_bars"""
+        diff = bars.active_buy_volume[start:] - bars.active_sell_volume[start:]
+        return self.extend(
+            bars.ts_seconds()[start:],
+            bars.close[start:],
+            bars.volume[start:],
+            np.where(diff >= 0, 1, 2).astype(np.int32),
+            bars.avg_bid_price[start:],
+            bars.avg_ask_price[start:],
+            bars.avg_bid_volume[start:].astype(np.int64),
+            bars.avg_ask_volume[start:].astype(np.int64),
+        )
@@ -1,6 +1,7 @@
 from backtesting.feature_builder._feature_config import FeatureConfig
 from backtesting.feature_builder.feature_builder import FeatureBuilder
 from backtesting.feature_builder.feature_name import FeatureName
+from backtesting.feature_builder.feature_store import feature_store, day_edges
 from data_manager.history.statics.tick.np_ticks import NPTicks
 from tools.backtesting_context import BacktestingContext
 from tools.plotter import Plotter
@@ -8,9 +9,10 @@ from tools.utils import tmf_r1_contract
 
 
 class FeatureGrapher(BacktestingContext):
-    def graph(self, start, end, feature_to_graph_idx: dict[FeatureName | str, int]):
+    def graph(self, start, end, feature_to_graph_idx: dict[FeatureName | str, int], use_feature_store=False):
+        contract = tmf_r1_contract(self.app.api)
         with self.app.raw_connection as conn:
-            daily_slices = self.npy_htm.get(conn, tmf_r1_contract(self.app.api), start, end)
+            daily_slices = self.npy_htm.get(conn, contract, start, end)
         slices: list[NPTicks] = [s.np_slice for s in daily_slices if s.np_slice is not None]
 
         ticks = NPTicks.merge_slices(slices)
@@ -18,6 +20,10 @@ class FeatureGrapher(BacktestingContext):
         print('ticks load.')
 
         fb = FeatureBuilder(ticks, self.iiva_lookup, FeatureConfig())
+        if use_feature_store:
+            days = [s.date for s in daily_slices if s.np_slice is not None]
+            edges = day_edges(ticks.ts_seconds(), [s.ts_seconds()[-1] for s in slices])
+            fb.attach_store(feature_store().bind(contract.symbol, days, edges))
 
         f = fb.build_features(list(feature_to_graph_idx.keys()))
 
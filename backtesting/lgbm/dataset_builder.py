@@ -1,36 +1,47 @@
 import lightgbm as lgb
 import numpy as np
 
+from backtesting.feature_builder.feature_matrix import build_matrix
+
 
 class DatasetBuilder:
     @staticmethod
     def build(features: dict[str, np.ndarray], label: np.ndarray, valid_mask: np.ndarray, valid_ratio=0.2,
-              valid_offset_ratio: float = 0.3, valid_from_start=False):
+              valid_offset_ratio: float = 0.3, valid_from_start=False, dtype=np.float64):
+        """
+        :param dtype: 特徵矩陣的 dtype，np.float32 可讓記憶體減半
+        """
         # 先過濾valid範圍
-        names = []
-        filtered_f = []
+        rows = np.flatnonzero(valid_mask)
+        return DatasetBuilder._build_datasets(features, label, rows, valid_ratio, valid_offset_ratio, valid_from_start,
+                                              dtype)
 
-        for k, v in features.items():
-            names.append(k)
-            filtered_f.append(v[valid_mask])
-        filtered_label = label[valid_mask]
+    @staticmethod
+    def _build_datasets(features: dict[str, np.ndarray], label: np.ndarray, rows: np.ndarray, valid_ratio: float,
+                        valid_offset_ratio: float, valid_from_start: bool, dtype):
+        """
+        train / valid 的列各自直接寫入一個預先配置的 column-major 矩陣 (feature_matrix.build_matrix)。
+        兩個矩陣都是 F-contiguous，lgb.Dataset 不會再複製 (大矩陣的列切片不連續，lgb 會整份複製成 C order)
+        """
+        names = list(features)
+        filtered_label = label[rows]
 
         valid_start, valid_end = DatasetBuilder.calculate_validation_bounds_safe_offset(
             len(filtered_label), valid_ratio, valid_offset_ratio
         )
 
-        X_valid = np.hstack([f[valid_start:valid_end].reshape(-1, 1) for f in filtered_f])
+        X_valid = build_matrix(features, rows[valid_start:valid_end], dtype)
         y_valid = filtered_label[valid_start:valid_end]
 
         print(f'dataset len: {len(filtered_label)}')
         print(f'valid range: [{valid_start}:{valid_end}]')
 
         if valid_from_start:
-            X_train = np.hstack([f[valid_end:].reshape(-1, 1) for f in filtered_f])
+            X_train = build_matrix(features, rows[valid_end:], dtype)
             y_train = filtered_label[valid_end:]
             print(f'train range: [{valid_end}:]')
         else:
-            X_train = np.hstack([f[:valid_start].reshape(-1, 1) for f in filtered_f])
+            X_train = build_matrix(features, rows[:valid_start], dtype)
             y_train = filtered_label[:valid_start]
             print(f'train range: [:{valid_start}]')
 
@@ -90,56 +101,23 @@ class DatasetBuilder:
             valid_ratio=0.2,
             valid_offset_ratio: float = 0.3,
             valid_from_start=False,
-            sample_interval_seconds: float = 0.0
+            sample_interval_seconds: float = 0.0,
+            dtype=np.float64,
     ):
-        names = []
-        filtered_f = []
         valid_mask = np.all(valid_masks, axis=0)
-
-        for k, v in features.items():
-            names.append(k)
-            filtered_f.append(v[valid_mask])
-        filtered_label = label[valid_mask]
+        rows = np.flatnonzero(valid_mask)
 
         # 降頻取樣
         if sample_interval_seconds > 0:
             if times is None:
                 raise ValueError("sample_interval_seconds > 0 需要傳入 times")
-            filtered_times = times[valid_mask]
+            filtered_times = times[rows]
             mask = DatasetBuilder._build_sample_mask(filtered_times, sample_interval_seconds)
-            filtered_f = [f[mask] for f in filtered_f]
-            filtered_label = filtered_label[mask]
+            rows = rows[mask]
             print(f'降頻取樣: {len(filtered_times)} → {mask.sum()} (間隔 {sample_interval_seconds}s)')
 
-        valid_start, valid_end = DatasetBuilder.calculate_validation_bounds_safe_offset(
-            len(filtered_label), valid_ratio, valid_offset_ratio
-        )
-
-        X_valid = np.hstack([f[valid_start:valid_end].reshape(-1, 1) for f in filtered_f])
-        y_valid = filtered_label[valid_start:valid_end]
-
-        print(f'dataset len: {len(filtered_label)}')
-        print(f'valid range: [{valid_start}:{valid_end}]')
-
-        if valid_from_start:
-            X_train = np.hstack([f[valid_end:].reshape(-1, 1) for f in filtered_f])
-            y_train = filtered_label[valid_end:]
-            print(f'train range: [{valid_end}:]')
-        else:
-            X_train = np.hstack([f[:valid_start].reshape(-1, 1) for f in filtered_f])
-            y_train = filtered_label[:valid_start]
-            print(f'train range: [:{valid_start}]')
-
-        assert len(X_train) == len(y_train) and len(X_valid) == len(y_valid)
-
-        train_data = lgb.Dataset(
-            X_train, y_train, feature_name=names
-        )
-        valid_data = lgb.Dataset(
-            X_valid, y_valid, feature_name=names
-        )
-
-        return train_data, valid_data
+        return DatasetBuilder._build_datasets(features, label, rows, valid_ratio, valid_offset_ratio, valid_from_start,
+                                              dtype)
 
     @staticmethod
     def _build_sample_mask(ts: np.ndarray, interval: float) -> np.ndarray:
@@ -4,6 +4,8 @@ import numpy as np
 
 from backtesting.feature_builder._feature_config import FeatureConfig
 from backtesting.feature_builder.feature_builder import FeatureBuilder
+from backtesting.feature_builder.feature_store import feature_store, day_edges
+from backtesting.feature_builder.parallel_feature_build import build_features_parallel
 from data_manager.history.statics.aggregated_bars import AggregatedBars
 from data_manager.history.statics.tick.np_ticks import NPTicks
 from strategy.tools.kbar_indicators.intraday_interval_volume_avg.iiva2 import IntradayIntervalVolumeAvg2
@@ -13,7 +15,11 @@ from tools.utils import tmf_r1_contract
 
 class TrainingContext(BacktestingContext):
     def __init__(self, start, end, feature_names, with_label=False, gen_bars=False, bar_interval_seconds=1,
-                 use_feature_mtx=False):
+                 use_feature_mtx=False, use_feature_store=False, parallel_workers=0, shard_by='day'):
+        """
+        :param parallel_workers: > 0 時依 shard_by ('day' / 'session') 分段以多個 process 計算特徵，
+            與 use_feature_store 擇一
+        """
         super().__init__()
         self.bars = None
         self.ticks = None
@@ -21,30 +27,29 @@ class TrainingContext(BacktestingContext):
         self.label = None
         self.valid = None
 
+        slices: list[NPTicks] = []
+        days = []
+        iiva_lookups = {}
+        symbol = tmf_r1_contract(self.app.api).symbol
         with self.app.raw_connection as conn:
-            daily_slices = self.npy_htm.get(conn, tmf_r1_contract(self.app.api), start, end)
-
-            iiva_lookups = {}
-
-
-            for s in daily_slices:
-                if s.np_slice:
-                    for i in range (-1,1):
-                        dt_need = s.date + timedelta(days=i)
-                        if dt_need not in iiva_lookups:
-                            iiva_lookup = self.iiva.get(
-                                conn,
-                                tmf_r1_contract(self.app.api),
-                                dt_need-timedelta(days=1), # t要取t-1的資料
-                                timedelta(days=5),
-                                interval_min=360
-                            )
-                            iiva_lookups[dt_need] = iiva_lookup
+            # 背景 thread 預先載入之後幾天的 ticks，這裡同時查 iiva
+            for s in self.npy_htm.iter_days(conn, tmf_r1_contract(self.app.api), start, end):
+                slices.append(s.np_slice)
+                days.append(s.date)
+                for i in range (-1,1):
+                    dt_need = s.date + timedelta(days=i)
+                    if dt_need not in iiva_lookups:
+                        iiva_lookup = self.iiva.get(
+                            conn,
+                            tmf_r1_contract(self.app.api),
+                            dt_need-timedelta(days=1), # t要取t-1的資料
+                            timedelta(days=5),
+                            interval_min=360
+                        )
+                        iiva_lookups[dt_need] = iiva_lookup
 
         self.app.shut()
 
-
-        slices: list[NPTicks] = [s.np_slice for s in daily_slices if s.np_slice is not None]
         self.ticks = NPTicks.merge_slices(slices)
         print('ticks load.')
 
@@ -54,10 +59,22 @@ class TrainingContext(BacktestingContext):
 
         data = self.bars or self.ticks
         self.fb = FeatureBuilder(data, iiva_lookups, FeatureConfig())
-        self.features = self.fb.build_features(
-            feature_names,
-            return_mtx=use_feature_mtx,
-        )
+        if use_feature_store:
+            edges = day_edges(data.ts_seconds(), [sl.ts_seconds()[-1] for sl in slices])
+            self.fb.attach_store(feature_store().bind(symbol, days, edges, bar_interval_seconds if gen_bars else 0))
+        if parallel_workers and not use_feature_store:
+            self.features = build_features_parallel(
+                self.fb,
+                feature_names,
+                by=shard_by,
+                workers=parallel_workers,
+                return_mtx=use_feature_mtx,
+            )
+        else:
+            self.features = self.fb.build_features(
+                feature_names,
+                return_mtx=use_feature_mtx,
+            )
         if with_label:
             self.label,self.valid = self.fb.build_label()
 
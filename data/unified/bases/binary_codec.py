@@ -0,0 +1,189 @@
+"""
+Binary codec — MarketDataBase 的固定長度二進位格式 (取代 ':' 串接字串)
+
+layout (little-endian, 無 padding, 與 numpy packed dtype 完全一致):
+    magic   u1   0xB1 (不是合法的 utf-8 開頭，與舊字串格式不會混淆)
+    version u1
+    serial  i4   避免 redis sorted set member 重複
+    fields  ...  依 dataclasses.fields 順序
+
+型別對應:
+    str          S16 (ascii)
+    datetime     i8  unix epoch ns (None -> NAT)
+    bool         ?
+    int          i8  (tick_type / chg_type 為 i1)
+    float        f8
+    Decimal      f8
+    list[...]    DEPTH 格固定長度 + u1 實際長度 ({name}_n)
+
+固定長度的好處是批次處理可以直接 b''.join + np.frombuffer，
+不用逐筆 parse。
+"""
+from dataclasses import MISSING, fields
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+
+from tools.time_utils import datetime_to_epoch_ns, epoch_ns_to_datetime
+
+MAGIC = 0xB1
+VERSION = 1
+DEPTH = 5
+NAT = np.iinfo(np.int64).min
+
+_HEADER = [('magic', 'u1'), ('version', 'u1'), ('serial', '<i4')]
+
+_SCALAR_DTYPES = {
+    str: 'S16',
+    bool: '?',
+    int: '<i8',
+    float: '<f8',
+    Decimal: '<f8',
+}
+
+_LIST_DTYPES = {
+    list[int]: '<i8',
+    list[Decimal]: '<f8',
+}
+
+_NARROW_FIELDS = {
+    'tick_type': 'i1',
+    'chg_type': 'i1',
+}
+
+
+def is_binary(raw: bytes) -> bool:
+    return len(raw) > 1 and raw[0] == MAGIC
+
+
+def _is_datetime(f) -> bool:
+    # MarketDataBase 的 `datetime: datetime = None` 在 class body 中會遮蔽型別名稱，f.type 實際為 None
+    return f.type is datetime or f.name == 'datetime'
+
+
+def _to_decimal(v: float) -> Decimal:
+    # repr 為最短可還原的十進位表示，價格不會多出 0.30000000000000004 這類尾數
+    return Decimal(repr(v))
+
+
+class MarketDataCodec:
+    def __init__(self, cls):
+        self.cls = cls
+        self.fields = fields(cls)
+
+        descr = list(_HEADER)
+        for f in self.fields:
+            if f.type in _LIST_DTYPES:
+                descr.append((f.name, _LIST_DTYPES[f.type], (DEPTH,)))
+                descr.append((f'{f.name}_n', 'u1'))
+            elif _is_datetime(f):
+                descr.append((f.name, '<i8'))
+            elif f.name in _NARROW_FIELDS:
+                descr.append((f.name, _NARROW_FIELDS[f.name]))
+            elif f.type in _SCALAR_DTYPES:
+                descr.append((f.name, _SCALAR_DTYPES[f.type]))
+            else:
+                raise Exception(f'unsupported field type: {cls.__name__}.{f.name}: {f.type}')
+
+        self.dtype = np.dtype(descr)
+        self.itemsize = self.dtype.itemsize
+
+    # ── records ────────────────────────────────────────────────────────────
+
+    def empty_records(self, n: int) -> np.ndarray:
+        """配置 n 筆並填入 dataclass 的預設值"""
+        arr = np.zeros(n, dtype=self.dtype)
+        arr['magic'] = MAGIC
+        arr['version'] = VERSION
+        for f in self.fields:
+            default = None if f.default is MISSING else f.default
+            if f.type in _LIST_DTYPES:
+                continue
+            if _is_datetime(f):
+                arr[f.name] = NAT
+            elif default is not None:
+                arr[f.name] = default.encode('ascii') if f.type is str else default
+        return arr
+
+    def objects_to_records(self, objs: list, serials=None) -> np.ndarray:
+        arr = np.zeros(len(objs), dtype=self.dtype)
+        arr['magic'] = MAGIC
+        arr['version'] = VERSION
+        if serials is not None:
+            arr['serial'] = serials
+
+        for f in self.fields:
+            values = [getattr(o, f.name) for o in objs]
+            if f.type in _LIST_DTYPES:
+                col = arr[f.name]
+                lens = arr[f'{f.name}_n']
+                for i, v in enumerate(values):
+                    if v:
+                        v = v[:DEPTH]
+                        col[i, :len(v)] = [float(_v) for _v in v] if f.type == list[Decimal] else v
+                        lens[i] = len(v)
+            elif _is_datetime(f):
+                arr[f.name] = [NAT if v is None else datetime_to_epoch_ns(v) for v in values]
+            elif f.type is str:
+                arr[f.name] = [(v or '').encode('ascii') for v in values]
+            elif f.type is Decimal:
+                arr[f.name] = [float(v) for v in values]
+            else:
+                arr[f.name] = values
+        return arr
+
+    def records_to_objects(self, arr: np.ndarray) -> list:
+        columns = {}
+        for f in self.fields:
+            col = arr[f.name]
+            if f.type in _LIST_DTYPES:
+                lens = arr[f'{f.name}_n'].tolist()
+                rows = col.tolist()
+                cast = _to_decimal if f.type == list[Decimal] else int
+                columns[f.name] = [[cast(v) for v in row[:n]] for row, n in zip(rows, lens)]
+            elif _is_datetime(f):
+                columns[f.name] = [None if v == NAT else epoch_ns_to_datetime(v) for v in col.tolist()]
+            elif f.type is str:
+                columns[f.name] = [v.decode('ascii') for v in col.tolist()]
+            elif f.type is Decimal:
+                columns[f.name] = [_to_decimal(v) for v in col.tolist()]
+            else:
+                columns[f.name] = col.tolist()
+
+        names = list(columns)
+        return [self.cls(**dict(zip(names, row))) for row in zip(*columns.values())]
+
+    # ── bytes ──────────────────────────────────────────────────────────────
+
+    def encode(self, obj, serial=0) -> bytes:
+        return self.objects_to_records([obj], [serial]).tobytes()
+
+    def decode(self, raw: bytes):
+        return self.records_to_objects(self.decode_records([raw]))[0]
+
+    def encode_records(self, arr: np.ndarray) -> list[bytes]:
+        buf = arr.astype(self.dtype, copy=False).tobytes()
+        n = self.itemsize
+        return [buf[i:i + n] for i in range(0, len(buf), n)]
+
+    def decode_records(self, raws: list[bytes]) -> np.ndarray:
+        """
+        批次解碼為 record array。
+        若混有舊版字串格式 (升級前寫入 redis 的資料)，那幾筆改走舊的 deserialize。
+        """
+        if all(len(r) == self.itemsize and is_binary(r) for r in raws):
+            arr = np.frombuffer(b''.join(raws), dtype=self.dtype)
+            if len(arr) and not (arr['version'] == VERSION).all():
+                raise Exception(f'unsupported codec version: {set(arr["version"].tolist())}, expected {VERSION}')
+            return arr
+
+        arr = np.empty(len(raws), dtype=self.dtype)
+        for i, r in enumerate(raws):
+            if is_binary(r):
+                if len(r) != self.itemsize or r[1] != VERSION:
+                    raise Exception(f'unsupported codec payload: version={r[1]}, size={len(r)}')
+                arr[i] = np.frombuffer(r, dtype=self.dtype)[0]
+            else:
+                arr[i] = self.objects_to_records([self.cls.deserialize(r)])[0]
+        return arr
@@ -4,6 +4,8 @@ from dataclasses import dataclass, fields
 from datetime import datetime
 from decimal import Decimal
 
+from data.unified.bases.binary_codec import MarketDataCodec, is_binary
+from data.unified.bases.sj_converter import build_sj_converter
 from mixins.datetime_comparable_mixin import DatetimeComparableMixin
 from tools.constants import DEFAULT_TIMEZONE
 from tools.utils import decode_redis
@@ -22,6 +24,9 @@ class MarketDataBase(DatetimeComparableMixin, ABC):
         list[Decimal]: lambda v: [Decimal(_v) for _v in v.split(',')],
     }
 
+    # sj_converter 預設複製的欄位，None 為全部
+    SJ_FIELDS = None
+
     SERIALIZE_CASTERS = {
         bool: lambda v: str(1 if v else 0),
         datetime: lambda v: str(v.timestamp()),
@@ -43,8 +48,9 @@ class MarketDataBase(DatetimeComparableMixin, ABC):
 
     @classmethod
     def from_sj(cls, sj_data):
-        if not type(sj_data) == cls._corresponding_sj_type:
-            raise TypeError(f"required {cls._corresponding_sj_type}, but: {type(sj_data)}")
+        sj_type = cls._corresponding_sj_type.fget(None)  # abstract property, 從 class 取值
+        if not type(sj_data) == sj_type:
+            raise TypeError(f"required {sj_type}, but: {type(sj_data)}")
         kwargs = {}
 
         for f in fields(cls):
@@ -52,6 +58,14 @@ class MarketDataBase(DatetimeComparableMixin, ABC):
 
         return cls(**kwargs)
 
+    @classmethod
+    def sj_converter(cls, names=None):
+        """
+        回傳 sj 物件的快速轉換函式 (不檢查型別)，只複製 names (預設 SJ_FIELDS) 指定的欄位，
+        Decimal 欄位轉為 float
+        """
+        return build_sj_converter(cls, names or cls.SJ_FIELDS)
+
     def serialize(self, serial_num=-1, separator=':'):
         values = [str(serial_num)]  # 避免redis key重複
 
@@ -62,8 +76,27 @@ class MarketDataBase(DatetimeComparableMixin, ABC):
 
         return separator.join(values)
 
+    @classmethod
+    def codec(cls) -> MarketDataCodec:
+        codec = _CODECS.get(cls)
+        if codec is None:
+            codec = _CODECS[cls] = MarketDataCodec(cls)
+        return codec
+
+    def to_bytes(self, serial_num=0) -> bytes:
+        """固定長度二進位格式，見 binary_codec"""
+        return self.codec().encode(self, serial_num)
+
+    @classmethod
+    def deserialize_many(cls, raws: list[bytes]) -> list:
+        codec = cls.codec()
+        return codec.records_to_objects(codec.decode_records(raws))
+
     @classmethod
     def deserialize(cls, data: bytes, separator=":"):
+        if isinstance(data, bytes) and is_binary(data):
+            return cls.codec().decode(data)
+
         parts = decode_redis(data).split(separator)
         kwargs = {}
 
@@ -72,3 +105,6 @@ class MarketDataBase(DatetimeComparableMixin, ABC):
             kwargs[f.name] = caster(raw)
 
         return cls(**kwargs)
+
+
+_CODECS: dict[type, MarketDataCodec] = {}
@@ -0,0 +1,64 @@
+"""
+shioaji 物件 → unified dataclass 的快速轉換
+
+MarketDataBase.from_sj 每筆都要跑 dataclasses.fields + getattr + dataclass __init__，
+這裡改為依 (cls, 欄位子集) 產生專用函式:
+    - 只讀取指定欄位，Decimal 轉為 native float
+    - 其餘欄位直接填入預設值 (Decimal 預設值也轉為 float)
+    - 透過 slot descriptor 直接寫入，略過 frozen dataclass 的 __init__ / __setattr__
+"""
+from dataclasses import MISSING, fields
+from decimal import Decimal
+from typing import Any, Callable, Iterable
+
+_converters: dict[tuple[type, tuple[str, ...]], Callable[[Any], Any]] = {}
+
+
+def _native_default(default):
+    if isinstance(default, Decimal):
+        return float(default)
+    return default
+
+
+def _value_expr(f) -> str:
+    src = f'sj.{f.name}'
+    if f.type in (Decimal, float):
+        return f'_float({src})'
+    if f.type == list[Decimal]:
+        return f'list(_map(_float, {src}))'
+    return src
+
+
+def build_sj_converter(cls, names: Iterable[str] = None) -> Callable[[Any], Any]:
+    """
+    :param cls: MarketDataBase 的子類別
+    :param names: 要從 shioaji 物件複製的欄位，None 表示全部
+    """
+    all_fields = fields(cls)
+    names = tuple(f.name for f in all_fields) if names is None else tuple(names)
+
+    key = (cls, names)
+    if key in _converters:
+        return _converters[key]
+
+    unknown = set(names) - {f.name for f in all_fields}
+    if unknown:
+        raise Exception(f'unknown fields for {cls.__name__}: {unknown}')
+
+    ns = {'_cls': cls, '_new': object.__new__, '_float': float, '_map': map}
+    lines = ['def convert(sj):', '    o = _new(_cls)']
+    for f in all_fields:
+        ns[f'_set_{f.name}'] = getattr(cls, f.name).__set__
+        if f.name in names:
+            lines.append(f'    _set_{f.name}(o, {_value_expr(f)})')
+        else:
+            ns[f'_default_{f.name}'] = _native_default(None if f.default is MISSING else f.default)
+            lines.append(f'    _set_{f.name}(o, _default_{f.name})')
+    lines.append('    return o')
+
+    exec('\n'.join(lines), ns)
+    convert = ns['convert']
+    convert.__qualname__ = f'{cls.__name__}.sj_converter'
+
+    _converters[key] = convert
+    return convert
@@ -16,6 +16,9 @@ class BidAskFOP(BidAskBase):
     first_derived_ask_vol: int = -1
     underlying_price: Decimal = Decimal(-1)
 
+    SJ_FIELDS = ('code', 'datetime', 'simtrade', 'bid_price', 'bid_volume', 'ask_price', 'ask_volume',
+                 'bid_total_vol', 'ask_total_vol', 'underlying_price')
+
     @property
     def _corresponding_sj_type(self):
         return BidAskFOPv1
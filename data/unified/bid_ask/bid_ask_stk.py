@@ -10,6 +10,9 @@ class BidAskSTK(BidAskBase):
     suspend: bool = False
     intraday_odd: bool = False
 
+    SJ_FIELDS = ('code', 'datetime', 'simtrade', 'bid_price', 'bid_volume', 'ask_price', 'ask_volume',
+                 'suspend', 'intraday_odd')
+
     @property
     def _corresponding_sj_type(self):
         return BidAskSTKv1
@@ -10,6 +10,9 @@ from data.unified.bases.tick_base import TickBase
 class TickFOP(TickBase):
     underlying_price: Decimal = Decimal(-1)
 
+    SJ_FIELDS = ('code', 'datetime', 'simtrade', 'close', 'volume', 'total_volume', 'tick_type',
+                 'bid_side_total_vol', 'ask_side_total_vol', 'underlying_price')
+
     @property
     def _corresponding_sj_type(self):
         return TickFOPv1
@@ -14,6 +14,9 @@ class TickSTK(TickBase):
     suspend: bool = False
     intraday_odd: bool = False
 
+    SJ_FIELDS = ('code', 'datetime', 'simtrade', 'close', 'volume', 'total_volume', 'tick_type',
+                 'bid_side_total_vol', 'ask_side_total_vol', 'suspend', 'intraday_odd')
+
     @property
     def _corresponding_sj_type(self):
         return TickSTKv1
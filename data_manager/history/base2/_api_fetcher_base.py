@@ -1,12 +1,12 @@
 from abc import abstractmethod, ABC
 from bisect import bisect_left, bisect_right
-from concurrent.futures.thread import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 from queue import Queue
 from threading import Thread
 
 from psycopg import Connection
 
+from data_manager.history.common._fetch_scheduler import FetchScheduler
 from data_manager.history.statics.base._history_data_spec import _HistoryDataSpec
 from data_manager.history.common._npy_binary_packer import npy_pack
 from data_manager.history.common._partition_creator import create_partition_table_2
@@ -47,24 +47,35 @@ class _ApiFetcherBase[D:_NpDataBase](ABC):
         conn.commit()
 
     def fetch(self, conn: Connection, contract, dates: set[date]) -> dict[date, D]:
+        """
+        依 FetchScheduler 限流 / 自動調整併發 / 重試抓取；抓到的每一天由 db thread 寫入 DB 與 memo。
+        有日期失敗 (或流量不足而跳過) 時，已寫入的日期保留，拋出例外，重跑時只會抓剩下的日期。
+        """
         symbol = contract.symbol
         self._create_partition(conn, dates)
 
-        data_queue = Queue(maxsize=5)
-        db_thread = Thread(target=self._to_db, args=(conn, symbol, data_queue))
+        scheduler = FetchScheduler(usage_fn=self._api.usage, logger=self._logger)
+        data_queue = Queue(maxsize=scheduler.max_concurrency)
+        db_errors: list[Exception] = []
+        db_thread = Thread(target=self._to_db, args=(conn, symbol, data_queue, db_errors))
         db_thread.start()
 
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = {dt: executor.submit(self._fetch_single, contract, dt, data_queue) for dt in dates}
-        for k, v in futures.items():
-            futures[k] = v.result()[1]
-
-        data_queue.put(None)
-
-        db_thread.join()
-        data_queue.join()
-
-        return futures
+        try:
+            results, failures = scheduler.run(
+                sorted(dates),
+                lambda dt: self._fetch_single(contract, dt, data_queue)[1],
+            )
+        finally:
+            data_queue.put(None)
+            db_thread.join()
+
+        if db_errors:
+            raise db_errors[0]
+        if failures:
+            detail = ', '.join(f'{dt}: {e!r}' for dt, e in sorted(failures.items()))
+            raise Exception(f'{len(failures)}/{len(dates)} dates not fetched ({detail}). '
+                            f'fetched dates are saved, run again to resume.')
+        return results
 
     def _fetch_single(self, contract, start: date, data_queue: Queue):
         raw: D = self._fetch_from_api(contract, start)
@@ -97,34 +108,41 @@ class _ApiFetcherBase[D:_NpDataBase](ABC):
         data_queue.put(single)
         return single
 
-    def _to_db(self, conn: Connection, symbol: str, data_queue: Queue):
+    def _to_db(self, conn: Connection, symbol: str, data_queue: Queue, errors: list[Exception]):
         while True:
             item: None | tuple = data_queue.get()
             if item is None:
                 data_queue.task_done()
                 break
+            if errors:  # 寫入失敗後只把 queue 清空，不讓抓取端卡在 put
+                data_queue.task_done()
+                continue
 
             dt: date
             np_data: D
             dt, np_data = item
 
-            with conn.cursor() as cur:
-                with cur.copy(self.copy_tick_sql) as copy:
-                    if np_data:
-                        copy.write(_ApiFetcherBase.COPY_BINARY_HEADER)
-                        npy_bytes = npy_pack(symbol, np_data, self._data_spec.field_enum)
-                        copy.write(npy_bytes)
-                        copy.write(_ApiFetcherBase.COPY_BINARY_TRAILER)
-                        self._logger.info(f'({symbol}, {dt.strftime('%Y-%m-%d')}): {len(np_data.ts)} items.')
-                        self._logger.info(
-                            f'range: {pg_us_to_datetime(np_data.ts[0])} to {pg_us_to_datetime(np_data.ts[-1])}'
-                        )
-                    else:
-                        self._logger.info('no tick has been written.')
-
-                cur.execute(self.insert_memo_sql, (dt, symbol))
-
-            conn.commit()
+            try:
+                with conn.cursor() as cur:
+                    with cur.copy(self.copy_tick_sql) as copy:
+                        if np_data:
+                            copy.write(_ApiFetcherBase.COPY_BINARY_HEADER)
+                            npy_bytes = npy_pack(symbol, np_data, self._data_spec.field_enum)
+                            copy.write(npy_bytes)
+                            copy.write(_ApiFetcherBase.COPY_BINARY_TRAILER)
+                            self._logger.info(f'({symbol}, {dt.strftime('%Y-%m-%d')}): {len(np_data.ts)} items.')
+                            self._logger.info(
+                                f'range: {pg_us_to_datetime(np_data.ts[0])} to {pg_us_to_datetime(np_data.ts[-1])}'
+                            )
+                        else:
+                            self._logger.info('no tick has been written.')
+
+                    cur.execute(self.insert_memo_sql, (dt, symbol))
+
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                errors.append(e)
             data_queue.task_done()
 
     @property
@@ -1,47 +1,174 @@
+import os
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
-from psycopg import Connection
+import numpy as np
+from psycopg import Connection, sql
+from psycopg_pool import ConnectionPool
 
-from data_manager.history.common._npy_binary_packer import npy_unpack
+from data_manager.history.common._db_pool import db_pool
+from data_manager.history.common._npy_binary_packer import npy_unpack, row_itemsize
 from data_manager.history.statics.base._history_data_spec import _HistoryDataSpec
 from data_manager.history.statics.base._np_data_base import _NpDataBase
 from tools.logger.custom_logger import CustomLogger
 
+COPY_HEADER_LEN = 19  # PGCOPY\n\377\r\n\0 (11) + flags (4) + header extension length (4)
+COPY_TRAILER_LEN = 2  # -1 (int16)
+INITIAL_ROWS_PER_DAY = 1 << 12  # 還沒讀過資料時的每天預估列數
+MAX_PREALLOC_BYTES = 1 << 28  # 單次 COPY 預先配置的上限 (256 MiB)，超過的部分靠加倍成長
+
 
 class _DbLoaderBase[D:_NpDataBase](ABC):
-    def __init__(self, data_spec: _HistoryDataSpec):
+    def __init__(self, data_spec: _HistoryDataSpec, pool: ConnectionPool = None, range_batch: bool = None):
+        """
+        :param pool: 多天讀取時每天從 pool 取一條連線平行 COPY，None 則用共用的 db_pool()
+        :param range_batch: True 時連續的日期合併成一個 COPY (整段時間範圍)，client 端再依每天的
+            daily_time_range 用 np.searchsorted 切開；None 依 env DB_LOADER_RANGE_BATCH ('1' 開啟)
+        """
         self._logger = CustomLogger.get_logger(f'{data_spec.logger_prefix}_db_loader')
         self._data_spec = data_spec
+        self._pool = pool
+        if range_batch is None:
+            range_batch = os.getenv('DB_LOADER_RANGE_BATCH') == '1'
+        self._range_batch = range_batch
+        self._itemsize = row_itemsize(data_spec.field_enum)
+        self._rows_per_day: int | None = None  # 每天列數的移動平均，第一次 COPY 後才有
+
+        where = sql.SQL("FROM {table} WHERE symbol = %s AND ts BETWEEN %s AND %s").format(
+            table=sql.Identifier(data_spec.table_name)
+        )
+        self._copy_sql = sql.SQL("COPY (SELECT {fields} {where} ORDER BY ts ASC) TO STDIN (FORMAT BINARY)").format(
+            fields=sql.SQL(', ').join(map(sql.Identifier, data_spec.field_enum.names())),
+            where=where,
+        )
+        # 時間邊界交給 server 換算成 COPY BINARY 的 ts (2000-01-01 UTC 起算的微秒)，與 WHERE 的時區解讀一致
+        self._pg_us_sql = sql.SQL(
+            "SELECT (extract(epoch FROM t::timestamptz - '2000-01-01 00:00:00+00'::timestamptz) * 1000000)::bigint "
+            "FROM unnest(%s::text[]) WITH ORDINALITY AS b(t, i) ORDER BY i"
+        )
 
-    def copy_stmt(self, symbol, dt):
+    def _time_range(self, dt: date) -> tuple[str, str]:
         l, r = self._data_spec.daily_time_range(dt)
-        l = l.strftime("%Y-%m-%d %H:%M:%S")
-        r = r.strftime("%Y-%m-%d %H:%M:%S")
-        return f"""
-            COPY (
-                SELECT {', '.join(self._data_spec.field_enum.names())} 
-                FROM {self._data_spec.table_name}
-                WHERE symbol='{symbol}' and ts between '{l}' and '{r}'
-                ORDER BY ts ASC
-            )TO STDIN (FORMAT BINARY)
-        """
+        return l.strftime("%Y-%m-%d %H:%M:%S"), r.strftime("%Y-%m-%d %H:%M:%S")
 
-    def load(self, conn: Connection, symbol, dates: set[date]) -> dict[date, D]:
-        data = {}
+    def copy_stmt(self, symbol, dt) -> tuple[sql.Composed, tuple]:
+        return self._copy_sql, (symbol, *self._time_range(dt))
+
+    @property
+    def pool(self) -> ConnectionPool | None:
+        return self._pool or db_pool()
 
+    def load(self, conn: Connection, symbol, dates: set[date]) -> dict[date, D]:
+        """
+        單日 (或沒有 pool) 時在 conn 上依序讀取；多日時每個工作一個 worker 從 pool 取連線平行 COPY，
+        worker 數 = pool 大小 (DB_POOL_SIZE)，讀取速度隨 DB server 核心數擴展。
+        range_batch 時一個工作是一段連續日期 (一個 COPY)，否則是一天。
+        """
         if not dates:
-            return data
+            return {}
+
+        dates = sorted(dates)
+        pool = self.pool if len(dates) > 1 else None
+        workers = min(pool.max_size, len(dates)) if pool else 1
+
+        if self._range_batch:
+            jobs = self._contiguous_runs(dates, -(-len(dates) // workers))
+            load_job = self._load_run
+        else:
+            jobs = dates
+            load_job = self._load_single
+
+        if pool is None:
+            results = [load_job(conn, symbol, job) for job in jobs]
+        else:
+            def load_pooled(job):
+                with pool.connection() as pooled_conn:
+                    return load_job(pooled_conn, symbol, job)
 
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(load_pooled, jobs))
+
+        if self._range_batch:
+            return {dt: np_data for run_data in results for dt, np_data in run_data.items()}
+        return dict(zip(dates, results))
+
+    @staticmethod
+    def _contiguous_runs(dates: list[date], max_len: int) -> list[list[date]]:
+        """排序後的日期切成連續 (逐日) 的段落，每段最多 max_len 天，讓平行讀取時每個 worker 都有工作"""
+        runs = []
+        for dt in dates:
+            if runs and (dt - runs[-1][-1]).days == 1 and len(runs[-1]) < max_len:
+                runs[-1].append(dt)
+            else:
+                runs.append([dt])
+        return runs
+
+    def _load_single(self, conn: Connection, symbol, dt: date) -> D:
+        query, params = self.copy_stmt(symbol, dt)
+        np_data, n_chunks, n_bytes = self._copy(conn, query, params)
+        self._logger.info(f'{dt.strftime("%Y-%m-%d")}: {n_chunks} chucks read. {n_bytes} bytes.')
+        return np_data
+
+    def _load_run(self, conn: Connection, symbol, run: list[date]) -> dict[date, D]:
+        """整段 [第一天 left, 最後一天 right] 一個 COPY，再依每天的時間範圍切成 views (不複製)"""
+        ranges = [self._time_range(dt) for dt in run]
         with conn.cursor() as cur:
-            for dt in dates:
-                sql = self.copy_stmt(symbol, dt)
-                with cur.copy(sql) as copy:
-                    chunks = []
-                    while chunk := copy.read():
-                        chunks.append(chunk)
-                    raw = b''.join(chunks)
-                    self._logger.info(f'{dt.strftime("%Y-%m-%d")}: {len(chunks)} chucks read. {len(raw)} bytes.')
-                    np_data = npy_unpack(self._data_spec.field_enum, self._data_spec.np_data_type, raw[19:-2])
-                    data[dt] = np_data
-        return data
+            cur.execute(self._pg_us_sql, ([t for rng in ranges for t in rng],))
+            bounds = np.array([row[0] for row in cur.fetchall()], dtype=np.int64)
+
+        np_data, n_chunks, n_bytes = self._copy(
+            conn, self._copy_sql, (symbol, ranges[0][0], ranges[-1][1]), n_days=len(run)
+        )
+        self._logger.info(
+            f'{run[0].strftime("%Y-%m-%d")} ~ {run[-1].strftime("%Y-%m-%d")}: {n_chunks} chucks read. {n_bytes} bytes.'
+        )
+
+        # between 兩端都包含：左界取 left、右界取 right
+        lefts = np.searchsorted(np_data.ts, bounds[0::2], side='left')
+        rights = np.searchsorted(np_data.ts, bounds[1::2], side='right')
+        names = self._data_spec.field_enum.names()
+        return {
+            dt: self._data_spec.np_data_type(**{f: np_data.__dict__[f][l:r] for f in names})
+            for dt, l, r in zip(run, lefts, rights)
+        }
+
+    def _copy(self, conn: Connection, query, params, n_days: int = 1) -> tuple[D, int, int]:
+        """
+        依預估列數 (每天列數的移動平均 × 天數，上限 MAX_PREALLOC_BYTES) 配置 buffer，
+        COPY 的 chunk 直接寫入 buffer，不經過 b''.join 的複製；不足時加倍，讀完後把多配置的部分還回去。
+        不先 count(*)：那會對同一個範圍多掃一次
+        :return: (資料, chunk 數, bytes 數)
+        """
+        est_rows = (self._rows_per_day or INITIAL_ROWS_PER_DAY) * n_days
+        est_bytes = COPY_HEADER_LEN + est_rows * self._itemsize + COPY_TRAILER_LEN
+        buf = np.empty(min(est_bytes, MAX_PREALLOC_BYTES), dtype=np.uint8)
+
+        pos = 0
+        n_chunks = 0
+        with conn.cursor() as cur:
+            with cur.copy(query, params) as copy:
+                while chunk := copy.read():
+                    end = pos + len(chunk)
+                    if end > len(buf):  # 超出預估
+                        grown = np.empty(max(end, 2 * len(buf)), dtype=np.uint8)
+                        grown[:pos] = buf[:pos]
+                        buf = grown
+                    buf[pos:end] = np.frombuffer(chunk, dtype=np.uint8)
+                    pos = end
+                    n_chunks += 1
+
+        n_rows = max(pos - COPY_HEADER_LEN - COPY_TRAILER_LEN, 0) // self._itemsize
+        rows_per_day = -(-n_rows // n_days)
+        if self._rows_per_day is None:
+            self._rows_per_day = rows_per_day
+        else:
+            self._rows_per_day = (self._rows_per_day + rows_per_day + 1) // 2
+        buf.resize(pos, refcheck=False)  # 縮小 (realloc)，回傳的欄位是 buf 的 view，不留多配置的部分
+
+        np_data = npy_unpack(
+            self._data_spec.field_enum,
+            self._data_spec.np_data_type,
+            buf[COPY_HEADER_LEN:pos - COPY_TRAILER_LEN],
+        )
+        return np_data, n_chunks, pos
@@ -1,7 +1,11 @@
+import os
 from abc import ABC
+from contextlib import ExitStack
 from datetime import date
 from functools import cache, lru_cache
-from typing import ClassVar
+from queue import Full, Queue
+from threading import Event, Thread
+from typing import ClassVar, Iterator
 
 from psycopg import Connection
 
@@ -10,18 +14,39 @@ from data_manager.history.statics.base._field_base import _FieldBase
 from data_manager.history.statics.base._history_data_spec import _HistoryDataSpec
 from data_manager.history.statics.base._np_data_base import _NpDataBase
 from data_manager.history.statics.data import DailySlice
-from qclaw.backtesting.npy_cache import CacheState
+from qclaw.backtesting.npy_cache import CacheState, MmapMode
 from qclaw.backtesting.npy_cache.npy_cache_manager import npy_cache_manager
+from qclaw.backtesting.npy_cache.packed_cache_manager import packed_cache_manager
 from tools.date_range_utils import enumerate_dates_set_by_range
 
 
+_END = object()  # iter_days 背景 thread 結束的 sentinel
+
+
 class _NpyCachedDataManagerBase[D:_NpDataBase](ABC):
+    """
+    快取後端:
+        packed : 每個 (symbol, kind, date) 一個檔案 (PackedCacheManager)，預設
+        npy    : 每個欄位一個 .npy (NpyCacheManager)，舊格式
+    寫入依 backend (env NPY_CACHE_BACKEND)；讀取先找 packed，沒有再找舊格式，兩種可混用。
+    舊快取可用 qclaw/backtesting/npy_cache/migrate_to_packed.py 轉換。
+    """
     _cache_key_infix: ClassVar[str]
 
-    def __init__(self, data_spec: _HistoryDataSpec, data_manager):
+    def __init__(self, data_spec: _HistoryDataSpec, data_manager, mmap_mode: MmapMode | None = None,
+                 backend: str = None):
+        """
+        :param mmap_mode: 快取命中的欄位以 np.memmap 開啟 ("r" 唯讀 / "c" copy-on-write)，None 則整個讀入記憶體
+        :param backend: 'packed' | 'npy'，None 依 env NPY_CACHE_BACKEND (預設 packed)
+        """
         self._data_spec = data_spec
         self._data_manager = data_manager
         self._npy_cache = npy_cache_manager
+        self._packed_cache = packed_cache_manager
+        self._mmap_mode = mmap_mode
+        self._backend = backend or os.getenv('NPY_CACHE_BACKEND', 'packed')
+        if self._backend not in ('packed', 'npy'):
+            raise Exception(f'unknown npy cache backend: {self._backend}')
 
     @classmethod
     @cache
@@ -30,23 +55,92 @@ class _NpyCachedDataManagerBase[D:_NpDataBase](ABC):
         dt_str = dt.strftime("%Y-%m-%d")
         return f"{symbol}.{cls._cache_key_infix}.{dt_str}.{field}"  # StrEnum auto-converts to str
 
-    def _load_from_npy(self, symbol: str, dt: date) -> tuple[CacheState, D]:
+    @classmethod
+    @cache
+    def _packed_key(cls, symbol: str, dt: date) -> str:
+        """Generate packed cache key: symbol.tick.date"""
+        return f"{symbol}.{cls._cache_key_infix}.{dt.strftime('%Y-%m-%d')}"
+
+    def _load_from_npy(self, symbol: str, dt: date, mmap_mode: MmapMode | None = None) -> tuple[CacheState, D]:
         """Load TickSlice from npy cache. Returns None if not cached."""
+        packed_key = self._packed_key(symbol, dt)
+        columns = self._packed_cache.get(packed_key, mmap_mode=mmap_mode)
+        if columns is not None:
+            return CacheState.HIT, self._data_spec.np_data_type(
+                **{f: columns[f] for f in self._data_spec.field_enum.names()}
+            )
+        if self._packed_cache.has_empty(packed_key):
+            return CacheState.EMPTY, None
+
         time_key = self._key(symbol, dt, self._data_spec.field_enum.TS)
         cache_state = self._npy_cache.is_cached(time_key)
 
         if cache_state == CacheState.HIT:
             return cache_state, self._data_spec.np_data_type(
-                **{f: self._npy_cache.get(self._key(symbol, dt, f)) for f in self._data_spec.field_enum}
+                **{f: self._npy_cache.get(self._key(symbol, dt, f), mmap_mode) for f in self._data_spec.field_enum}
             )
         return cache_state, None
 
     def _save_to_npy(self, symbol: str, dt: date, slice_: D) -> None:
-        """Save TickSlice to npy cache (one file per field per day)."""
+        """Save TickSlice to the configured cache backend."""
         raw = slice_.__dict__
+        if self._backend == 'packed':
+            self._packed_cache.set(self._packed_key(symbol, dt), {f: raw[f] for f in self._data_spec.field_enum.names()})
+            return
         for f in self._data_spec.field_enum.names():
             self._npy_cache.set(self._key(symbol, dt, f), raw[f])
 
+    def _mark_empty(self, symbol: str, dt: date) -> None:
+        if self._backend == 'packed':
+            self._packed_cache.mark_empty(self._packed_key(symbol, dt))
+        else:
+            self._npy_cache.mark_empty(self._key(symbol, dt, self._data_spec.field_enum.TS))
+
+    def missing_dates(self, symbol: str, start: date, end: date) -> list[date]:
+        """尚未快取 (非 hit 也非 empty) 的日期，只查 manifest 不掃檔案"""
+        range_check(start, end)
+        dates = sorted(enumerate_dates_set_by_range(start, end))
+        packed_missing = set(self._packed_cache.missing([self._packed_key(symbol, dt) for dt in dates]))
+        candidates = [dt for dt in dates if self._packed_key(symbol, dt) in packed_missing]
+        ts_field = self._data_spec.field_enum.TS
+        npy_missing = set(self._npy_cache.missing([self._key(symbol, dt, ts_field) for dt in candidates]))
+        return [dt for dt in candidates if self._key(symbol, dt, ts_field) in npy_missing]
+
+    def _fetch_and_save(self, conn: Connection, contract, missed_dates: set[date]) -> dict[date, D | None]:
+        """
+        single-flight: 持有各缺少日期的 file lock 才向 DB/API 抓取並寫入快取，
+        同時間其他 process (或 thread) 對同一天的 get 會等鎖，拿到鎖後直接讀快取。
+        鎖依日期排序取得，避免交錯的日期區間互相 deadlock。
+        """
+        symbol = contract.symbol
+        result: dict[date, D | None] = {}
+        with ExitStack() as stack:
+            for dt in sorted(missed_dates):
+                stack.enter_context(self._packed_cache.lock(self._packed_key(symbol, dt)))
+
+            # 等鎖期間可能已由其他 process 寫入
+            to_fetch = set()
+            for dt in missed_dates:
+                cache_state, np_data = self._load_from_npy(symbol, dt, self._mmap_mode)
+                if cache_state == CacheState.MISS:
+                    to_fetch.add(dt)
+                else:
+                    result[dt] = np_data
+
+            if not to_fetch:
+                return result
+
+            date_to_history_ticks: dict[date, D] = self._data_manager.get_ticks(conn, contract, dates=to_fetch)
+            for dt, np_data in date_to_history_ticks.items():
+                if dt not in to_fetch:
+                    continue
+                if np_data:
+                    self._save_to_npy(symbol, dt, np_data)
+                else:
+                    self._mark_empty(symbol, dt)
+                result[dt] = np_data
+        return result
+
     def get(self, conn: Connection, contract, start, end) -> list[DailySlice]:
         """Get tick data for date range.
 
@@ -74,34 +168,96 @@ class _NpyCachedDataManagerBase[D:_NpDataBase](ABC):
         missed_dates = set()
         for dt in dates:
             # Try npy cache first
-            cache_state, np_data = self._load_from_npy(symbol, dt)
+            cache_state, np_data = self._load_from_npy(symbol, dt, self._mmap_mode)
 
             if cache_state == CacheState.MISS:
                 missed_dates.add(dt)
             else:
                 date_to_npy_slice[dt] = np_data
 
-        results = []
-
         if missed_dates:
-            date_to_history_ticks: dict[date, D] = self._data_manager.get_ticks(conn, contract, dates=missed_dates)
-        else:
-            date_to_history_ticks = []
+            date_to_npy_slice.update(self._fetch_and_save(conn, contract, missed_dates))
 
+        results = []
         for dt in sorted(list(dates)):  # 需依照順序
-            if dt in date_to_npy_slice:
-                if date_to_npy_slice[dt]:
-                    results.append(DailySlice[D](dt, date_to_npy_slice[dt]))
-            elif dt in date_to_history_ticks:
-                np_data = date_to_history_ticks[dt]
-                if np_data:
-                    results.append(DailySlice[D](dt, np_data))
-                    self._save_to_npy(symbol, dt, np_data)
-                else:
-                    self._npy_cache.mark_empty(self._key(symbol, dt, self._data_spec.field_enum.TS))
-            else:
+            if dt not in date_to_npy_slice:
                 raise Exception(f"neither in npy cache nor {self._data_spec.table_name} with date {dt}.")
+            if date_to_npy_slice[dt]:
+                results.append(DailySlice[D](dt, date_to_npy_slice[dt]))
 
         if not results:
             return []
         return results
+
+    def iter_days(self, conn: Connection, contract, start, end, prefetch: int = 2) -> Iterator[DailySlice[D]]:
+        """逐日 yield DailySlice (依日期排序、略過空日)，與 get 結果相同但不一次載入整個區間。
+
+        背景 thread 先讀之後 prefetch 天 (快取讀取，未命中則向 DB/API 抓取並寫入快取)，
+        呼叫端處理第 N 天時第 N+1..N+prefetch 天已在載入，記憶體中最多約 prefetch + 2 天的資料。
+        未命中的日期會連同接下來 prefetch 天內同樣未命中的日期一起抓取 (一次 get_ticks)。
+
+        背景 thread 會使用 conn 抓取缺少的日期 (psycopg 連線內部有鎖，與呼叫端共用會互相排隊)。
+        背景 thread 的例外會在呼叫端的迭代中重新拋出；提早結束迭代 (break / close) 會停止背景 thread。
+
+        Parameters
+        ----------
+        prefetch : int
+            預先載入的天數 (>= 1)
+        """
+        range_check(start, end)
+        if prefetch < 1:
+            raise Exception(f'prefetch must be >= 1, got {prefetch}')
+        symbol = contract.symbol
+        dates = sorted(enumerate_dates_set_by_range(start, end))
+        missed = set(self.missing_dates(symbol, start, end))
+
+        queue: Queue = Queue(maxsize=prefetch)
+        stop = Event()
+
+        def put(item) -> bool:
+            # 呼叫端已停止迭代時不要永遠卡在滿的 queue 上
+            while not stop.is_set():
+                try:
+                    queue.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    pass
+            return False
+
+        def produce():
+            fetched: dict[date, D | None] = {}
+            try:
+                for i, dt in enumerate(dates):
+                    if stop.is_set():
+                        return
+                    if dt in fetched:
+                        np_data = fetched.pop(dt)
+                    else:
+                        cache_state, np_data = self._load_from_npy(symbol, dt, self._mmap_mode)
+                        if cache_state == CacheState.MISS:
+                            batch = {d for d in dates[i + 1:i + 1 + prefetch] if d in missed} | {dt}
+                            fetched.update(self._fetch_and_save(conn, contract, batch))
+                            if dt not in fetched:
+                                raise Exception(
+                                    f"neither in npy cache nor {self._data_spec.table_name} with date {dt}."
+                                )
+                            np_data = fetched.pop(dt)
+                    if np_data and not put(DailySlice[D](dt, np_data)):
+                        return
+                put(_END)
+            except BaseException as e:
+                put(e)
+
+        thread = Thread(target=produce, name=f'iter-days-{symbol}', daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            thread.join()
@@ -0,0 +1,27 @@
+"""
+共用的 psycopg ConnectionPool，給 _DbLoaderBase 平行 COPY 讀取用 (與 App.engine 同一個 DB_URL)。
+
+大小: env DB_POOL_SIZE，預設 CPU 數 (最多 8)；<= 1 或沒有 DB_URL 時不建立 pool，改為單一連線依序讀取。
+"""
+import atexit
+import os
+from functools import cache
+
+from dotenv import load_dotenv
+from psycopg_pool import ConnectionPool
+from sqlalchemy import make_url
+
+
+@cache
+def db_pool() -> ConnectionPool | None:
+    load_dotenv()
+    db_url = os.getenv('DB_URL')
+    size = int(os.getenv('DB_POOL_SIZE', min(os.cpu_count() or 1, 8)))
+    if not db_url or size <= 1:
+        return None
+
+    # sqlalchemy 的 postgresql+psycopg://... 轉成 libpq 認得的 postgresql://...
+    conninfo = make_url(db_url).set(drivername='postgresql').render_as_string(hide_password=False)
+    pool = ConnectionPool(conninfo, min_size=1, max_size=size, name='history-db-loader', open=True)
+    atexit.register(pool.close)
+    return pool
@@ -0,0 +1,248 @@
+"""
+歷史資料 API 抓取排程，_ApiFetcherBase.fetch 用。
+
+TokenBucket    : 對應 shioaji 行情查詢限制 (ticks / kbars / snapshots 等合計 5 秒上限 50 次)。
+                 容量 5、每秒補 9 個 → 任意 5 秒內最多 5 + 9 × 5 = 50 次，所有 fetcher 共用 sj_quote_bucket
+FetchScheduler : 併發數依延遲與錯誤自動調整 (AIMD)：
+                    延遲穩定時每完成 limit 個請求 limit + 1
+                    出錯或延遲超過平均的 LATENCY_SPIKE 倍時 limit 減半
+                 失敗以指數退避 + full jitter 重試；每 usage_check_every 個請求查一次 api.usage()，
+                 剩餘流量低於 min_remaining_bytes 時不再排程新的項目。
+
+進度保存沿用既有機制：每天寫入 DB 時同一個 transaction 寫入 memo，中斷後重跑只會抓 memo 沒有的日期。
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Callable, Hashable
+
+from tools.logger.custom_logger import CustomLogger
+
+LATENCY_SPIKE = 2.0
+_EWMA_ALPHA = 0.2
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        """
+        :param rate: 每秒補充的 token 數
+        :param capacity: 最多累積的 token 數 (瞬間 burst 上限)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """取得一個 token，不足時 sleep 到補滿為止；回傳等待秒數"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+sj_quote_bucket = TokenBucket(
+    rate=float(os.getenv('SJ_QUOTE_RATE', 9)),
+    capacity=int(os.getenv('SJ_QUOTE_BURST', 5)),
+)
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+@dataclass
+class FetchStats:
+    started: float = field(default_factory=time.monotonic)
+    done: int = 0
+    failed: int = 0
+    skipped: int = 0
+    retries: int = 0
+    errors: int = 0
+    throttled_s: float = 0.0
+    latency_ewma: float = None
+    limit: int = 0
+    peak_limit: int = 0
+
+    def as_dict(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            'done': self.done,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'retries': self.retries,
+            'errors': self.errors,
+            'elapsed_s': round(elapsed, 2),
+            'req_per_s': round(self.done / elapsed, 2) if elapsed > 0 else 0.0,
+            'latency_ewma_s': round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            'throttled_s': round(self.throttled_s, 2),
+            'limit': self.limit,
+            'peak_limit': self.peak_limit,
+        }
+
+
+class FetchScheduler:
+    def __init__(
+            self,
+            bucket: TokenBucket = sj_quote_bucket,
+            initial_concurrency: int = 5,
+            min_concurrency: int = 1,
+            max_concurrency: int = 16,
+            max_retries: int = 4,
+            backoff_base: float = 1.0,
+            backoff_cap: float = 30.0,
+            usage_fn: Callable = None,
+            usage_check_every: int = 20,
+            min_remaining_bytes: int = None,
+            logger: Logger = None,
+    ):
+        """
+        :param usage_fn: 回傳 shioaji UsageStatus (有 remaining_bytes) 的函式，通常是 api.usage
+        :param min_remaining_bytes: 剩餘流量低於此值就停止，None 依 env SJ_MIN_REMAINING_BYTES (預設 50 MB)
+        """
+        self._bucket = bucket
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_cap = backoff_cap
+        self._usage_fn = usage_fn
+        self._usage_check_every = usage_check_every
+        if min_remaining_bytes is None:
+            min_remaining_bytes = int(os.getenv('SJ_MIN_REMAINING_BYTES', 50 * 1024 * 1024))
+        self._min_remaining_bytes = min_remaining_bytes
+        self._logger = logger or CustomLogger.get_logger('fetch_scheduler')
+
+        self._cond = threading.Condition()
+        self._limit = max(min_concurrency, min(initial_concurrency, max_concurrency))
+        self._in_flight = 0
+        self._streak = 0  # 連續成功且延遲正常的請求數
+        self._requests = 0
+        self._stop_reason: str = None
+        self.stats = FetchStats(limit=self._limit, peak_limit=self._limit)
+
+    def run[K: Hashable, R](self, items: list[K], fn: Callable[[K], R]) -> tuple[dict[K, R], dict[K, Exception]]:
+        """
+        對每個 item 執行 fn (重試、限流、併發控制)。
+        :return: (成功結果, 失敗或因流量不足而跳過的 item → 例外)
+        """
+        results: dict[K, R] = {}
+        failures: dict[K, Exception] = {}
+
+        def task(item: K):
+            try:
+                results[item] = self._run_one(item, fn)
+            except Exception as e:
+                failures[item] = e
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            for item in items:
+                executor.submit(task, item)
+
+        self.stats.failed = sum(not isinstance(e, QuotaExhausted) for e in failures.values())
+        self.stats.skipped = len(failures) - self.stats.failed
+        self._logger.info(f'fetch finished: {self.stats.as_dict()}')
+        return results, failures
+
+    def _run_one[K, R](self, item: K, fn: Callable[[K], R]) -> R:
+        attempt = 0
+        while True:
+            self._enter()
+            try:
+                throttled = self._bucket.acquire()
+                with self._cond:
+                    self.stats.throttled_s += throttled
+                st = time.monotonic()
+                try:
+                    result = fn(item)
+                except Exception as e:
+                    self._on_error(item, e)
+                    if attempt >= self._max_retries:
+                        raise
+                else:
+                    self._on_success(time.monotonic() - st)
+                    return result
+            finally:
+                self._leave()
+
+            # 退避期間不佔併發名額
+            attempt += 1
+            with self._cond:
+                self.stats.retries += 1
+            time.sleep(random.uniform(0, min(self._backoff_cap, self._backoff_base * 2 ** attempt)))
+
+    # ── 併發控制 ──────────────────────────────────────────────────────────
+
+    def _enter(self) -> None:
+        with self._cond:
+            while self._in_flight >= self._limit and self._stop_reason is None:
+                self._cond.wait()
+            if self._stop_reason is not None:
+                raise QuotaExhausted(self._stop_reason)
+            self._in_flight += 1
+
+    def _leave(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _set_limit(self, limit: int) -> None:
+        self._limit = max(self.min_concurrency, min(limit, self.max_concurrency))
+        self.stats.limit = self._limit
+        self.stats.peak_limit = max(self.stats.peak_limit, self._limit)
+        self._cond.notify_all()
+
+    def _on_success(self, latency: float) -> None:
+        check_usage = False
+        with self._cond:
+            stats = self.stats
+            stats.done += 1
+            self._requests += 1
+            spike = stats.latency_ewma is not None and latency > stats.latency_ewma * LATENCY_SPIKE
+            stats.latency_ewma = latency if stats.latency_ewma is None else (
+                    _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * stats.latency_ewma
+            )
+            if spike:
+                self._streak = 0
+                self._set_limit(self._limit // 2)
+            else:
+                self._streak += 1
+                if self._streak >= self._limit:
+                    self._streak = 0
+                    self._set_limit(self._limit + 1)
+            if self._usage_fn is not None and self._requests % self._usage_check_every == 0:
+                check_usage = True
+            if stats.done % 20 == 0:
+                self._logger.info(f'fetch progress: {stats.as_dict()}')
+        if check_usage:
+            self._check_usage()
+
+    def _on_error(self, item, e: Exception) -> None:
+        with self._cond:
+            self.stats.errors += 1
+            self._requests += 1
+            self._streak = 0
+            self._set_limit(self._limit // 2)
+        self._logger.warning(f'fetch {item} failed ({type(e).__name__}: {e}), concurrency -> {self._limit}')
+
+    def _check_usage(self) -> None:
+        usage = self._usage_fn()
+        remaining = usage.remaining_bytes
+        if remaining < self._min_remaining_bytes:
+            with self._cond:
+                self._stop_reason = f'api usage remaining {remaining} bytes < {self._min_remaining_bytes}'
+                self._cond.notify_all()
+            self._logger.warning(f'stop scheduling: {self._stop_reason}. {usage}')
@@ -52,7 +52,12 @@ def _unpack_dtype(field_enum: type[_FieldBase]):
     })
 
 
-def npy_unpack[D:_NpDataBase](field_enum: type[_FieldBase], np_data_type: type[D], raw: bytes) -> D:
+def row_itemsize(field_enum: type[_FieldBase]) -> int:
+    """COPY BINARY 每一列的 bytes 數 (欄位皆為固定長度)"""
+    return _unpack_dtype(field_enum).itemsize
+
+
+def npy_unpack[D:_NpDataBase](field_enum: type[_FieldBase], np_data_type: type[D], raw: bytes | np.ndarray) -> D:
     dtype = _unpack_dtype(field_enum)
     arr = np.frombuffer(raw, dtype=dtype)
     return np_data_type(**{name: arr[name] for name in arr.dtype.names})
@@ -4,9 +4,10 @@ from data_manager.history.base2._npy_cached_data_manager_base import _NpyCachedD
 from data_manager.history.htm2 import HistoryTickManager2
 from data_manager.history.statics.tick._tick_spec import tick_spec
 from data_manager.history.statics.tick.np_ticks import NPTicks
+from qclaw.backtesting.npy_cache import MmapMode
 
 
 class NpyCachedHistoryTickManager(_NpyCachedDataManagerBase[NPTicks]):
     _cache_key_infix = 'tick'
-    def __init__(self, api: Shioaji):
-        super().__init__(tick_spec, HistoryTickManager2(api))
+    def __init__(self, api: Shioaji, mmap_mode: MmapMode | None = None):
+        super().__init__(tick_spec, HistoryTickManager2(api), mmap_mode)
@@ -0,0 +1,62 @@
+import numpy as np
+
+
+class ConcatView:
+    """
+    多個一維陣列的 lazy 串接 (不複製)。
+
+    - len / 整數 index / 連續 slice (step 為 1)
+    - slice 落在單一 chunk 內時回傳原陣列的 view (零複製)，跨 chunk 才複製該段
+    - np.asarray(view) 才會真的串接 (等同 np.concatenate)
+    """
+
+    def __init__(self, chunks: list[np.ndarray]):
+        if not chunks:
+            raise ValueError("chunks must not be empty")
+        self.chunks = chunks
+        self.bounds = np.cumsum([0] + [len(c) for c in chunks])  # chunk k 為 [bounds[k], bounds[k + 1])
+        self.dtype = np.result_type(*chunks)
+
+    def __len__(self) -> int:
+        return int(self.bounds[-1])
+
+    @property
+    def shape(self) -> tuple[int]:
+        return (len(self),)
+
+    def _locate(self, i: int) -> int:
+        return int(np.searchsorted(self.bounds, i, side='right')) - 1
+
+    def __getitem__(self, item):
+        n = len(self)
+        if isinstance(item, slice):
+            start, stop, step = item.indices(n)
+            if step != 1:
+                return np.asarray(self)[item]
+            if start >= stop:
+                return np.empty(0, dtype=self.dtype)
+
+            k0 = self._locate(start)
+            k1 = self._locate(stop - 1)
+            if k0 == k1:
+                return self.chunks[k0][start - self.bounds[k0]:stop - self.bounds[k0]]
+            return np.concatenate(
+                [self.chunks[k0][start - self.bounds[k0]:]]
+                + self.chunks[k0 + 1:k1]
+                + [self.chunks[k1][:stop - self.bounds[k1]]]
+            )
+
+        i = int(item)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f'index {item} out of range ({n})')
+        k = self._locate(i)
+        return self.chunks[k][i - self.bounds[k]]
+
+    def __array__(self, dtype=None, copy=None):
+        arr = np.concatenate(self.chunks)
+        return arr if dtype is None else arr.astype(dtype, copy=False)
+
+    def __repr__(self) -> str:
+        return f'ConcatView(n={len(self)}, chunks={len(self.chunks)}, dtype={self.dtype})'
@@ -1,8 +1,10 @@
 from dataclasses import dataclass, is_dataclass, fields
+from pathlib import Path
 from typing import Self, TypeVar
 
 import numpy as np
 
+from data_manager.history.statics.base._concat_view import ConcatView
 from data_manager.history.statics.base._field_base import _FieldBase
 from tools.time_utils import PG_EPOCH_OFFSET_S, PG_EPOCH_WITH_TZ_US
 
@@ -44,14 +46,29 @@ class _NpDataBase:
         return cls(**d)
 
     @classmethod
-    def merge_slices(cls, slices: list[Self]) -> Self:
-        """通用合併方法：自動將多個相同的 Data Class 實例內的 NumPy 陣列拼起來"""
+    def merge_slices(cls, slices: list[Self], lazy=False, scratch_path: str | Path = None) -> Self:
+        """通用合併方法：自動將多個相同的 Data Class 實例內的 NumPy 陣列拼起來
+
+        :param lazy: True 時每個欄位為 ConcatView (不複製，適合逐段讀取；需要完整陣列時 np.asarray)
+        :param scratch_path: 指定時合併結果寫入該檔案並以唯讀 memmap 回傳，
+            搭配 mmap 讀取的快取，整個合併過程不會在 heap 上留下完整副本 (檔案由呼叫端刪除)
+        """
         if not slices:
             raise ValueError("切片列表不能為空 (The slice list is empty.)")
 
         # 安全檢查：確保子類別確實是一個 dataclass
         if not is_dataclass(cls):
             raise TypeError(f"類別 {cls.__name__} 必須是 @dataclass 才能使用 merge_slices")
+        if lazy and scratch_path is not None:
+            raise ValueError("lazy 與 scratch_path 只能擇一")
+
+        if lazy:
+            return cls(**{
+                field.name: ConcatView([getattr(s, field.name) for s in slices])
+                for field in fields(cls)
+            })
+        if scratch_path is not None:
+            return cls._merge_to_file(slices, Path(scratch_path))
 
         # 核心魔法：透過 fields(cls) 動態獲取子類別的所有欄位名稱
         merged_fields = {
@@ -61,3 +78,27 @@ class _NpDataBase:
 
         # 用解包 (Unpacking) 的方式實例化子類別並回傳
         return cls(**merged_fields)
+
+    @classmethod
+    def _merge_to_file(cls, slices: list[Self], path: Path) -> Self:
+        """各欄位依序排在同一個檔案中 (每段 64 bytes 對齊)，寫完後以唯讀 memmap 重新開啟"""
+        n = sum(len(s) for s in slices)
+        layout = []  # (name, dtype, offset)
+        offset = 0
+        for field in fields(cls):
+            dtype = np.result_type(*[getattr(s, field.name) for s in slices])
+            layout.append((field.name, dtype, offset))
+            offset += -(-n * dtype.itemsize // 64) * 64
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        buf = np.memmap(path, dtype=np.uint8, mode='w+', shape=max(offset, 1))
+        for name, dtype, start in layout:
+            out = np.ndarray((n,), dtype=dtype, buffer=buf, offset=start)
+            np.concatenate([getattr(s, name) for s in slices], out=out, casting='same_kind')
+        buf.flush()
+        del buf
+
+        return cls(**{
+            name: np.memmap(path, dtype=dtype, mode='r', offset=start, shape=(n,)) if n else np.empty(0, dtype)
+            for name, dtype, start in layout
+        })
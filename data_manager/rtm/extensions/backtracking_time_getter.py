@@ -114,7 +114,7 @@ class BacktrackingTimeGetter:
 
             for d in data:
                 new_data_raw = self.redis.zrangebyscore(key, d[0].timestamp(), d[1].timestamp(), withscores=False)
-                new_data: list[TickFOP] = [TickFOP.deserialize(nd) for nd in new_data_raw]
+                new_data: list[TickFOP] = TickFOP.deserialize_many(new_data_raw)
 
                 if d[0] <= d[1] == self.last_start:
                     joint_idx = bisect_right(self.buffer, d[1])
@@ -137,7 +137,7 @@ class BacktrackingTimeGetter:
 
         else:
             new_data_raw = self.redis.zrangebyscore(key, start.timestamp(), end.timestamp(), withscores=False)
-            new_data: list[TickFOP] = [TickFOP.deserialize(nd) for nd in new_data_raw]
+            new_data: list[TickFOP] = TickFOP.deserialize_many(new_data_raw)
             self.last_start = start
             self.last_end = end
             self.buffer = new_data
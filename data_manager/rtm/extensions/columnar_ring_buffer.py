@@ -0,0 +1,453 @@
+"""
+Columnar ring buffer — realtime tick / bidask 的 NumPy 欄位式緩衝區
+
+Design
+──────
+每個欄位一條預先配置的 ndarray，ts 欄固定為 int64 epoch ns。
+index 一律使用「絕對 index」(從開盤第一筆開始累加，不因回收而改變)，
+所以 RealtimeTickManagerBase 的 tick_left / tick_right 可以沿用。
+
+回收:
+    release(idx) 標記 idx 之前的資料不再需要，
+    寫滿時才把 [retain_from, end) 複製到新配置的陣列 (amortized O(1))，
+    視窗本身放不下時容量加倍。
+    舊陣列不會再被寫入，所以讀取端手上的 view 永遠有效 (zero-copy)。
+
+Prefix sums (TickRingBuffer):
+    寫入時同步維護 Σvolume, Σp·v, Σp²·v 與各 tick_type 的成交量累計 (含當筆)，
+    任意區間合計 = 兩次 index 查詢 + 相減 (range_sums)，
+    PMA / VMA / SD / NetBuyRatio 等 manager 直接共用，不必各自加減新增 / 過期的 ticks。
+    累計值是整個 session 的絕對值，回收時隨資料一起搬移，不受影響。
+
+Thread model:
+    單一寫入者 (rtm consumer thread) + 讀取者 (strategy thread)。
+    (columns, offset) 綁成一個 tuple 一次替換，_end 最後才遞增，
+    讀取端只會看到已寫完的資料列。
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, ClassVar, Iterable
+
+import numpy as np
+
+from data.unified.bid_ask.bid_ask_fop import BidAskFOP
+from data.unified.tick.tick_fop import TickFOP
+from tools.time_utils import datetime_to_epoch_ns, epoch_ns_to_datetime
+
+
+class ColumnWindow:
+    """
+    連續區段 [start, stop) 的 zero-copy view，欄位以屬性存取:
+    window.close, window.volume, window.ts ...
+    """
+    __slots__ = ('_buffer', '_columns', 'start', 'stop')
+
+    def __init__(self, buffer: 'ColumnarRingBuffer', columns: dict[str, np.ndarray], start: int, stop: int):
+        self._buffer = buffer
+        self._columns = columns
+        self.start = start
+        self.stop = stop
+
+    def __getattr__(self, name) -> np.ndarray:
+        try:
+            return self._columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def columns(self) -> dict[str, np.ndarray]:
+        return self._columns
+
+    def __bool__(self):
+        return self.stop > self.start
+
+    def view(self, start: int = None, stop: int = None) -> 'ColumnWindow':
+        """window 內的子區段 (相對 index，同 slice 語意)"""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        stop = max(start, stop)
+        return ColumnWindow(
+            self._buffer,
+            {k: v[start:stop] for k, v in self._columns.items()},
+            self.start + start,
+            self.start + stop
+        )
+
+    def __getitem__(self, idx: int):
+        """materialize 單筆資料 (會建立 python 物件，僅供少量存取)"""
+        return self._buffer.row_from_columns(self._columns, self._local_index(idx))
+
+    def _local_index(self, idx: int) -> int:
+        n = len(self)
+        if idx < 0:
+            idx += n
+        if not 0 <= idx < n:
+            raise IndexError(f'window index out of range: {idx}')
+        return idx
+
+    def datetime(self, idx: int) -> datetime:
+        return epoch_ns_to_datetime(self._columns['ts'][self._local_index(idx)])
+
+    def tail_start(self) -> int:
+        """與最後一筆同時間戳的第一筆位置 (window 內的相對 index)"""
+        ts = self._columns['ts']
+        if len(ts) == 0:
+            return 0
+        return int(np.searchsorted(ts, ts[-1], side='left'))
+
+
+class ColumnarRingBuffer(ABC):
+    COLUMNS: ClassVar[dict[str, type]]  # 必須包含 'ts' (int64 epoch ns)
+    DEFAULT_CAPACITY: ClassVar[int] = 1 << 17
+
+    def __init__(self, capacity: int = None, on_evict: Callable[[dict[str, np.ndarray], int], None] = None):
+        self._capacity = capacity or self.DEFAULT_CAPACITY
+        self._state: tuple[dict[str, np.ndarray], int] = (self._allocate(self._capacity), 0)  # (columns, offset)
+        self._end = 0  # 下一筆的絕對 index
+        self._retain_from = 0
+        self._on_evict = on_evict
+
+    def _allocate(self, capacity) -> dict[str, np.ndarray]:
+        return {name: np.empty(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+
+    # ── size / index ───────────────────────────────────────────────────────
+
+    def __len__(self):
+        return self._end
+
+    @property
+    def first_index(self) -> int:
+        """仍保留在 buffer 內的最小絕對 index"""
+        return self._state[1]
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def release(self, idx: int):
+        """idx 之前的資料之後可被回收"""
+        if idx and idx > self._retain_from:
+            self._retain_from = min(idx, self._end)
+
+    # ── write ──────────────────────────────────────────────────────────────
+
+    def _reserve(self, n: int):
+        columns, offset = self._state
+        size = self._end - offset
+        if size + n <= self._capacity:
+            return
+
+        drop = max(self._retain_from - offset, 0)
+        live = size - drop
+        capacity = self._capacity
+        while live + n > capacity:
+            capacity *= 2
+
+        if drop and self._on_evict:
+            self._on_evict({k: v[:drop].copy() for k, v in columns.items()}, offset)
+
+        new_columns = self._allocate(capacity)
+        for k, v in columns.items():
+            new_columns[k][:live] = v[drop:size]
+
+        self._capacity = capacity
+        self._state = (new_columns, offset + drop)
+
+    def append(self, item):
+        self._reserve(1)
+        columns, offset = self._state
+        self._write_row(columns, self._end - offset, item)
+        self._end += 1
+
+    def append_row(self, **values):
+        self._reserve(1)
+        columns, offset = self._state
+        i = self._end - offset
+        for k, v in values.items():
+            columns[k][i] = v
+        self._end += 1
+
+    def extend(self, items: Iterable):
+        for item in items:
+            self.append(item)
+
+    def extend_columns(self, columns: dict[str, np.ndarray]):
+        n = len(columns['ts'])
+        if n == 0:
+            return
+        self._reserve(n)
+        dst, offset = self._state
+        i = self._end - offset
+        for k, v in columns.items():
+            dst[k][i:i + n] = v
+        self._end += n
+
+    def extend_from(self, other: 'ColumnarRingBuffer', start: int = None, stop: int = None):
+        """從另一個同型 buffer 複製 [start, stop) 的資料"""
+        self.extend_columns(other.view(start, stop).columns())
+
+    @abstractmethod
+    def _write_row(self, columns: dict[str, np.ndarray], i: int, item):
+        ...
+
+    # ── read ───────────────────────────────────────────────────────────────
+
+    @abstractmethod
+    def row_from_columns(self, columns: dict[str, np.ndarray], i: int) -> Any:
+        ...
+
+    def _bounds(self, offset, lo, hi):
+        lo = offset if lo is None else max(lo, offset)
+        hi = self._end if hi is None else min(hi, self._end)
+        return lo, max(lo, hi)
+
+    def view(self, start: int = None, stop: int = None) -> ColumnWindow:
+        columns, offset = self._state
+        start, stop = self._bounds(offset, start, stop)
+        return ColumnWindow(
+            self,
+            {k: v[start - offset:stop - offset] for k, v in columns.items()},
+            start,
+            stop
+        )
+
+    def __getitem__(self, idx: int):
+        columns, offset = self._state
+        if idx < 0:
+            idx += self._end
+        if not offset <= idx < self._end:
+            raise IndexError(f'buffer index out of range: {idx} (available: [{offset}, {self._end}))')
+        return self.row_from_columns(columns, idx - offset)
+
+    def ts_at(self, idx: int) -> int:
+        columns, offset = self._state
+        return int(columns['ts'][idx - offset])
+
+    def search(self, ts_ns: int, lo: int = None, hi: int = None, side='left') -> int:
+        """在 [lo, hi) 內以 np.searchsorted 找插入點，回傳絕對 index"""
+        columns, offset = self._state
+        lo, hi = self._bounds(offset, lo, hi)
+        return lo + int(np.searchsorted(columns['ts'][lo - offset:hi - offset], ts_ns, side=side))
+
+    def window_bounds(
+            self,
+            start: datetime | int,
+            end: datetime | int,
+            lo: int = None,
+            hi: int = None,
+            with_start=True,
+            with_end=True
+    ) -> tuple[int, int]:
+        """
+        時間區間對應的絕對 index [left, right)，語意同 tools.utils.get_by_time_range:
+        with_start -> ts >= start, 否則 ts > start
+        with_end   -> ts <= end,   否則 ts < end
+        """
+        if isinstance(start, datetime):
+            start = datetime_to_epoch_ns(start)
+        if isinstance(end, datetime):
+            end = datetime_to_epoch_ns(end)
+
+        left = self.search(start, lo, hi, side='left' if with_start else 'right')
+        right = self.search(end, left, hi, side='right' if with_end else 'left')
+        return left, right
+
+    def window(
+            self,
+            start: datetime | int,
+            end: datetime | int,
+            lo: int = None,
+            hi: int = None,
+            with_start=True,
+            with_end=True
+    ) -> ColumnWindow:
+        return self.view(*self.window_bounds(start, end, lo, hi, with_start, with_end))
+
+    def to_objects(self, start: int = None, stop: int = None) -> list:
+        w = self.view(start, stop)
+        return [w[i] for i in range(len(w))]
+
+
+@dataclass(slots=True)
+class WindowSums:
+    """tick buffer 區間 [start, stop) 的合計值"""
+    start: int = 0
+    stop: int = 0
+    volume: int = 0
+    pv: float = 0.0  # Σ close·volume
+    p2v: float = 0.0  # Σ close²·volume
+    type1_vol: int = 0  # tick_type == 1 的成交量
+    type2_vol: int = 0  # tick_type == 2 的成交量
+
+    @property
+    def count(self) -> int:
+        return self.stop - self.start
+
+
+class TickRingBuffer(ColumnarRingBuffer):
+    RAW_COLUMNS: ClassVar[dict[str, type]] = {
+        'ts': np.int64,
+        'close': np.float64,
+        'volume': np.int64,
+        'total_volume': np.int64,
+        'tick_type': np.int8,
+        'bid_side_total_vol': np.int64,
+        'ask_side_total_vol': np.int64,
+    }
+    PREFIX_COLUMNS: ClassVar[dict[str, type]] = {
+        'cum_volume': np.int64,
+        'cum_pv': np.float64,
+        'cum_p2v': np.float64,
+        'cum_type1_vol': np.int64,
+        'cum_type2_vol': np.int64,
+    }
+    COLUMNS = RAW_COLUMNS | PREFIX_COLUMNS
+
+    def __init__(self, capacity: int = None, on_evict: Callable[[dict[str, np.ndarray], int], None] = None):
+        super().__init__(capacity, on_evict)
+        # 目前為止的累計值 (寫入端專用): volume, pv, p2v, type1_vol, type2_vol
+        self._carry = [0, 0.0, 0.0, 0, 0]
+
+    def _write_row(self, columns, i, item: TickFOP):
+        close = float(item.close)
+        volume = int(item.volume)
+        columns['ts'][i] = datetime_to_epoch_ns(item.datetime)
+        columns['close'][i] = close
+        columns['volume'][i] = volume
+        columns['total_volume'][i] = item.total_volume
+        columns['tick_type'][i] = item.tick_type
+        columns['bid_side_total_vol'][i] = item.bid_side_total_vol
+        columns['ask_side_total_vol'][i] = item.ask_side_total_vol
+
+        c = self._carry
+        pv = close * volume
+        c[0] += volume
+        c[1] += pv
+        c[2] += pv * close
+        if item.tick_type == 1:
+            c[3] += volume
+        elif item.tick_type == 2:
+            c[4] += volume
+        columns['cum_volume'][i] = c[0]
+        columns['cum_pv'][i] = c[1]
+        columns['cum_p2v'][i] = c[2]
+        columns['cum_type1_vol'][i] = c[3]
+        columns['cum_type2_vol'][i] = c[4]
+
+    def extend_columns(self, columns: dict[str, np.ndarray]):
+        """只取原始欄位，累計欄位一律重新計算 (來源可能是別的 buffer 的累計值)"""
+        if len(columns['ts']) == 0:
+            return
+
+        raw = {k: columns[k] for k in self.RAW_COLUMNS}
+        close = np.asarray(raw['close'], dtype=np.float64)
+        volume = np.asarray(raw['volume'], dtype=np.int64)
+        tick_type = np.asarray(raw['tick_type'])
+        pv = close * volume
+
+        c = self._carry
+        prefix = {
+            'cum_volume': c[0] + np.cumsum(volume),
+            'cum_pv': c[1] + np.cumsum(pv),
+            'cum_p2v': c[2] + np.cumsum(pv * close),
+            'cum_type1_vol': c[3] + np.cumsum(np.where(tick_type == 1, volume, 0)),
+            'cum_type2_vol': c[4] + np.cumsum(np.where(tick_type == 2, volume, 0)),
+        }
+        self._carry = [
+            int(prefix['cum_volume'][-1]),
+            float(prefix['cum_pv'][-1]),
+            float(prefix['cum_p2v'][-1]),
+            int(prefix['cum_type1_vol'][-1]),
+            int(prefix['cum_type2_vol'][-1]),
+        ]
+        super().extend_columns(raw | prefix)
+
+    def range_sums(self, start: int, stop: int) -> WindowSums:
+        """[start, stop) 的合計，O(1)"""
+        columns, offset = self._state
+        start, stop = self._bounds(offset, start, stop)
+        if stop <= start:
+            return WindowSums(start, start)
+
+        a = start - offset
+        b = stop - 1 - offset
+        # 累計值含當筆，扣掉 a 之前的部分 = cum[b] - cum[a] + row[a]
+        close_a = float(columns['close'][a])
+        volume_a = int(columns['volume'][a])
+        type_a = int(columns['tick_type'][a])
+        pv_a = close_a * volume_a
+        type1_a = volume_a if type_a == 1 else 0
+        type2_a = volume_a if type_a == 2 else 0
+        return WindowSums(
+            start=start,
+            stop=stop,
+            volume=int(columns['cum_volume'][b] - columns['cum_volume'][a]) + volume_a,
+            pv=float(columns['cum_pv'][b] - columns['cum_pv'][a]) + pv_a,
+            p2v=float(columns['cum_p2v'][b] - columns['cum_p2v'][a]) + pv_a * close_a,
+            type1_vol=int(columns['cum_type1_vol'][b] - columns['cum_type1_vol'][a]) + type1_a,
+            type2_vol=int(columns['cum_type2_vol'][b] - columns['cum_type2_vol'][a]) + type2_a,
+        )
+
+    def extend_records(self, records: np.ndarray):
+        """從 TickFOP.codec() 的 record array 批次寫入"""
+        self.extend_columns({k: records['datetime' if k == 'ts' else k] for k in self.RAW_COLUMNS})
+
+    @classmethod
+    def fill_records(cls, columns: dict[str, np.ndarray], records: np.ndarray):
+        """extend_records 的反向，寫入 TickFOP.codec().empty_records(n)"""
+        for k in cls.RAW_COLUMNS:
+            records['datetime' if k == 'ts' else k] = columns[k]
+
+    def row_from_columns(self, columns, i) -> TickFOP:
+        return TickFOP(
+            datetime=epoch_ns_to_datetime(columns['ts'][i]),
+            close=float(columns['close'][i]),
+            volume=int(columns['volume'][i]),
+            total_volume=int(columns['total_volume'][i]),
+            tick_type=int(columns['tick_type'][i]),
+            bid_side_total_vol=int(columns['bid_side_total_vol'][i]),
+            ask_side_total_vol=int(columns['ask_side_total_vol'][i]),
+        )
+
+
+class BidAskRingBuffer(ColumnarRingBuffer):
+    """只保留第一檔價量與總委託量"""
+    COLUMNS = {
+        'ts': np.int64,
+        'bid_price': np.float64,
+        'ask_price': np.float64,
+        'bid_volume': np.int64,
+        'ask_volume': np.int64,
+        'bid_total_vol': np.int64,
+        'ask_total_vol': np.int64,
+    }
+
+    @staticmethod
+    def _first_level(v, default=0):
+        if v is None:
+            return default
+        if isinstance(v, (list, tuple)):
+            return v[0] if v else default
+        return v
+
+    def _write_row(self, columns, i, item: BidAskFOP):
+        columns['ts'][i] = datetime_to_epoch_ns(item.datetime)
+        columns['bid_price'][i] = self._first_level(item.bid_price, np.nan)
+        columns['ask_price'][i] = self._first_level(item.ask_price, np.nan)
+        columns['bid_volume'][i] = self._first_level(item.bid_volume)
+        columns['ask_volume'][i] = self._first_level(item.ask_volume)
+        columns['bid_total_vol'][i] = item.bid_total_vol
+        columns['ask_total_vol'][i] = item.ask_total_vol
+
+    def row_from_columns(self, columns, i) -> BidAskFOP:
+        return BidAskFOP(
+            datetime=epoch_ns_to_datetime(columns['ts'][i]),
+            bid_price=[float(columns['bid_price'][i])],
+            ask_price=[float(columns['ask_price'][i])],
+            bid_volume=[int(columns['bid_volume'][i])],
+            ask_volume=[int(columns['ask_volume'][i])],
+            bid_total_vol=int(columns['bid_total_vol'][i]),
+            ask_total_vol=int(columns['ask_total_vol'][i]),
+        )
@@ -9,6 +9,7 @@ from shioaji.data import Ticks
 
 from data.unified.tick.tick_fop import TickFOP
 from tools.constants import DATE_FORMAT_DB_AND_SJ
+from tools.time_utils import epoch_ns_to_datetime
 from tools.utils import ticks_to_tickfopv1, get_twse_date
 
 
@@ -33,8 +34,8 @@ class IndayHistoryGetter:
         key = self.redis_key()
         res = self.redis.zrange(key, -1, -1, withscores=False)
         if res:
-            last_tick = TickFOP.deserialize(res[0])
-            self.last_end_time = last_tick.datetime
+            last_ns = TickFOP.codec().decode_records(res)['datetime'][0]
+            self.last_end_time = epoch_ns_to_datetime(last_ns)
 
     def print_ticks(self, ticks):
         df = DataFrame({**ticks})
@@ -0,0 +1,107 @@
+"""
+Ingestion queue — shioaji callback thread 與 consumer thread 之間的 SPSC 佇列
+
+Design
+──────
+單一 producer (shioaji callback) / 單一 consumer。
+slot 預先配置，producer 只寫 slot 與 _tail，consumer 只寫 _head，
+兩邊都不需要 lock (int 的讀寫在 GIL 下是 atomic 的)。
+
+producer 永不阻塞:
+    slot 寫滿時改放到 overflow deque (append / popleft 本身 thread-safe)，
+    overflow 非空期間後續資料也一律放 overflow，保證順序不亂。
+    consumer 先清 ring 再清 overflow。
+
+喚醒:
+    資料放入之後 (slot 與 _tail 都已寫入) 若佇列中只剩這一筆才 set event，一個 batch 只會碰一次 event 的內部 lock。
+    判斷必須在放入之後：若在放入之前讀「是否為空」，consumer 可能在這之間取走前一筆、看到空佇列後開始等待，
+    這一筆就不會喚醒它 (要等到 wait 的 timeout)。
+    consumer 需先 clear event 再檢查是否有資料，才不會漏掉喚醒。
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class SpscQueue:
+    DEFAULT_CAPACITY = 1 << 14
+
+    def __init__(self, capacity: int = None, data_event: threading.Event = None):
+        self._capacity = capacity or self.DEFAULT_CAPACITY
+        self._items: list = [None] * self._capacity
+        self._recv_ns = np.zeros(self._capacity, dtype=np.int64)
+        self._head = 0  # consumer 下一個要讀的位置 (只有 consumer 寫)
+        self._tail = 0  # producer 下一個要寫的位置 (只有 producer 寫)
+        self._overflow: deque[tuple[object, int]] = deque()
+        self.data_event = data_event or threading.Event()  # 可與其他佇列共用，讓 consumer 只等一個 event
+
+        # stats
+        self.pushed = 0
+        self.overflowed = 0
+        self.max_depth = 0
+
+    # ── producer ───────────────────────────────────────────────────────────
+
+    def push(self, item):
+        """callback thread 專用，只記錄接收時間並放入佇列"""
+        recv_ns = time.time_ns()
+
+        if self._overflow or self._tail - self._head >= self._capacity:
+            self._overflow.append((item, recv_ns))
+            self.overflowed += 1
+        else:
+            i = self._tail % self._capacity
+            self._items[i] = item
+            self._recv_ns[i] = recv_ns
+            self._tail += 1
+
+        self.pushed += 1
+        depth = self.depth
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+        # 放入之後才判斷：其他資料都已被 consumer 取走 (它可能正要開始等待) 時喚醒
+        if depth <= 1:
+            self.data_event.set()
+
+    # ── consumer ───────────────────────────────────────────────────────────
+
+    def drain(self, max_items: int = None) -> list[tuple[object, int]]:
+        """consumer thread 專用，取出目前所有 (或最多 max_items 筆) 資料: [(item, recv_ns), ...]"""
+        head = self._head
+        tail = self._tail
+        if max_items is not None:
+            tail = min(tail, head + max_items)
+
+        batch = []
+        for p in range(head, tail):
+            i = p % self._capacity
+            batch.append((self._items[i], int(self._recv_ns[i])))
+            self._items[i] = None
+        self._head = tail
+
+        # ring 清空後才處理 overflow，overflow 內的資料一定比 ring 內的新
+        if self._head == self._tail:
+            while self._overflow and (max_items is None or len(batch) < max_items):
+                batch.append(self._overflow.popleft())
+
+        return batch
+
+    # ── observability ──────────────────────────────────────────────────────
+
+    @property
+    def depth(self) -> int:
+        return self._tail - self._head + len(self._overflow)
+
+    def __bool__(self):
+        return self.depth > 0
+
+    def stats(self) -> dict:
+        return {
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'pushed': self.pushed,
+            'overflowed': self.overflowed,
+        }
@@ -1,6 +1,8 @@
 import threading
+import time
 from datetime import datetime, timedelta
 
+import numpy as np
 import shioaji as sj
 from redis.client import Redis
 from shioaji import TickFOPv1
@@ -8,9 +10,13 @@ from typing import override
 
 from data.unified.bid_ask.bid_ask_fop import BidAskFOP
 from data.unified.tick.tick_fop import TickFOP
+from data_manager.rtm.extensions.columnar_ring_buffer import TickRingBuffer
 from data_manager.rtm.rtm_base import RealtimeTickManagerBase
 from data_manager.rtm.extensions.inday_history_getter import IndayHistoryGetter
+from data_manager.rtm.extensions.ingestion_queue import SpscQueue
 from tools.constants import DEFAULT_TIMEZONE
+from tools.latency_tracer import latency_tracer
+from tools.time_utils import datetime_to_epoch_ns, epoch_ns_to_datetime
 from tools.utils import decode_redis, get_redis_date_tag, get_serial
 
 
@@ -20,6 +26,8 @@ class RealtimeTickManager(RealtimeTickManagerBase):
     def __init__(self, api: sj.Shioaji, redis, contract, getting_history=True):
 
         super().__init__()
+        self._evicted_ticks: list[dict] = []  # 被 ring buffer 回收、尚未寫入 redis 的資料
+        self.tick_buffer = TickRingBuffer(on_evict=self._on_tick_evicted)
         self.api = api
         self.redis: Redis = redis
         self.api.quote.set_on_tick_fop_v1_callback(self._on_tick_fop_v1_handler)
@@ -66,14 +74,26 @@ class RealtimeTickManager(RealtimeTickManagerBase):
 
         self.getting_history = getting_history
 
+        # callback thread 只負責收資料，轉換 / 檢查 / 寫入 buffer 都在 consumer thread
+        self.data_event = threading.Event()
+        self.tick_queue = SpscQueue(data_event=self.data_event)
+        self.bidask_queue = SpscQueue(data_event=self.data_event)
+        self.consumer_thread: threading.Thread | None = None
+        self.max_batch_size = 1024
+        self._to_tick = TickFOP.sj_converter()
+        self._to_bidask = BidAskFOP.sj_converter()
+
     def start(self, wait_for_ready=True):
         if self.started:
             print('rtm already started.')
             return
 
+        self.started = True
+        self.consumer_thread = threading.Thread(target=self._consume, name='rtm-consumer', daemon=True)
+        self.consumer_thread.start()
+
         for sub in self.subs:
             self.api.quote.subscribe(**sub)
-        self.started = True
         print('rtm started. waiting for ready...')
 
         if wait_for_ready:
@@ -88,6 +108,9 @@ class RealtimeTickManager(RealtimeTickManagerBase):
         for sub in self.subs:
             self.api.quote.unsubscribe(**sub)
         self.started = False
+        self.data_event.set()
+        self.consumer_thread.join()
+        self._drain_queues()  # 停止訂閱前已進佇列的資料
         self.tick_received_event.set()  # for those who may wait for the event to stop
 
         self._dump_to_redis()
@@ -110,25 +133,32 @@ class RealtimeTickManager(RealtimeTickManagerBase):
             self.start_time.timestamp(),
             withscores=False
         )
-        older_data = [TickFOP.deserialize(r) for r in older_raw]
+        older_data = TickFOP.codec().decode_records(older_raw)
+        saved_count = len(older_data)  # 已在 redis 的筆數，checkpoint 的 ticks 接在後面、視為尚未寫入
+        if self._checkpoint_ticks:
+            older_data = np.concatenate([older_data, self._checkpoint_records(older_data)])
+            self._checkpoint_ticks = None
 
         # to remove duplicated parts at the end
-        in_day_start = in_day_history[0].datetime
-        older_right = len(older_data) - 1
-        rm_count = 0
-        while older_right >= 0 and older_data[older_right].datetime >= in_day_start:
-            older_right -= 1
-            rm_count += 1
-
-        # to remove duplicated parts at the start of buffer
-        in_day_end = in_day_history[-1].datetime
-        buffer_start = 0
+        if in_day_history:
+            in_day_start = datetime_to_epoch_ns(in_day_history[0].datetime)
+        else:
+            # checkpoint 已涵蓋到開始訂閱前，API 沒有補到資料
+            in_day_start = datetime_to_epoch_ns(self.start_time)
+        older_right = int(np.searchsorted(older_data['datetime'], in_day_start, side='left')) - 1
+        rm_count = saved_count - 1 - older_right
 
         with self.buffer_lock:
-            buffer_size = len(self.tick_buffer)
-            while buffer_start < buffer_size and self.tick_buffer[buffer_start].datetime <= in_day_end:
-                buffer_start += 1
-            self.tick_buffer = older_data[:older_right + 1] + in_day_history + self.tick_buffer[buffer_start:]
+            # to remove duplicated parts at the start of buffer
+            if in_day_history:
+                buffer_start = self.tick_buffer.search(datetime_to_epoch_ns(in_day_history[-1].datetime), side='right')
+            else:
+                buffer_start = self.tick_buffer.first_index
+            combined = TickRingBuffer(on_evict=self._on_tick_evicted)
+            combined.extend_records(older_data[:older_right + 1])
+            combined.extend(in_day_history)
+            combined.extend_from(self.tick_buffer, buffer_start)
+            self.tick_buffer = combined
             self.need_lock = False
 
         if rm_count > 0:
@@ -137,7 +167,41 @@ class RealtimeTickManager(RealtimeTickManagerBase):
                 -rm_count,
                 -1
             )
-        self.new_data_index = older_right + 1
+        self.new_data_index = min(older_right + 1, saved_count)
+
+    def _checkpoint_records(self, older_data: np.ndarray) -> np.ndarray:
+        """checkpoint 中比 redis 資料更新的 ticks，轉為 TickFOP.codec() 的 record array"""
+        columns = self._checkpoint_ticks
+        last_saved = older_data['datetime'][-1] if len(older_data) else np.iinfo(np.int64).min
+        start = int(np.searchsorted(columns['ts'], last_saved, side='right'))
+        columns = {k: v[start:] for k, v in columns.items()}
+
+        records = TickFOP.codec().empty_records(len(columns['ts']))
+        TickRingBuffer.fill_records(columns, records)
+        return records
+
+    def _apply_checkpoint(self):
+        """
+        只保留 [start_time - window_size, start_time) 內的 checkpoint ticks (其他 session 的直接忽略)，
+        in-day history 從 checkpoint 的最後一筆之後開始補
+        """
+        columns = self._checkpoint_ticks
+        if not columns:
+            return
+
+        ts = columns['ts']
+        left = int(np.searchsorted(ts, datetime_to_epoch_ns(self.start_time - self.window_size), side='left'))
+        right = int(np.searchsorted(ts, datetime_to_epoch_ns(self.start_time), side='left'))
+        if left >= right:
+            print('checkpoint ticks out of range, ignored.')
+            self._checkpoint_ticks = None
+            return
+
+        self._checkpoint_ticks = {k: v[left:right] for k, v in columns.items()}
+        checkpoint_end = epoch_ns_to_datetime(ts[right - 1])
+        if not self.ihg.last_end_time or self.ihg.last_end_time < checkpoint_end:
+            self.ihg.last_end_time = checkpoint_end
+        print(f'checkpoint ticks restored: {right - left}, last: {checkpoint_end}')
 
     @property
     def start_time(self) -> datetime:
@@ -148,7 +212,7 @@ class RealtimeTickManager(RealtimeTickManagerBase):
         now = datetime.now(tz=DEFAULT_TIMEZONE)
         if not self.last_print_delay or now - self.last_print_delay > timedelta(seconds=10):
             delay = (now - tick.datetime).total_seconds()
-            print(f'[realtime tick delay] {delay} s.')
+            print(f'[realtime tick delay] {delay} s. [ingest backlog] {self.tick_queue.stats()}')
             self.last_print_delay = now
 
         # check tick miss
@@ -166,6 +230,7 @@ class RealtimeTickManager(RealtimeTickManagerBase):
         if not self.start_time:
             self.ihg.set_start_time(tickv1d1.datetime)
             self.ihg.check_inday_history()
+            self._apply_checkpoint()
             if tickv1d1.volume == tickv1d1.total_volume or not self.getting_history:
                 self.ihg.set_finish()
                 self.skip_combine = True
@@ -174,27 +239,50 @@ class RealtimeTickManager(RealtimeTickManagerBase):
             else:
                 self.ihg.prepare_in_day_history()
 
+    # callbacks (shioaji thread): 只放入佇列，不可阻塞
     def _on_tick_fop_v1_handler(self, _exchange: sj.Exchange, sj_tick: TickFOPv1):
-        sj_tick.datetime = sj_tick.datetime.replace(tzinfo=DEFAULT_TIMEZONE)
-
-        tick = TickFOP.from_sj(sj_tick)
+        self.tick_queue.push(sj_tick)
 
-        self._check_tick_validity(sj_tick, tick)
+    def _on_bidask_fop_v1_handler(self, _exchange: sj.Exchange, sj_bidask: sj.BidAskFOPv1):
+        self.bidask_queue.push(sj_bidask)
+
+    # consumer thread
+    def _consume(self):
+        while self.started:
+            self.data_event.clear()
+            if not self.tick_queue and not self.bidask_queue:
+                self.data_event.wait(timeout=1)
+            self._drain_queues()
+
+    def _drain_queues(self):
+        for sj_bidask, _recv_ns in self.bidask_queue.drain():
+            self.bid_ask_buffer.append(self._to_bidask(sj_bidask))
+
+        while batch := self.tick_queue.drain(self.max_batch_size):
+            self._on_tick_batch(batch)
+
+    def _on_tick_batch(self, batch: list[tuple[TickFOPv1, int]]):
+        ticks = []
+        for sj_tick, _recv_ns in batch:
+            sj_tick.datetime = sj_tick.datetime.replace(tzinfo=DEFAULT_TIMEZONE)
+            tick = self._to_tick(sj_tick)
+            self._check_tick_validity(sj_tick, tick)
+            ticks.append(tick)
 
         # append to buffer
         if self.need_lock:
             with self.buffer_lock:
-                self.tick_buffer.append(tick)
+                self.tick_buffer.extend(ticks)
         else:
-            self.tick_buffer.append(tick)
+            self.tick_buffer.extend(ticks)
 
-        self.tick_received_event.set()
+        append_ns = time.time_ns()
+        for tick, (_sj_tick, recv_ns) in zip(ticks, batch):
+            latency_tracer.on_tick_appended(datetime_to_epoch_ns(tick.datetime), recv_ns, append_ns)
 
-        self._deal_inday_history(tick)
+        self.tick_received_event.set()
 
-    def _on_bidask_fop_v1_handler(self, _exchange: sj.Exchange, sj_bidask: sj.BidAskFOPv1):
-        bidask = BidAskFOP.from_sj(sj_bidask)
-        self.bid_ask_buffer.append(bidask)
+        self._deal_inday_history(ticks[0])
 
     # redis
     def _redis_key(self):
@@ -233,10 +321,25 @@ class RealtimeTickManager(RealtimeTickManagerBase):
 
         return True
 
+    def _on_tick_evicted(self, columns: dict, offset: int):
+        start = max(self.new_data_index - offset, 0)
+        if start < len(columns['ts']):
+            self._evicted_ticks.append({k: v[start:] for k, v in columns.items()})
+
     def _dump_to_redis(self):
         key = self._redis_key()
-        data = {
-            t.serialize(self._get_tick_serial()): t.datetime.timestamp()
-            for t in self.tick_buffer[self.new_data_index:]
-        }
-        self.redis.zadd(key, data)
+        codec = TickFOP.codec()
+        unsaved = self.tick_buffer.view(max(self.new_data_index, self.tick_buffer.first_index)).columns()
+
+        for columns in [*self._evicted_ticks, unsaved]:
+            n = len(columns['ts'])
+            if n == 0:
+                continue
+            records = codec.empty_records(n)
+            self.tick_buffer.fill_records(columns, records)
+            records['serial'] = [self._get_tick_serial() for _ in range(n)]
+
+            scores = (columns['ts'] / 1e9).tolist()
+            self.redis.zadd(key, dict(zip(codec.encode_records(records), scores)))
+
+        self._evicted_ticks.clear()
@@ -3,7 +3,15 @@ from datetime import timedelta, datetime
 
 from data.unified.bid_ask.bid_ask_fop import BidAskFOP
 from data.unified.tick.tick_fop import TickFOP
-from tools.utils import is_valid_range, get_by_time_range
+from data_manager.rtm.extensions.columnar_ring_buffer import (
+    BidAskRingBuffer,
+    ColumnarRingBuffer,
+    ColumnWindow,
+    TickRingBuffer,
+    WindowSums,
+)
+from tools.time_utils import timedelta_to_ns
+from tools.utils import is_valid_range
 
 
 class RealtimeTickManagerBase:
@@ -11,15 +19,18 @@ class RealtimeTickManagerBase:
 
         self.tick_right = -1
         self.tick_left = 0
-        self.tick_buffer: list[TickFOP] = []
+        self.tick_buffer: TickRingBuffer = TickRingBuffer()
 
         self.bid_ask_right = -1
         self.bid_ask_left = 0
-        self.bid_ask_buffer: list[BidAskFOP] = []
+        self.bid_ask_buffer: BidAskRingBuffer = BidAskRingBuffer()
 
         self.buffer_clean_limit = timedelta(hours=3)
         self.window_size = timedelta(hours=2)
 
+        # warm start: 由 checkpoint 還原、尚未併入 tick buffer 的 ticks (TickRingBuffer.RAW_COLUMNS)
+        self._checkpoint_ticks: dict | None = None
+
     def update_window(self):
         self.update_window_right()
         self._update_window_left()
@@ -38,57 +49,93 @@ class RealtimeTickManagerBase:
 
     @staticmethod
     def _valid(buffer, left, right):
-        return is_valid_range(buffer, left, right)
+        return is_valid_range(buffer, left, right) and left <= right
 
-    def _update_window_detail(self, buffer, left, right):
+    def _update_window_detail(self, buffer: ColumnarRingBuffer, left, right):
         if not self._valid(buffer, left, right):
-            return
+            return left
 
-        if buffer[left].datetime < buffer[right].datetime - self.buffer_clean_limit:
-            while buffer[left].datetime < buffer[right].datetime - self.window_size:
-                left += 1
+        right_ts = buffer.ts_at(right)
+        if buffer.ts_at(left) < right_ts - timedelta_to_ns(self.buffer_clean_limit):
+            left = buffer.search(right_ts - timedelta_to_ns(self.window_size), left, right + 1, side='left')
+            buffer.release(left)
         return left
 
     @abstractmethod
     def update_window_right(self):
         pass
 
-    def get_ticks_by_time_range(self, start: datetime, end: datetime, with_start=True, with_end=True) -> list[
-        TickFOP]:
-
-        return get_by_time_range(
-            self.tick_buffer,
+    def get_ticks_by_time_range(self, start: datetime, end: datetime, with_start=True, with_end=True) -> ColumnWindow:
+        return self.tick_buffer.window(
+            start,
+            end,
             self.tick_left,
             self.tick_right + 1,
+            with_start,
+            with_end
+        )
+
+    def get_tick_sums_by_time_range(self, start: datetime, end: datetime, with_start=True, with_end=True) -> WindowSums:
+        """區間合計 (volume, Σp·v, Σp²·v ...)，兩次 searchsorted + prefix sum 相減"""
+        left, right = self.tick_buffer.window_bounds(
             start,
             end,
+            self.tick_left,
+            self.tick_right + 1,
             with_start,
             with_end
         )
+        return self.tick_buffer.range_sums(left, right)
 
-    def get_bidask_by_time_range(self, start: datetime, end: datetime, with_start=True, with_end=True) -> list[
-        BidAskFOP]:
-        return get_by_time_range(
-            self.bid_ask_buffer,
-            self.bid_ask_left,
-            self.bid_ask_right + 1,
+    def get_bidask_by_time_range(self, start: datetime, end: datetime, with_start=True, with_end=True) -> ColumnWindow:
+        return self.bid_ask_buffer.window(
             start,
             end,
+            self.bid_ask_left,
+            self.bid_ask_right + 1,
             with_start,
             with_end
         )
 
-    def latest_tick(self):
+    def latest_tick(self) -> TickFOP:
         return self.tick_buffer[self.tick_right]
 
-    def prev_tick(self):
+    def prev_tick(self) -> TickFOP | None:
         if self.tick_right - self.tick_left + 1 >= 2 and self.tick_right >= 0:
             return self.tick_buffer[self.tick_right - 1]
         return None
 
-    def latest_bidask(self):
+    def latest_bidask(self) -> BidAskFOP:
         return self.bid_ask_buffer[self.bid_ask_right]
 
+    def tick_anchor(self) -> tuple[int, int]:
+        """最新一筆 tick 的 (ts, total_volume)，checkpoint 還原時用來比對 tick buffer"""
+        w = self.tick_buffer.view(self.tick_right, self.tick_right + 1)
+        return int(w.ts[0]), int(w.total_volume[0])
+
+    def has_tick(self, anchor: tuple[int, int]) -> bool:
+        ts, total_volume = anchor
+        idx = self.tick_buffer.search(ts, self.tick_left, self.tick_right + 1)
+        w = self.tick_buffer.view(idx, idx + 1)
+        return bool(w) and int(w.ts[0]) == ts and int(w.total_volume[0]) == total_volume
+
+    def snapshot(self) -> dict:
+        """window_size 內的原始 tick 欄位 (copy)，供 checkpoint 使用"""
+        if self.tick_right < self.tick_left:
+            return {'ticks': None}
+        right_ts = self.tick_buffer.ts_at(self.tick_right)
+        w = self.tick_buffer.window(
+            right_ts - timedelta_to_ns(self.window_size),
+            right_ts,
+            self.tick_left,
+            self.tick_right + 1
+        )
+        return {'ticks': {k: w.columns()[k].copy() for k in TickRingBuffer.RAW_COLUMNS}}
+
+    def restore_checkpoint(self, snapshot: dict):
+        """start 之前呼叫，ticks 會在取得 in-day history 時併入"""
+        self._checkpoint_ticks = snapshot.get('ticks')
+
     @abstractmethod
     def wait_for_tick(self):
         pass
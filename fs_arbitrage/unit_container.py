@@ -1,11 +1,14 @@
+from typing import Iterable
+
 from shioaji import Exchange, TickFOPv1, TickSTKv1, BidAskFOPv1, BidAskSTKv1, Shioaji
 
 from fs_arbitrage.variety_unit import VarietyUnit
 
 
 class UnitContainer:
-    def __init__(self, units: list[VarietyUnit] = None):
+    def __init__(self, units: list[VarietyUnit] = None, sj_fields: dict[type, Iterable[str]] = None):
         self._mapping: dict[str, VarietyUnit] = {}
+        self._converters = VarietyUnit.build_converters(sj_fields)
         if units:
             self.extend(units)
 
@@ -20,12 +23,15 @@ class UnitContainer:
         return self._mapping.get(code)
 
     def on_sj_data(self, _exchange: Exchange, sj_data: TickFOPv1 | TickSTKv1 | BidAskFOPv1 | BidAskSTKv1):
-        unit = self.get(sj_data.code)
+        unit = self._mapping.get(sj_data.code)
 
         if not unit:
             return
 
-        unit.on_sj_data(sj_data)
+        convert = self._converters.get(type(sj_data))
+        if not convert:
+            raise TypeError(f'unsupported sj data type: {type(sj_data)}')
+        unit.on_unified_data(convert(sj_data))
 
     def get_all_tick_sub_data(self):
         data = []
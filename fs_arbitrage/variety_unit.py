@@ -1,4 +1,5 @@
 from collections import deque
+from typing import Any, Callable, Iterable
 
 from shioaji import TickFOPv1, TickSTKv1, BidAskFOPv1, BidAskSTKv1, constant
 from shioaji.contracts import Contract
@@ -22,6 +23,7 @@ class VarietyUnit:
             proportional_transaction_cost: float,
             buffer_size: int = 100,
             event_queue: UnitDirtyEmitter = None,
+            sj_fields: dict[type, Iterable[str]] = None,
     ):
         self._tick_buffer: Deque[TickBase] = deque(maxlen=buffer_size)
         self._bidask_buffer: Deque[BidAskBase] = deque(maxlen=buffer_size)
@@ -33,6 +35,7 @@ class VarietyUnit:
         self.proportional_transaction_cost = proportional_transaction_cost
 
         self._event_emitter = event_queue
+        self._converters = self.build_converters(sj_fields)
 
     TRANSITION_MAPPING = {
         TickFOPv1: TickFOP,
@@ -41,6 +44,16 @@ class VarietyUnit:
         BidAskSTKv1: BidAskSTK,
     }
 
+    @classmethod
+    def build_converters(cls, sj_fields: dict[type, Iterable[str]] = None) -> dict[type, Callable[[Any], Any]]:
+        """
+        :param sj_fields: {unified type: 要複製的欄位}，未指定的用各類別的 SJ_FIELDS
+        """
+        sj_fields = sj_fields or {}
+        return {
+            sj_type: unified_type.sj_converter(sj_fields.get(unified_type))
+            for sj_type, unified_type in cls.TRANSITION_MAPPING.items()
+        }
 
     @property
     def code(self):
@@ -53,10 +66,12 @@ class VarietyUnit:
             self._bidask_buffer.append(unified_data)
 
     def on_sj_data(self, sj_data: TickFOPv1 | TickSTKv1 | BidAskFOPv1 | BidAskSTKv1):
-        corresponding_unified_type = self.TRANSITION_MAPPING.get(type(sj_data))
-        if not corresponding_unified_type:
+        convert = self._converters.get(type(sj_data))
+        if not convert:
             raise TypeError(f'unsupported sj data type: {type(sj_data)}')
-        unified_data = corresponding_unified_type.from_sj(sj_data)
+        self.on_unified_data(convert(sj_data))
+
+    def on_unified_data(self, unified_data: TickBase | BidAskBase):
         self._dispatch(unified_data)
 
         if self._event_emitter:
@@ -17,6 +17,7 @@ from datetime import timedelta, date
 
 from backtesting.feature_builder.feature_builder import FeatureBuilder
 from backtesting.feature_builder._feature_config import FeatureConfig
+from backtesting.feature_builder.feature_store import feature_store, day_edges
 
 import sys
 
@@ -24,7 +25,7 @@ sys.path.insert(0, r'C:\Repos\shioaji_trading')
 
 
 class DonchianBacktestingContext(BacktestingContext):
-    def __init__(self, start: date, end: date, with_label=False):
+    def __init__(self, start: date, end: date, with_label=False, use_feature_store=False):
         super().__init__()
 
         day_labels = []
@@ -44,6 +45,10 @@ class DonchianBacktestingContext(BacktestingContext):
         fb = FeatureBuilder(ticks, self.iiva_lookup, FeatureConfig(
             donchian_window=timedelta(seconds=1800),
         ))
+        if use_feature_store:
+            days = [s.date for s in daily_slices if s.np_slice is not None]
+            edges = day_edges(ticks.ts_seconds(), [s.ts_seconds()[-1] for s in slices])
+            fb.attach_store(feature_store().bind(self.contract.symbol, days, edges))
         f = fb.build_features(['price', 'donchian_ha', 'donchian_la', 'donchian_h', 'donchian_l'], with_label)
         print(f'feature build consumed {time.time() - _st_time} seconds.')
 
@@ -1,3 +1,7 @@
-from .npy_cache_manager import NpyCacheManager, CacheState
+from .cache_state import CacheState
+from .cache_manifest import CacheManifest
+from .memory_tier import MemoryTier, memory_tier
+from .npy_cache_manager import NpyCacheManager, MmapMode
+from .packed_cache_manager import PackedCacheManager
 
-__all__ = ["NpyCacheManager", "CacheState"]
+__all__ = ["NpyCacheManager", "CacheState", "MmapMode", "PackedCacheManager", "CacheManifest", "MemoryTier", "memory_tier"]
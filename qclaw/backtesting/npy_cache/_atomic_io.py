@@ -0,0 +1,46 @@
+"""
+Crash / concurrency safe file primitives shared by the npy caches.
+
+atomic_write : write to a temp file in the same directory, fsync, os.replace.
+               Readers see either the old file or the complete new one, never
+               a partial write; a crash leaves at most a stray *.tmp file.
+key_lock     : per-key advisory lock (filelock) under root/.locks, held while
+               writing a key and, by _NpyCachedDataManagerBase, while fetching
+               a missing date so concurrent processes fetch it only once.
+"""
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Callable
+
+from filelock import FileLock
+
+LOCK_DIR = ".locks"
+
+
+def atomic_write(path: Path, write: Callable[[BinaryIO], None]) -> int:
+    """write(f) 寫入暫存檔後 rename 成 path，回傳檔案大小"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return size
+
+
+def key_lock(root: Path, key: str, timeout: float = -1) -> FileLock:
+    """
+    同一個 key 在所有 process / thread 間互斥 (timeout < 0 表示一直等)。
+    同一路徑共用一個 instance (is_singleton)，同一個 thread 可重入，
+    例如 get 抓資料時持有鎖，之後 set 寫入同一個 key 不會自己卡住。
+    """
+    lock_dir = root / LOCK_DIR
+    lock_dir.mkdir(exist_ok=True)
+    return FileLock(lock_dir / f"{key}.lock", timeout=timeout, is_singleton=True)
@@ -0,0 +1,194 @@
+"""
+CacheManifest — persistent key index for NpyCacheManager / PackedCacheManager.
+
+Stored as SQLite (WAL) under the cache root, one row per key:
+    key | state (HIT / EMPTY) | size | dtype | length | checksum (crc32 hex) | mtime
+
+Updated in the same call as the file write (set / mark_empty / delete), so
+``keys`` / ``cache_info`` / ``is_cached`` / missing-key queries are index
+lookups instead of walking the cache tree.
+
+Built lazily: the first index query on a manifest that is not marked complete
+(new file, or a previous build that never finished) scans the files under a
+cross-process lock. ``rebuild`` swaps the scan in with a single transaction and
+sets the ``complete`` marker in the same commit, so an interrupted build leaves
+the previous index (or none) instead of a partial one. Re-scan on demand,
+e.g. after copying a cache from another machine:
+
+    python -m qclaw.backtesting.npy_cache.cache_manifest [root]
+"""
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Iterable
+
+import numpy as np
+
+from qclaw.backtesting.npy_cache._atomic_io import key_lock
+from qclaw.backtesting.npy_cache.cache_state import CacheState
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key      TEXT PRIMARY KEY,
+    state    INTEGER NOT NULL,
+    size     INTEGER NOT NULL DEFAULT 0,
+    dtype    TEXT,
+    length   INTEGER,
+    checksum TEXT,
+    mtime    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def checksum(data: np.ndarray | bytes) -> str:
+    if isinstance(data, np.ndarray):
+        data = np.ascontiguousarray(data)
+    return f"{zlib.crc32(data):08x}"
+
+
+def glob_pattern(pattern: str) -> str:
+    """fnmatch pattern (``**`` ≡ ``*``) → SQLite GLOB pattern (same syntax, case sensitive)."""
+    return pattern.replace("**", "*")
+
+
+class CacheManifest:
+    def __init__(self, path: Path) -> None:
+        # 建立時不開檔，第一次查詢 / 寫入才連線
+        self.path = path
+        self._local = threading.local()
+        self._complete = False
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite connection 不能跨 thread 共用
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # ── Build ──────────────────────────────────────────────────────────────
+
+    def is_complete(self) -> bool:
+        if not self._complete:
+            row = self._conn().execute("SELECT value FROM meta WHERE name = 'complete'").fetchone()
+            self._complete = row is not None and row[0] == "1"
+        return self._complete
+
+    def ensure(self, scan: Callable[[], list[tuple]]) -> None:
+        """Build the index with scan() unless it is already marked complete."""
+        if self.is_complete():
+            return
+        with key_lock(self.path.parent, self.path.name):
+            # 等鎖期間可能已由其他 process 建好
+            if not self.is_complete():
+                self.rebuild(scan)
+
+    def rebuild(self, scan: Callable[[], list[tuple]]) -> int:
+        """Replace the index with scan() rows (key, state, size, dtype, length, checksum).
+
+        One transaction: an interrupted build rolls back. Rows written by
+        set / mark_empty while scanning are newer than the scan and are kept.
+        """
+        with key_lock(self.path.parent, self.path.name):
+            started = time.time()
+            rows = scan()
+            now = time.time()
+            with self._conn() as conn:
+                conn.execute("DELETE FROM entries WHERE mtime < ?", (started,))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(*row, now) for row in rows],
+                )
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('complete', '1')")
+            self._complete = True
+        return len(rows)
+
+    # ── Write ──────────────────────────────────────────────────────────────
+
+    def put(self, key: str, size: int, dtype: str = None, length: int = None, checksum: str = None) -> None:
+        self.put_many([(key, CacheState.HIT.value, size, dtype, length, checksum)])
+
+    def put_empty(self, key: str) -> None:
+        self.put_many([(key, CacheState.EMPTY.value, 0, None, None, None)])
+
+    def put_many(self, rows: Iterable[tuple]) -> None:
+        """rows: (key, state, size, dtype, length, checksum)"""
+        now = time.time()
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*row, now) for row in rows],
+            )
+
+    def remove(self, keys: Iterable[str]) -> None:
+        with self._conn() as conn:
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in keys])
+
+    # ── Read ───────────────────────────────────────────────────────────────
+
+    def state(self, key: str) -> CacheState:
+        row = self._conn().execute("SELECT state FROM entries WHERE key = ?", (key,)).fetchone()
+        return CacheState(row[0]) if row else CacheState.MISS
+
+    def states(self, keys: Iterable[str]) -> dict[str, CacheState]:
+        """批次查詢，不在 index 中的 key 為 MISS"""
+        keys = list(keys)
+        found = {}
+        conn = self._conn()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            found.update(conn.execute(
+                f"SELECT key, state FROM entries WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return {k: CacheState(found[k]) if k in found else CacheState.MISS for k in keys}
+
+    def keys(self, pattern: str = "*", state: CacheState = CacheState.HIT) -> list[str]:
+        rows = self._conn().execute(
+            "SELECT key FROM entries WHERE state = ? AND key GLOB ? ORDER BY key",
+            (state.value, glob_pattern(pattern)),
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def info(self, pattern: str = "*") -> dict:
+        rows = self._conn().execute(
+            "SELECT state, COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE key GLOB ? GROUP BY state",
+            (glob_pattern(pattern),),
+        ).fetchall()
+        by_state = {CacheState(s): (count, size) for s, count, size in rows}
+        hits, total_bytes = by_state.get(CacheState.HIT, (0, 0))
+        empties, _ = by_state.get(CacheState.EMPTY, (0, 0))
+        return {"total_keys": hits + empties, "hits": hits, "empties": empties, "total_bytes": total_bytes}
+
+    def entry(self, key: str) -> dict | None:
+        cur = self._conn().execute("SELECT * FROM entries WHERE key = ?", (key,))
+        row = cur.fetchone()
+        return dict(zip([c[0] for c in cur.description], row)) if row else None
+
+
+def main():
+    import argparse
+
+    from qclaw.backtesting.npy_cache.npy_cache_manager import NpyCacheManager
+    from qclaw.backtesting.npy_cache.packed_cache_manager import PackedCacheManager
+
+    parser = argparse.ArgumentParser(description="Rebuild the npy / packed cache manifests by scanning the files.")
+    parser.add_argument("root", nargs="?", default=None, help="cache root (default: npy_cache/caches)")
+    args = parser.parse_args()
+
+    # 建立 manager 不會掃描，只有 rebuild_manifest 掃一次
+    for cache in (NpyCacheManager(args.root), PackedCacheManager(args.root)):
+        n = cache.rebuild_manifest()
+        print(f"{cache!r}: indexed {n} keys")
+
+
+if __name__ == "__main__":
+    main()
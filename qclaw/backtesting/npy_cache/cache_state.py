@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class CacheState(Enum):
+    """Three-state cache result."""
+    HIT = 1
+    EMPTY = 2
+    MISS = 0
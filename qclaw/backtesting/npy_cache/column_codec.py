@@ -0,0 +1,193 @@
+"""
+Column codecs for the packed cache (optional, lossless).
+
+    RAW     : stored as is (also the fallback whenever a codec would not round-trip)
+    NARROW  : integers cast to the smallest dtype holding [min, max]
+              (volume int64 → u1/u2/u4, tick_type int32 → u1 ...)
+    SCALED  : float prices on a decimal grid → int32 of value × 10^scale, per column (per day)
+    DELTA   : integral float/int (timestamps) → first value + zigzag varint of deltas
+    SCALED_DELTA : SCALED, then DELTA on the scaled integers (tick-by-tick prices move a few grid steps)
+
+The smallest candidate wins.
+Every encode is verified by decoding it again and comparing bit patterns
+(np.array_equal treats -0.0 == 0.0), so decode(encode(x)) is bit-identical
+to x or the column is stored RAW. Varint encode / decode are
+numba kernels; the other codecs are a single vectorized numpy cast.
+"""
+from enum import IntEnum
+
+import numpy as np
+from numba import njit
+
+
+class Codec(IntEnum):
+    RAW = 0
+    NARROW = 1
+    SCALED = 2
+    DELTA = 3
+    SCALED_DELTA = 4
+
+
+MAX_SCALE = 4  # 最多到 0.0001 的價格格點
+_NARROW_TYPES = (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32)
+
+
+# ── varint ─────────────────────────────────────────────────────────────────
+
+@njit(cache=True)
+def _zigzag_varint_encode(deltas: np.ndarray) -> np.ndarray:
+    out = np.empty(len(deltas) * 10, dtype=np.uint8)
+    pos = 0
+    for i in range(len(deltas)):
+        d = deltas[i]
+        z = np.uint64((d << 1) ^ (d >> 63))
+        while z >= np.uint64(0x80):
+            out[pos] = np.uint8((z & np.uint64(0x7F)) | np.uint64(0x80))
+            z >>= np.uint64(7)
+            pos += 1
+        out[pos] = np.uint8(z)
+        pos += 1
+    return out[:pos]
+
+
+@njit(cache=True)
+def _zigzag_varint_decode_cumsum(buf: np.ndarray, first: np.int64, n: int) -> np.ndarray:
+    out = np.empty(n, dtype=np.int64)
+    if n == 0:
+        return out
+    out[0] = first
+    acc = first
+    pos = 0
+    for i in range(1, n):
+        z = np.uint64(0)
+        shift = np.uint64(0)
+        while True:
+            b = np.uint64(buf[pos])
+            pos += 1
+            z |= (b & np.uint64(0x7F)) << shift
+            if b < np.uint64(0x80):
+                break
+            shift += np.uint64(7)
+        acc += np.int64(z >> np.uint64(1)) ^ -np.int64(z & np.uint64(1))
+        out[i] = acc
+    return out
+
+
+# ── encode ─────────────────────────────────────────────────────────────────
+
+def _bit_equal(a: np.ndarray, b: np.ndarray) -> bool:
+    """逐 bit 比較 (以 b 的 dtype、little endian)，-0.0 與 0.0 視為不同"""
+    if a.shape != b.shape:
+        return False
+    dtype = b.dtype.newbyteorder("<")
+    return np.array_equal(
+        np.ascontiguousarray(a, dtype=dtype).view(np.uint8),
+        np.ascontiguousarray(b, dtype=dtype).view(np.uint8),
+    )
+
+
+def _as_int64_exact(arr: np.ndarray) -> np.ndarray | None:
+    if arr.dtype.kind in "iu":
+        return arr.astype(np.int64)
+    if arr.dtype.kind != "f" or not np.all(np.isfinite(arr)):
+        return None
+    ints = arr.astype(np.int64)
+    return ints if _bit_equal(ints.astype(arr.dtype), arr) else None
+
+
+def _delta_varint(ints: np.ndarray) -> bytes:
+    first = np.array([ints[0]], dtype="<i8").tobytes()
+    return first + _zigzag_varint_encode(np.diff(ints)).tobytes()
+
+
+def _encode_delta(arr: np.ndarray) -> bytes | None:
+    ints = _as_int64_exact(arr)
+    if ints is None or len(ints) < 2:
+        return None
+    return _delta_varint(ints)
+
+
+def _encode_narrow(arr: np.ndarray) -> tuple[np.dtype, bytes] | None:
+    if arr.dtype.kind not in "iu" or len(arr) == 0:
+        return None
+    lo, hi = arr.min(), arr.max()
+    for t in _NARROW_TYPES:
+        info = np.iinfo(t)
+        if info.min <= lo and hi <= info.max and np.dtype(t).itemsize < arr.dtype.itemsize:
+            return np.dtype(t).newbyteorder("<"), arr.astype(np.dtype(t).newbyteorder("<")).tobytes()
+    return None
+
+
+def _encode_scaled(arr: np.ndarray) -> tuple[int, np.ndarray] | None:
+    """:return: (scale, int32 of value × 10^scale)"""
+    if arr.dtype.kind != "f" or len(arr) == 0 or not np.all(np.isfinite(arr)):
+        return None
+    for scale in range(MAX_SCALE + 1):
+        scaled = np.round(arr * 10.0 ** scale)
+        if np.abs(scaled).max() > np.iinfo(np.int32).max:
+            return None
+        stored = scaled.astype("<i4")
+        if _bit_equal(_decode_scaled(stored, scale, arr.dtype), arr):
+            return scale, stored
+    return None
+
+
+def _decode_scaled(stored: np.ndarray, scale: int, dtype: np.dtype) -> np.ndarray:
+    if scale == 0:
+        return stored.astype(dtype)
+    return (stored / 10.0 ** scale).astype(dtype, copy=False)
+
+
+def encode_column(arr: np.ndarray) -> tuple[Codec, int, np.dtype, bytes]:
+    """
+    :return: (codec, param, stored dtype, payload)
+        param: SCALED / SCALED_DELTA 的 scale 指數，其他為 0
+    """
+    arr = np.ascontiguousarray(arr)
+    logical = arr.dtype.newbyteorder("<")
+
+    candidates = []
+    if (enc := _encode_delta(arr)) is not None:
+        candidates.append((Codec.DELTA, 0, np.dtype("u1"), enc))
+    if (enc := _encode_scaled(arr)) is not None:
+        scale, stored = enc
+        candidates.append((Codec.SCALED, scale, np.dtype("<i4"), stored.tobytes()))
+        if len(stored) >= 2:
+            candidates.append((Codec.SCALED_DELTA, scale, np.dtype("u1"), _delta_varint(stored.astype(np.int64))))
+    if (enc := _encode_narrow(arr)) is not None:
+        candidates.append((Codec.NARROW, 0, enc[0], enc[1]))
+
+    raw = (Codec.RAW, 0, logical, arr.astype(logical, copy=False).tobytes())
+    best = min(candidates + [raw], key=lambda c: len(c[3]))
+    if best[0] != Codec.RAW:
+        decoded = decode_column(best[0], best[1], best[2], logical, len(arr), np.frombuffer(best[3], np.uint8))
+        if not _bit_equal(decoded, arr):
+            return raw
+    return best
+
+
+# ── decode ─────────────────────────────────────────────────────────────────
+
+def decode_column(
+        codec: Codec,
+        param: int,
+        stored: np.dtype,
+        logical: np.dtype,
+        n: int,
+        payload: np.ndarray,
+) -> np.ndarray:
+    """payload 為 uint8 buffer (可為 memmap)；RAW 直接回傳 view，不複製"""
+    if codec == Codec.RAW or codec == Codec.NARROW:
+        values = np.ndarray((n,), dtype=stored, buffer=payload)
+        return values if codec == Codec.RAW else values.astype(logical)
+    if codec == Codec.SCALED:
+        return _decode_scaled(np.ndarray((n,), dtype=stored, buffer=payload), param, logical)
+    if codec == Codec.DELTA or codec == Codec.SCALED_DELTA:
+        if n == 0:
+            return np.empty(0, dtype=logical)
+        first = np.frombuffer(payload, dtype="<i8", count=1)[0]
+        ints = _zigzag_varint_decode_cumsum(np.asarray(payload[8:]), first, n)
+        if codec == Codec.SCALED_DELTA:
+            return _decode_scaled(ints, param, logical)
+        return ints.astype(logical, copy=False)
+    raise Exception(f"unknown column codec: {codec}")
@@ -0,0 +1,117 @@
+"""
+MemoryTier — in-process LRU cache in front of NpyCacheManager / PackedCacheManager.
+
+Keyed by (cache root, cache key, mmap mode). Values are read-only arrays (or,
+for the packed cache, dicts of read-only column arrays), so callers can share
+them without copying. Total ``nbytes`` is kept under a byte budget, evicting
+the least recently used entries. Arrays backed by an np.memmap live in the OS
+page cache, not in process memory, and count 0 against the budget.
+
+Budget: env NPY_MEMORY_TIER_BYTES (default 1 GiB, 0 disables the tier).
+
+>>> memory_tier.stats()
+{'entries': 12, 'bytes': 52428800, 'budget': 1073741824, 'hits': 340, 'misses': 12, 'evictions': 0}
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable
+
+import numpy as np
+
+Value = np.ndarray | dict[str, np.ndarray]
+
+
+def _read_only(arr: np.ndarray) -> np.ndarray:
+    # 用 view 設唯讀，不影響呼叫端手上的原陣列
+    view = arr.view()
+    view.flags.writeable = False
+    return view
+
+
+def _is_mapped(arr: np.ndarray) -> bool:
+    # slice / view 的 base 一路往上找到 np.memmap (再上去是 mmap.mmap，不是 ndarray)
+    while isinstance(arr, np.ndarray):
+        if isinstance(arr, np.memmap):
+            return True
+        arr = arr.base
+    return False
+
+
+def _nbytes(value: Value) -> int:
+    arrays = value.values() if isinstance(value, dict) else (value,)
+    return sum(0 if _is_mapped(a) else a.nbytes for a in arrays)
+
+
+class MemoryTier:
+    def __init__(self, budget_bytes: int = None) -> None:
+        if budget_bytes is None:
+            budget_bytes = int(os.getenv("NPY_MEMORY_TIER_BYTES", 1 << 30))
+        self.budget_bytes = budget_bytes
+        self._entries: OrderedDict[Hashable, tuple[Value, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Value | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Value) -> Value:
+        """存入並回傳唯讀版本；超過 budget 的單一 value 不快取"""
+        if isinstance(value, dict):
+            value = {k: _read_only(v) for k, v in value.items()}
+        else:
+            value = _read_only(value)
+
+        size = _nbytes(value)
+        with self._lock:
+            self._pop(key)
+            if size > self.budget_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.budget_bytes:
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _pop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "budget": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __repr__(self) -> str:
+        return f"MemoryTier({self.stats()})"
+
+
+memory_tier = MemoryTier()
@@ -0,0 +1,86 @@
+"""
+Convert a per-field npy cache (NpyCacheManager) into the packed format (PackedCacheManager).
+
+    root/tmf/tick/2025-11-11/{ts,close,...}.npy  →  root/tmf/tick/2025-11-11.npk
+    root/tmf/tick/2025-11-11/ts.empty            →  root/tmf/tick/2025-11-11.nodata
+
+Usage:
+    python -m qclaw.backtesting.npy_cache.migrate_to_packed [root] [--pattern "tmf.tick.*"] [--delete]
+
+Days already present in the packed cache are skipped. The legacy files are only
+removed with --delete, after the packed file was written and read back.
+"""
+import argparse
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from qclaw.backtesting.npy_cache.npy_cache_manager import CacheState, NpyCacheManager
+from qclaw.backtesting.npy_cache.packed_cache_manager import PackedCacheManager
+
+
+def _day_key(field_key: str) -> str:
+    return field_key.rsplit(".", 1)[0]
+
+
+def migrate(
+        npy_cache: NpyCacheManager,
+        packed_cache: PackedCacheManager,
+        pattern: str = "**",
+        delete: bool = False,
+) -> dict[str, int]:
+    days: dict[str, list[str]] = defaultdict(list)
+    for key in npy_cache.keys(pattern):
+        days[_day_key(key)].append(key)
+
+    stats = {"packed": 0, "empty": 0, "skipped": 0}
+    for day, field_keys in sorted(days.items()):
+        if packed_cache.is_cached(day) != CacheState.MISS:
+            stats["skipped"] += 1
+            continue
+
+        columns = {key.rsplit(".", 1)[1]: npy_cache.get(key) for key in field_keys}
+        packed_cache.set(day, columns)
+
+        loaded = packed_cache.get(day)
+        for name, arr in columns.items():
+            if not np.array_equal(loaded[name], arr):
+                raise Exception(f"{day}.{name}: packed data does not match the npy file")
+
+        if delete:
+            for key in field_keys:
+                npy_cache._npy_path(key).unlink()
+            npy_cache.manifest.remove(field_keys)
+        stats["packed"] += 1
+
+    # 舊格式的 empty marker 掛在 ts 欄位上
+    for field_key in npy_cache.manifest.keys(pattern, CacheState.EMPTY):
+        day = _day_key(field_key)
+        if packed_cache.is_cached(day) != CacheState.MISS:
+            continue
+        packed_cache.mark_empty(day)
+        if delete:
+            npy_cache._empty_path(field_key).unlink(missing_ok=True)
+            npy_cache.manifest.remove([field_key])
+        stats["empty"] += 1
+
+    if delete:
+        npy_cache._prune_empty_dirs()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", nargs="?", default=None, help="cache root (default: npy_cache/caches)")
+    parser.add_argument("--pattern", default="**", help="key pattern of the npy cache, e.g. 'tmf.tick.*'")
+    parser.add_argument("--delete", action="store_true", help="remove the per-field files after migration")
+    args = parser.parse_args()
+
+    root = Path(args.root) if args.root else None
+    stats = migrate(NpyCacheManager(root), PackedCacheManager(root), args.pattern, args.delete)
+    print(f"packed {stats['packed']} days, {stats['empty']} empty markers, skipped {stats['skipped']}")
+
+
+if __name__ == "__main__":
+    main()
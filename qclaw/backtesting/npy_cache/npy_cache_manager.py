@@ -21,19 +21,43 @@ Wildcard support (keys / delete):
     "tmf.tick.2025-11-11.*"  → all fields for that date
     "tmf.*.2025-11-11.time"  → time across all categories
     "tmf.**"                 → everything under tmf/ (globstar)
+
+Manifest:
+    every set / mark_empty / delete is recorded in a SQLite index
+    (root/.manifest.sqlite, see cache_manifest.py); keys / cache_info /
+    is_cached / missing are index lookups. Built by a full scan on the first
+    index query while the manifest is not marked complete (not when the
+    manager is created); rebuild_manifest() re-scans on demand.
+
+Concurrency:
+    set / mark_empty hold a per-key file lock and write atomically
+    (temp file + fsync + rename, see _atomic_io.py), so parallel processes
+    sharing one cache root never observe a partially written .npy.
+
+Memory tier:
+    get() goes through a shared in-process LRU (memory_tier.py, byte budget
+    NPY_MEMORY_TIER_BYTES, keyed per mmap_mode; memmaps do not count against
+    the budget) and returns read-only arrays; set / mark_empty / delete
+    invalidate the key. get(key, mmap_mode="c") bypasses the tier and
+    returns a private writable copy-on-write map.
+
+Memory-mapped reads:
+    get(key, mmap_mode="r") returns a read-only np.memmap instead of reading
+    the whole file. Opening is O(1) and the pages are shared through the OS
+    page cache across processes reading the same cache root.
 """
-import fnmatch
-from enum import StrEnum, Enum
 from pathlib import Path
+from typing import Literal
 
 import numpy as np
+from filelock import FileLock
 
+from qclaw.backtesting.npy_cache._atomic_io import atomic_write, key_lock
+from qclaw.backtesting.npy_cache.cache_manifest import CacheManifest, checksum
+from qclaw.backtesting.npy_cache.cache_state import CacheState
+from qclaw.backtesting.npy_cache.memory_tier import MemoryTier, memory_tier
 
-class CacheState(Enum):
-    """Three-state cache result."""
-    HIT = 1
-    EMPTY = 2
-    MISS = 0
+MmapMode = Literal["r", "c"]
 
 
 class NpyCacheManager:
@@ -56,13 +80,16 @@ class NpyCacheManager:
     ['tmf.tick.2025-11-11.time']
     """
 
-    def __init__(self, root: str | Path = None) -> None:
+    def __init__(self, root: str | Path = None, memory: MemoryTier = None) -> None:
+        self.memory = memory or memory_tier
         if root:
             self.root = Path(root).resolve()
         else:
             self.root = Path(__file__).resolve().parent / "caches"
         self.root.mkdir(parents=True, exist_ok=True)
 
+        self.manifest = CacheManifest(self.root / ".manifest.sqlite")
+
     # ── Key ↔ Path ─────────────────────────────────────────────────────────
 
     @staticmethod
@@ -98,17 +125,36 @@ class NpyCacheManager:
 
     # ── Three-state read ───────────────────────────────────────────────────
 
-    def get(self, key: str) -> np.ndarray | None:
+    def get(self, key: str, mmap_mode: MmapMode | None = None) -> np.ndarray | None:
         """Read cached array.
 
+        Parameters
+        ----------
+        mmap_mode : {"r", "c"} | None
+            None reads the file into memory (default).
+            "r" maps the file read-only (zero-copy); "c" is copy-on-write,
+            writes stay private to the process and never touch the file.
+
         Returns
         -------
-        np.ndarray : cache hit
+        np.ndarray : cache hit (read-only, shared through the memory tier,
+                     which keeps "r" and in-memory reads apart;
+                     "c" bypasses the tier and is writable)
         None       : empty marker OR cache miss (use ``is_cached`` to distinguish)
         """
+        if mmap_mode == "c":
+            # copy-on-write 每次呼叫各自一份可寫的 map，不能經過共用的唯讀 tier
+            p = self._npy_path(key)
+            return np.load(p, mmap_mode=mmap_mode) if p.is_file() else None
+
+        tier_key = (self.root, key, mmap_mode)
+        arr = self.memory.get(tier_key)
+        if arr is not None:
+            return arr
+
         p = self._npy_path(key)
         if p.is_file():
-            return np.load(p)
+            return self.memory.put(tier_key, np.load(p, mmap_mode=mmap_mode))
         return None
 
     def exists(self, key: str) -> bool:
@@ -120,28 +166,67 @@ class NpyCacheManager:
         return self._empty_path(key).is_file()
 
     def is_cached(self, key: str) -> CacheState:
-        """Three-state check: hit / empty / miss."""
+        """Three-state check: hit / empty / miss.
+
+        Index lookup; keys absent from the manifest fall back to the
+        filesystem (files written by other tools) and are indexed on the way.
+        """
+        state = self.manifest.state(key)
+        if state != CacheState.MISS:
+            return state
         if self.exists(key):
+            self._index(key, np.load(self._npy_path(key), mmap_mode="r"))
             return CacheState.HIT
         if self.has_empty(key):
+            self.manifest.put_empty(key)
             return CacheState.EMPTY
         return CacheState.MISS
 
+    def missing(self, keys: list[str]) -> list[str]:
+        """Keys that are neither hit nor empty (batched index lookup).
+
+        >>> cache.missing([f"tmf.tick.{d}.ts" for d in dates])
+        """
+        return [k for k, state in self._index_ready().states(keys).items() if state == CacheState.MISS]
+
     # ── Write ──────────────────────────────────────────────────────────────
 
     def set(self, key: str, arr: np.ndarray) -> None:
-        """Write array to cache. Removes any existing .empty marker."""
+        """Write array to cache. Removes any existing .empty marker.
+
+        Atomic (temp file + fsync + rename) under the key's file lock.
+        """
         p = self._npy_path(key)
-        p.parent.mkdir(parents=True, exist_ok=True)
-        self._empty_path(key).unlink(missing_ok=True)
-        np.save(p, arr)
+        with self.lock(key):
+            size = atomic_write(p, lambda f: np.save(f, arr))
+            self._invalidate(key)
+            self._empty_path(key).unlink(missing_ok=True)
+            self._index(key, arr, size)
+
+    def _invalidate(self, key: str) -> None:
+        # tier 以 mmap_mode 區分 (memmap 與讀入記憶體的陣列各一份)，"c" 不經過 tier
+        for mode in (None, "r"):
+            self.memory.invalidate((self.root, key, mode))
+
+    def _index(self, key: str, arr: np.ndarray, size: int = None) -> None:
+        if size is None:
+            size = self._npy_path(key).stat().st_size
+        self.manifest.put(key, size, arr.dtype.str, len(arr), checksum(arr))
 
     def mark_empty(self, key: str) -> None:
         """Mark key as confirmed-no-data. Removes any existing .npy file."""
         p = self._empty_path(key)
         p.parent.mkdir(parents=True, exist_ok=True)
-        self._npy_path(key).unlink(missing_ok=True)
-        p.touch()
+        with self.lock(key):
+            p.touch()
+            self._npy_path(key).unlink(missing_ok=True)
+            self._invalidate(key)
+            self.manifest.put_empty(key)
+
+    def lock(self, key: str, timeout: float = -1) -> FileLock:
+        """Cross-process advisory lock for key (``with cache.lock(key): ...``)."""
+        self._validate_key(key)
+        return key_lock(self.root, key, timeout)
 
     # ── Enumerate (wildcard) ───────────────────────────────────────────────
 
@@ -151,9 +236,8 @@ class NpyCacheManager:
         Pattern uses ``*`` to match any single segment and ``**`` to match
         zero or more segments (globstar).
 
-        The implementation scans all ``.npy`` files under root and filters
-        with ``fnmatch``, so pattern syntax follows ``fnmatch`` rules applied
-        to the dot-separated key string.
+        Served from the manifest (SQLite ``GLOB``, same syntax as ``fnmatch``;
+        ``*`` already matches across dots, so ``**`` ≡ ``*``).
 
         Examples
         --------
@@ -161,56 +245,62 @@ class NpyCacheManager:
         >>> cache.keys("tmf.tick.2025-11-11.*")     # all fields for one date
         >>> cache.keys("tmf.*.2025-11-11.time")     # time across categories
         """
-        # Collect every .npy file → key
-        all_keys: list[str] = []
-        for p in self.root.rglob("*.npy"):
-            all_keys.append(self._path_to_key(p, self.root))
-
-        # fnmatch on dot-separated key strings
-        if "**" in pattern:
-            # Convert ** to match zero+ segments:
-            # "tmf.**" → "tmf.*" (fnmatch * matches everything including dots)
-            # But we want "tmf.**" to mean tmf + anything after,
-            # and "**.time" to mean anything ending in .time.
-            # fnmatch * already matches across dots, so ** ≡ * in fnmatch.
-            fn_pattern = pattern.replace("**", "*")
-        else:
-            fn_pattern = pattern
-
-        return sorted(k for k in all_keys if fnmatch.fnmatch(k, fn_pattern))
+        return self._index_ready().keys(pattern)
 
     # ── Delete (wildcard) ──────────────────────────────────────────────────
 
     def delete(self, pattern: str = "*") -> int:
         """Delete keys matching pattern. Returns count of deleted keys.
 
-        Removes both .npy and .empty files for matched keys.
+        Removes both .npy and .empty files for matched keys, each under the
+        key's file lock.
         """
-        matched = self.keys(pattern)
-        count = 0
+        manifest = self._index_ready()
+        matched = manifest.keys(pattern) + manifest.keys(pattern, CacheState.EMPTY)
+        dirs = set()
         for key in matched:
-            self._npy_path(key).unlink(missing_ok=True)
-            self._empty_path(key).unlink(missing_ok=True)
-            count += 1
-        # Clean up empty directories
-        self._prune_empty_dirs()
-        return count
+            # 與 set / mark_empty 互斥，否則 manifest 可能在檔案寫入後被移除
+            with self.lock(key):
+                self._npy_path(key).unlink(missing_ok=True)
+                self._empty_path(key).unlink(missing_ok=True)
+                self._invalidate(key)
+                self.manifest.remove([key])
+            dirs.add(self._npy_path(key).parent)
+        # Clean up empty directories (only those we touched)
+        self._prune_dirs(list(dirs))
+        return len(matched)
 
     # ── Utilities ──────────────────────────────────────────────────────────
 
     def cache_info(self, pattern: str = "*") -> dict:
         """Return cache summary for keys matching pattern."""
-        matched = self.keys(pattern)
-        hits = [k for k in matched if self.exists(k)]
-        empties = [k for k in matched if self.has_empty(k)]
-        total_size = sum(self._npy_path(k).stat().st_size for k in hits)
-        return {
-            "root": str(self.root),
-            "total_keys": len(matched),
-            "hits": len(hits),
-            "empties": len(empties),
-            "total_bytes": total_size,
-        }
+        return {"root": str(self.root), **self._index_ready().info(pattern)}
+
+    def _index_ready(self) -> CacheManifest:
+        self.manifest.ensure(self._scan)
+        return self.manifest
+
+    def rebuild_manifest(self) -> int:
+        """Re-scan the cache tree into the manifest. Returns the number of indexed keys."""
+        return self.manifest.rebuild(self._scan)
+
+    def _scan(self) -> list[tuple]:
+        rows = []
+        for p in self.root.rglob("*.npy"):
+            arr = np.load(p, mmap_mode="r")
+            rows.append((self._path_to_key(p, self.root), CacheState.HIT.value, p.stat().st_size,
+                         arr.dtype.str, len(arr), checksum(arr)))
+        for p in self.root.rglob("*.empty"):
+            if not p.with_suffix(".npy").exists():
+                rows.append((self._path_to_key(p, self.root), CacheState.EMPTY.value, 0, None, None, None))
+        return rows
+
+    def _prune_dirs(self, dirs: list[Path]) -> None:
+        """Remove the given directories and their parents while empty (up to root)."""
+        for d in sorted(dirs, key=lambda p: len(p.parts), reverse=True):
+            while d != self.root and d.is_dir() and not any(d.iterdir()):
+                d.rmdir()
+                d = d.parent
 
     def _prune_empty_dirs(self) -> None:
         """Remove empty subdirectories under root (bottom-up)."""
@@ -0,0 +1,329 @@
+"""
+PackedCacheManager — one file per (symbol, kind, date) holding every column.
+
+Design
+──────
+Key format : same dot-separated scheme as NpyCacheManager, without the field.
+             "tmf.tick.2025-11-11" → root/tmf/tick/2025-11-11.npk
+
+File layout (little endian):
+    header   : magic "NPKC" | version u2 | n_cols u2 | n_rows u8     (16 bytes)
+    columns  : n_cols × (name S24 | dtype S8 | codec u1 | param i1 | pad 6
+                         | stored dtype S8 | offset u8 | nbytes u8)  (64 bytes each)
+    data     : each column contiguous, starting at a 64-byte aligned offset
+    (version 1 files: column entry = name S24 | dtype S8 | offset u8, always raw; still readable)
+
+One open + one read (or one mmap) per day instead of one per field, and a
+single column can still be read alone by offset.
+
+Codec (optional, NPY_CACHE_CODEC=1 or PackedCacheManager(codec=True)):
+    columns are stored with column_codec.py (delta varint ts, int32 scaled
+    prices, narrowed integers), lossless. Raw columns stay zero-copy views;
+    encoded columns are decoded on read (once, then held by the memory tier).
+
+Three-state per key (same as NpyCacheManager):
+    hit   : .npk file exists
+    empty : .nodata marker exists → confirmed no data
+    miss  : neither file
+
+Keys are indexed in root/.packed_manifest.sqlite (see cache_manifest.py), built
+on the first index query rather than when the manager is created.
+Writes are atomic and hold the key's file lock (see _atomic_io.py).
+Reads go through the shared in-process memory tier (see memory_tier.py), keyed
+per mmap_mode; mapped columns do not count against its budget. mmap_mode="c"
+bypasses it and returns private writable copy-on-write columns.
+"""
+import os
+import zlib
+from pathlib import Path
+
+import numpy as np
+from filelock import FileLock
+
+from qclaw.backtesting.npy_cache._atomic_io import atomic_write, key_lock
+from qclaw.backtesting.npy_cache.cache_manifest import CacheManifest, checksum
+from qclaw.backtesting.npy_cache.cache_state import CacheState
+from qclaw.backtesting.npy_cache.column_codec import Codec, decode_column, encode_column
+from qclaw.backtesting.npy_cache.memory_tier import MemoryTier, memory_tier
+from qclaw.backtesting.npy_cache.npy_cache_manager import MmapMode, NpyCacheManager
+
+PACKED_MAGIC = b"NPKC"
+PACKED_VERSION = 2
+ALIGN = 64
+
+_HEADER = np.dtype([("magic", "S4"), ("version", "<u2"), ("n_cols", "<u2"), ("n_rows", "<u8")])
+_COLUMN_V1 = np.dtype([("name", "S24"), ("dtype", "S8"), ("offset", "<u8")])
+_COLUMN = np.dtype([
+    ("name", "S24"), ("dtype", "S8"), ("codec", "u1"), ("param", "i1"), ("pad", "V6"),
+    ("stored", "S8"), ("offset", "<u8"), ("nbytes", "<u8"),
+])
+
+
+def _align(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+
+class PackedCacheManager:
+    """Single-file-per-day multi-column cache.
+
+    Examples
+    --------
+    >>> cache = PackedCacheManager("caches")
+    >>> cache.set("tmf.tick.2025-11-11", {"ts": np.array([1.0]), "close": np.array([2.0])})
+    >>> cache.get("tmf.tick.2025-11-11", columns=["close"])
+    {'close': array([2.])}
+    """
+
+    SUFFIX = ".npk"
+    EMPTY_SUFFIX = ".nodata"
+
+    def __init__(self, root: str | Path = None, memory: MemoryTier = None, codec: bool = None) -> None:
+        self.memory = memory or memory_tier
+        self.codec = codec if codec is not None else os.getenv("NPY_CACHE_CODEC", "0") == "1"
+        if root:
+            self.root = Path(root).resolve()
+        else:
+            self.root = Path(__file__).resolve().parent / "caches"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        self.manifest = CacheManifest(self.root / ".packed_manifest.sqlite")
+
+    # ── Key ↔ Path ─────────────────────────────────────────────────────────
+
+    def _path(self, key: str) -> Path:
+        NpyCacheManager._validate_key(key)
+        return self.root / Path(*key.split(".")).parent / (key.split(".")[-1] + self.SUFFIX)
+
+    def _empty_path(self, key: str) -> Path:
+        return self._path(key).with_suffix(self.EMPTY_SUFFIX)
+
+    def _path_to_key(self, path: Path) -> str:
+        return path.relative_to(self.root).with_suffix("").as_posix().replace("/", ".")
+
+    # ── Read ───────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _parse_header(buf: np.ndarray) -> tuple[int, list[tuple]]:
+        """:return: n_rows, [(name, logical dtype, codec, param, stored dtype, offset, nbytes)]"""
+        header = np.frombuffer(buf, dtype=_HEADER, count=1)[0]
+        version = int(header["version"])
+        if header["magic"] != PACKED_MAGIC or version not in (1, PACKED_VERSION):
+            raise ValueError(f"unsupported packed cache file: magic={header['magic']}, version={version}")
+        n_rows, n_cols = int(header["n_rows"]), int(header["n_cols"])
+
+        if version == 1:
+            table = np.frombuffer(buf, dtype=_COLUMN_V1, count=n_cols, offset=_HEADER.itemsize)
+            columns = []
+            for name, dtype, offset in table.tolist():
+                dtype = np.dtype(dtype.decode())
+                columns.append((name.decode(), dtype, Codec.RAW, 0, dtype, offset, n_rows * dtype.itemsize))
+            return n_rows, columns
+
+        table = np.frombuffer(buf, dtype=_COLUMN, count=n_cols, offset=_HEADER.itemsize)
+        return n_rows, [
+            (name.decode(), np.dtype(dtype.decode()), Codec(codec), param, np.dtype(stored.decode()), offset, nbytes)
+            for name, dtype, codec, param, _, stored, offset, nbytes in table.tolist()
+        ]
+
+    def get(
+            self,
+            key: str,
+            columns: list[str] = None,
+            mmap_mode: MmapMode | None = None,
+    ) -> dict[str, np.ndarray] | None:
+        """Read cached columns.
+
+        Parameters
+        ----------
+        columns : list[str] | None
+            Subset of columns to return; None returns every column.
+        mmap_mode : {"r", "c"} | None
+            None reads the whole file with a single read; "r" / "c" map it
+            and return views at the column offsets.
+
+        Returns
+        -------
+        dict[str, np.ndarray] : cache hit (read-only arrays, shared through the memory tier;
+                                "c" bypasses the tier and is writable)
+        None                  : empty marker OR cache miss
+        """
+        tier_key = (self.root, key, mmap_mode)
+        # copy-on-write 每次呼叫各自一份可寫的 map，不能經過共用的唯讀 tier
+        all_columns = self.memory.get(tier_key) if mmap_mode != "c" else None
+        if all_columns is None:
+            all_columns = self._read(key, mmap_mode)
+            if all_columns is None:
+                return None
+            if mmap_mode != "c":
+                all_columns = self.memory.put(tier_key, all_columns)
+
+        if columns is None:
+            return dict(all_columns)
+        missing = set(columns) - all_columns.keys()
+        if missing:
+            raise KeyError(f"{key}: columns not in cache file: {sorted(missing)}")
+        return {name: all_columns[name] for name in columns}
+
+    def _read(self, key: str, mmap_mode: MmapMode | None) -> dict[str, np.ndarray] | None:
+        p = self._path(key)
+        try:
+            if mmap_mode:
+                buf = np.memmap(p, dtype=np.uint8, mode=mmap_mode)
+            else:
+                buf = np.fromfile(p, dtype=np.uint8)
+        except FileNotFoundError:
+            return None
+
+        n_rows, table = self._parse_header(buf)
+        return {
+            name: decode_column(codec, param, stored, logical, n_rows, buf[offset:offset + nbytes])
+            for name, logical, codec, param, stored, offset, nbytes in table
+        }
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def has_empty(self, key: str) -> bool:
+        return self._empty_path(key).is_file()
+
+    def is_cached(self, key: str) -> CacheState:
+        """Index lookup, falls back to the filesystem for keys not in the manifest."""
+        state = self.manifest.state(key)
+        if state != CacheState.MISS:
+            return state
+        if self.exists(key):
+            self._index(key)
+            return CacheState.HIT
+        if self.has_empty(key):
+            self.manifest.put_empty(key)
+            return CacheState.EMPTY
+        return CacheState.MISS
+
+    def missing(self, keys: list[str]) -> list[str]:
+        """Keys that are neither hit nor empty (batched index lookup)."""
+        return [k for k, state in self._index_ready().states(keys).items() if state == CacheState.MISS]
+
+    def keys(self, pattern: str = "*") -> list[str]:
+        return self._index_ready().keys(pattern)
+
+    def cache_info(self, pattern: str = "*") -> dict:
+        return {"root": str(self.root), **self._index_ready().info(pattern)}
+
+    # ── Write ──────────────────────────────────────────────────────────────
+
+    def set(self, key: str, columns: dict[str, np.ndarray], codec: bool = None) -> None:
+        """Write all columns of one key (rows must be equal). Removes any .nodata marker.
+
+        codec: None follows the manager setting (see module docstring).
+        """
+        if not columns:
+            raise ValueError("columns must not be empty")
+        arrays = {str(k): np.ascontiguousarray(v) for k, v in columns.items()}
+        n_rows = {len(a) for a in arrays.values()}
+        if len(n_rows) != 1:
+            raise ValueError(f"{key}: columns have different lengths {n_rows}")
+        n_rows = n_rows.pop()
+        use_codec = self.codec if codec is None else codec
+
+        header = np.zeros(1, dtype=_HEADER)
+        header["magic"] = PACKED_MAGIC
+        header["version"] = PACKED_VERSION
+        header["n_cols"] = len(arrays)
+        header["n_rows"] = n_rows
+
+        table = np.zeros(len(arrays), dtype=_COLUMN)
+        payloads = []
+        offset = _align(_HEADER.itemsize + _COLUMN.itemsize * len(arrays))
+        for i, (name, arr) in enumerate(arrays.items()):
+            if len(name.encode()) > _COLUMN["name"].itemsize:
+                raise ValueError(f"column name too long: {name!r}")
+            logical = arr.dtype.newbyteorder("<")
+            if use_codec:
+                col_codec, param, stored, payload = encode_column(arr)
+            else:
+                col_codec, param, stored, payload = Codec.RAW, 0, logical, arr.astype(logical, copy=False).tobytes()
+            table[i] = (name.encode(), logical.str.encode(), col_codec, param, b"", stored.str.encode(), offset,
+                        len(payload))
+            payloads.append(payload)
+            offset = _align(offset + len(payload))
+
+        def write(f):
+            nonlocal crc
+            for chunk in self._file_chunks(header, table, payloads):
+                crc = zlib.crc32(chunk, crc)
+                f.write(chunk)
+
+        crc = 0
+        with self.lock(key):
+            size = atomic_write(self._path(key), write)
+            self._invalidate(key)
+            self._empty_path(key).unlink(missing_ok=True)
+            self.manifest.put(key, size, None, n_rows, f"{crc:08x}")
+
+    def _invalidate(self, key: str) -> None:
+        # tier 以 mmap_mode 區分，"c" 不經過 tier
+        for mode in (None, "r"):
+            self.memory.invalidate((self.root, key, mode))
+
+    def lock(self, key: str, timeout: float = -1) -> FileLock:
+        """Cross-process advisory lock for key (``with cache.lock(key): ...``)."""
+        NpyCacheManager._validate_key(key)
+        return key_lock(self.root, key, timeout)
+
+    @staticmethod
+    def _file_chunks(header: np.ndarray, table: np.ndarray, payloads: list[bytes]):
+        yield header.tobytes()
+        yield table.tobytes()
+        pos = header.nbytes + table.nbytes
+        for payload, col_offset in zip(payloads, table["offset"].tolist()):
+            yield b"\0" * (col_offset - pos)
+            yield payload
+            pos = col_offset + len(payload)
+
+    def _index(self, key: str) -> None:
+        self.manifest.put_many([self._index_row(key)])
+
+    def _index_row(self, key: str) -> tuple:
+        buf = np.fromfile(self._path(key), dtype=np.uint8)
+        n_rows, _ = self._parse_header(buf)
+        return key, CacheState.HIT.value, len(buf), None, n_rows, checksum(buf)
+
+    def mark_empty(self, key: str) -> None:
+        """Mark key as confirmed-no-data. Removes any existing .npk file."""
+        p = self._empty_path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock(key):
+            p.touch()
+            self._path(key).unlink(missing_ok=True)
+            self._invalidate(key)
+            self.manifest.put_empty(key)
+
+    def delete(self, key: str) -> None:
+        with self.lock(key):
+            self._path(key).unlink(missing_ok=True)
+            self._empty_path(key).unlink(missing_ok=True)
+            self._invalidate(key)
+            self.manifest.remove([key])
+
+    def _index_ready(self) -> CacheManifest:
+        self.manifest.ensure(self._scan)
+        return self.manifest
+
+    def rebuild_manifest(self) -> int:
+        """Re-scan the cache tree into the manifest. Returns the number of indexed keys."""
+        return self.manifest.rebuild(self._scan)
+
+    def _scan(self) -> list[tuple]:
+        rows = [self._index_row(self._path_to_key(p)) for p in self.root.rglob(f"*{self.SUFFIX}")]
+        rows += [
+            (self._path_to_key(p), CacheState.EMPTY.value, 0, None, None, None)
+            for p in self.root.rglob(f"*{self.EMPTY_SUFFIX}")
+            if not p.with_suffix(self.SUFFIX).exists()
+        ]
+        return rows
+
+    def __repr__(self) -> str:
+        return f"PackedCacheManager(root={str(self.root)!r})"
+
+
+packed_cache_manager = PackedCacheManager()
@@ -24,6 +24,7 @@ from strategy.strategies.trend import TrendStrategy
 from strategy.strategies.volume import VolumeStrategy
 from strategy.tools.indicator_provider.indicator_facade import IndicatorFacade
 from tools.constants import DEFAULT_TIMEZONE
+from tools.latency_tracer import latency_tracer
 from tools.plotter import plotter
 from tools.ui_signal_emitter import ui_signal_emitter
 from tools.utils import get_now
@@ -162,6 +163,7 @@ class TMFStrategyRunner(AbsStrategyRunner):
     def _deal_entry(self):
         for e, stra in enumerate(self.strategies):
             entry_suggest = stra.in_signal()
+            latency_tracer.mark('in_signal')
             if entry_suggest and entry_suggest.valid:
                 # self.print_indicators() # todo: remove after test
                 cur_stra_idx = e
@@ -201,6 +203,7 @@ class TMFStrategyRunner(AbsStrategyRunner):
 
     def _deal_exit(self, cur_stra_idx):
         out_suggest = self.strategies[cur_stra_idx].out_signal()
+        latency_tracer.mark('out_signal')
         is_over_loss = False
 
         if out_suggest and out_suggest.valid:
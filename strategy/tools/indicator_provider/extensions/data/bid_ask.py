@@ -1,3 +1,4 @@
+import numpy as np
 from typing_extensions import override
 
 from strategy.tools.indicator_provider.extensions.data.indicator import Indicator
@@ -6,6 +7,7 @@ from tools.utils import decode_redis
 
 class BidAsk(Indicator):
     L2_SEPERATOR = '|'
+    HISTORY_FIELDS = {'bid': np.float64, 'ask': np.float64}
 
     def __init__(self):
         super().__init__()
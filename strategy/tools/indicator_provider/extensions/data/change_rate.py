@@ -1,9 +1,12 @@
+import numpy as np
 from typing_extensions import override
 
 from strategy.tools.indicator_provider.extensions.data.indicator import Indicator
 
 
 class ChangeRate(Indicator):
+    HISTORY_FIELDS = {'rsum': np.float64, 'tsum': np.float64, 'rtsum': np.float64, 'rsqsum': np.float64}
+
     def __init__(self):
         super().__init__()
         self.rsum = None
@@ -1,9 +1,17 @@
+import numpy as np
 from typing_extensions import override
 
 from strategy.tools.indicator_provider.extensions.data.indicator import Indicator
 
 
 class Donchian(Indicator):
+    HISTORY_FIELDS = {
+        'h': np.float64,
+        'l': np.float64,
+        'pivot_price': np.float64,
+        'pivot_price_serial': np.int64,
+    }
+
     def __init__(self):
         super().__init__()
         self.h = None
@@ -25,5 +33,10 @@ class Donchian(Indicator):
         self.pivot_price_changed = False
         self.pivot_price_serial = 0
 
+    @override
+    def history_value(self):
+        # value 為 tuple，歷史只保留 h / l 等欄位
+        return None
+
     def _calc(self):
         return tuple([self.h, self.l, self.h_prev, self.l_prev])
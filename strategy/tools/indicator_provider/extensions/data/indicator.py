@@ -9,6 +9,8 @@ from tools.utils import decode_redis
 
 class Indicator(DatetimeComparableMixin):
     L1_SEPERATOR = ':'
+    # 除了 ts / value / data_count 之外，要存進 IndicatorHistory 的欄位與 dtype
+    HISTORY_FIELDS: dict[str, type] = {}
 
     def __init__(self):
         super().__init__()
@@ -51,6 +53,10 @@ class Indicator(DatetimeComparableMixin):
             self.value = self._calc()
         return self.value
 
+    def history_value(self) -> float | None:
+        """存進 IndicatorHistory.value 欄的值 (必須為 scalar)"""
+        return self.get()
+
     def _calc(self):
         """
         child class should override this method if not use self.value
@@ -1,7 +1,11 @@
+import numpy as np
+
 from strategy.tools.indicator_provider.extensions.data.indicator import Indicator
 
 
 class SdStopLoss(Indicator):
+    HISTORY_FIELDS = {'n_loss': np.float64, 'direction': np.int8}
+
     def __init__(self):
         super().__init__()
         self.n_loss: float = None
@@ -0,0 +1,71 @@
+"""
+Indicator checkpoint — IndicatorProvider 的 warm start
+
+定期把 rtm 的 tick 視窗與每個 manager 的增量狀態 (last indicator / 歷史 / CHECKPOINT_FIELDS)
+寫入本地檔案，重啟時:
+    - rtm 先併入 checkpoint 的 ticks，in-day history 只需向 API 補 checkpoint 之後的缺口
+    - rtm ready 後以 anchor (最後一筆 tick 的 ts, total_volume) 比對 tick buffer，
+      通過才還原 manager，否則整份捨棄 (例如換了 session)
+    - manager 建立時若有對應的 snapshot 直接還原，之後從 last 增量更新
+
+設定 (env):
+    INDICATOR_CHECKPOINT_DIR         未設定則不啟用
+    INDICATOR_CHECKPOINT_INTERVAL_S  寫入間隔 (秒)，預設 30
+
+檔案為 pickle (numpy 欄位直接序列化為 raw bytes)，先寫到暫存檔再 os.replace，中途 crash 不會留下寫一半的檔案。
+"""
+import os
+import pickle
+import time
+from typing import Callable
+
+CHECKPOINT_VERSION = 2  # 2: 不再包含 BidAskRatio
+
+
+class IndicatorCheckpoint:
+    def __init__(self, symbol: str, checkpoint_dir: str = None, interval_s: float = None):
+        checkpoint_dir = checkpoint_dir or os.getenv('INDICATOR_CHECKPOINT_DIR')
+        self.path = os.path.join(checkpoint_dir, f'{symbol}.ckpt') if checkpoint_dir else None
+        interval_s = interval_s if interval_s is not None else float(os.getenv('INDICATOR_CHECKPOINT_INTERVAL_S', 30))
+        self.interval_ns = int(interval_s * 1e9)
+        self._last_save_ns = time.monotonic_ns()
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def load(self) -> dict | None:
+        if not self.enabled or not os.path.exists(self.path):
+            return None
+
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+        except Exception as e:
+            print(f'checkpoint load failed, ignored: {e}')
+            return None
+
+        if data.get('version') != CHECKPOINT_VERSION:
+            print(f'checkpoint version mismatch: {data.get("version")}, expected {CHECKPOINT_VERSION}')
+            return None
+        return data
+
+    def save(self, data: dict):
+        data = {'version': CHECKPOINT_VERSION, **data}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # 先落盤再 rename，否則斷電後可能留下 rename 過、內容卻不完整的檔案
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._last_save_ns = time.monotonic_ns()
+
+    def maybe_save(self, build: Callable[[], dict]):
+        if not self.enabled or time.monotonic_ns() - self._last_save_ns < self.interval_ns:
+            return
+        try:
+            self.save(build())
+        except Exception as e:
+            print(f'checkpoint save failed: {e}')
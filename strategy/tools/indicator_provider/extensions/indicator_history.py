@@ -0,0 +1,164 @@
+"""
+Indicator history — AbsIndicatorManager 的歷史值緩衝區 (取代 list[Indicator])
+
+欄位:
+    ts          int64 epoch ns
+    value       float64  (Indicator.history_value()，None -> NaN)
+    data_count  int64    (None -> -1)
+    + Indicator 子類別宣告的 HISTORY_FIELDS (StandardDeviation.sum / square_sum ...)
+
+記憶體上限:
+    live 資料超過 capacity 時 release 掉較舊的一半，
+    下次寫滿才由 ColumnarRingBuffer 搬移並透過 on_evict 交給 spill，陣列大小不再成長。
+
+spill:
+    被回收 (或 flush) 的資料列整批編成一個 binary chunk:
+        magic u1 (0xB2) | version u1 | serial i4 | count u4 | records (numpy packed dtype)
+    寫入 redis sorted set (score = 第一筆 timestamp)，
+    有設定 INDICATOR_SPILL_DIR 時另外 append 到 {dir}/{storage_key}.bin。
+    每個 chunk 只取一次 serial。
+"""
+import os
+from datetime import timedelta
+from typing import Callable
+
+import numpy as np
+
+from data_manager.rtm.extensions.columnar_ring_buffer import ColumnarRingBuffer
+from strategy.tools.indicator_provider.extensions.data.extensions.indicator_type import IndicatorType
+from strategy.tools.indicator_provider.extensions.data.indicator import Indicator
+from tools.time_utils import datetime_to_epoch_ns, epoch_ns_to_datetime
+
+CHUNK_MAGIC = 0xB2
+CHUNK_VERSION = 1
+_CHUNK_HEADER = np.dtype([('magic', 'u1'), ('version', 'u1'), ('serial', '<i4'), ('count', '<u4')])
+
+
+class IndicatorHistory(ColumnarRingBuffer):
+    BASE_COLUMNS = {
+        'ts': np.int64,
+        'value': np.float64,
+        'data_count': np.int64,
+    }
+
+    def __init__(
+            self,
+            indicator_cls: type[Indicator],
+            indicator_type: IndicatorType,
+            length: timedelta,
+            capacity: int,
+            spill: Callable[[np.ndarray, int], None] = None
+    ):
+        """
+        :param spill: spill(records, first_ts_ns)，None 表示回收的資料直接丟棄
+        """
+        self.indicator_cls = indicator_cls
+        self.indicator_type = indicator_type
+        self.length = length
+        self.COLUMNS = self.BASE_COLUMNS | indicator_cls.HISTORY_FIELDS
+        self.record_dtype = np.dtype([(k, np.dtype(v).newbyteorder('<')) for k, v in self.COLUMNS.items()])
+        self._spill = spill
+        self._spilled_end = 0  # 絕對 index，之前的資料都已 spill
+
+        super().__init__(capacity, on_evict=self._on_evict)
+
+    # ── write ──────────────────────────────────────────────────────────────
+
+    def _write_row(self, columns, i, item: Indicator):
+        value = item.history_value()
+        columns['ts'][i] = datetime_to_epoch_ns(item.datetime)
+        columns['value'][i] = np.nan if value is None else value
+        columns['data_count'][i] = -1 if item.data_count is None else item.data_count
+        for k, dtype in self.indicator_cls.HISTORY_FIELDS.items():
+            v = getattr(item, k)
+            if v is None:
+                v = np.nan if np.issubdtype(dtype, np.floating) else 0
+            columns[k][i] = v
+
+    def trim(self):
+        """live 資料達 capacity 時保留較新的一半，其餘在下次搬移時 spill"""
+        if self._end - self._retain_from >= self._capacity:
+            self.release(self._end - self._capacity // 2)
+
+    # ── read ───────────────────────────────────────────────────────────────
+
+    def row_from_columns(self, columns, i) -> Indicator:
+        indicator = self.indicator_cls()
+        indicator.indicator_type = self.indicator_type
+        indicator.length = self.length
+        indicator.datetime = epoch_ns_to_datetime(columns['ts'][i])
+
+        value = float(columns['value'][i])
+        data_count = int(columns['data_count'][i])
+        indicator.value = None if np.isnan(value) else value
+        indicator.data_count = None if data_count == -1 else data_count
+        for k in self.indicator_cls.HISTORY_FIELDS:
+            setattr(indicator, k, columns[k][i].item())
+        return indicator
+
+    def value_at(self, idx: int) -> float | None:
+        """
+        idx < 0 從最新一筆往回算，否則為絕對 index (與原本 list index 相同)。
+        超出範圍 (含已回收) 回傳 None
+        """
+        columns, offset = self._state
+        if idx < 0:
+            idx += self._end
+        if not offset <= idx < self._end:
+            return None
+        value = float(columns['value'][idx - offset])
+        return None if np.isnan(value) else value
+
+    # ── spill ──────────────────────────────────────────────────────────────
+
+    def _on_evict(self, columns: dict[str, np.ndarray], offset: int):
+        self._spill_columns(columns, offset)
+
+    def _spill_columns(self, columns: dict[str, np.ndarray], offset: int):
+        # 已 flush 過的部分不再重複寫入
+        skip = max(self._spilled_end - offset, 0)
+        n = len(columns['ts']) - skip
+        if n <= 0:
+            return
+        self._spilled_end = offset + skip + n
+        if self._spill is None:
+            return
+
+        records = np.empty(n, dtype=self.record_dtype)
+        for k in self.COLUMNS:
+            records[k] = columns[k][skip:]
+        self._spill(records, int(records['ts'][0]))
+
+    def mark_spilled(self):
+        """目前的資料都視為已寫出 (checkpoint 還原的資料不重複 spill)"""
+        self._spilled_end = self._end
+
+    def flush(self):
+        """spill 目前尚未寫出的所有資料 (收盤 / stop 時呼叫)"""
+        w = self.view(self._spilled_end)
+        if w:
+            self._spill_columns(w.columns(), w.start)
+
+    @staticmethod
+    def encode_chunk(records: np.ndarray, serial: int) -> bytes:
+        header = np.zeros(1, dtype=_CHUNK_HEADER)
+        header['magic'] = CHUNK_MAGIC
+        header['version'] = CHUNK_VERSION
+        header['serial'] = serial
+        header['count'] = len(records)
+        return header.tobytes() + records.tobytes()
+
+    def decode_chunk(self, raw: bytes) -> np.ndarray:
+        header = np.frombuffer(raw, dtype=_CHUNK_HEADER, count=1)[0]
+        if header['magic'] != CHUNK_MAGIC or header['version'] != CHUNK_VERSION:
+            raise Exception(f'unsupported indicator chunk: magic={header["magic"]}, version={header["version"]}')
+        return np.frombuffer(raw, dtype=self.record_dtype, count=int(header['count']), offset=_CHUNK_HEADER.itemsize)
+
+
+def append_chunk_to_file(storage_key: str, chunk: bytes):
+    spill_dir = os.getenv('INDICATOR_SPILL_DIR')
+    if not spill_dir:
+        return
+    os.makedirs(spill_dir, exist_ok=True)
+    with open(os.path.join(spill_dir, f'{storage_key.replace(":", "_")}.bin'), 'ab') as f:
+        f.write(chunk)
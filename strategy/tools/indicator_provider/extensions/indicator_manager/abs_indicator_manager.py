@@ -3,35 +3,60 @@ from datetime import datetime, timedelta
 from functools import cache
 from typing import Final
 
+import numpy as np
 from redis.client import Redis
 
 from strategy.tools.indicator_provider.extensions.data.indicator import Indicator
 from strategy.tools.indicator_provider.extensions.data.extensions.indicator_type import IndicatorType
+from strategy.tools.indicator_provider.extensions.indicator_history import IndicatorHistory, append_chunk_to_file
 from data_manager.rtm.realtime_tick_manager import RealtimeTickManager
-from tools.utils import get_redis_date_tag, get_serial, get_by_time_range
+from tools.time_utils import datetime_to_epoch_ns
+from tools.utils import get_redis_date_tag, get_serial
 
 
 class AbsIndicatorManager(ABC):
     serial_key_prefix = 'indicator_serial'
     storage_key_prefix = 'indicator'
-    MAX_BUFFER_SIZE: Final[int] = 131072
+    # 記憶體中最多保留的歷史筆數，超過後較舊的一半整批 spill 到 redis
+    MAX_BUFFER_SIZE: Final[int] = 32768
+    INDICATOR_CLASS: type[Indicator] = Indicator
+    # update 主要時間花在會釋放 GIL 的 kernel (numba nogil / numpy) 時設為 True，scheduler 才會丟到 thread pool
+    RELEASES_GIL = False
+    # calculate 之間需要保留的增量狀態 (attribute 名稱)，寫入 checkpoint
+    CHECKPOINT_FIELDS: tuple[str, ...] = ()
+    # 增量狀態依賴 checkpoint 沒有保存的資料 (例如 rtm 的 bid/ask buffer) 時設為 False，重啟後 cold start
+    CHECKPOINTABLE = True
+    # checkpoint 保留的歷史長度 (至少為 length)，供 change_rate 等往回查
+    CHECKPOINT_HISTORY_SPAN = timedelta(minutes=15)
 
     def __init__(self, indicator_type, length, symbol: str, start_time, redis: Redis, rtm):
         self.indicator_type: Final[IndicatorType] = indicator_type
         self.length: Final[timedelta] = length
         self.symbol: Final[str] = symbol
-        self.buffer: list[Indicator] = []
         self.change_rate_buffer: list[float] = []
 
         self.redis = redis
         self.start_time: datetime = start_time
         self.rtm: RealtimeTickManager = rtm
 
+        self.buffer: IndicatorHistory = self._new_buffer()
+        self._last: Indicator | None = None  # 最新一筆保留原物件 (calculate 的增量狀態可能不只 HISTORY_FIELDS)
+
+    def _new_buffer(self):
+        return IndicatorHistory(
+            self.INDICATOR_CLASS,
+            self.indicator_type,
+            self.length,
+            self.MAX_BUFFER_SIZE,
+            spill=self._spill
+        )
+
     def last(self):
-        if self.buffer:
-            return self.buffer[-1]
-        else:
-            return None
+        return self._last
+
+    def dependencies(self) -> list['AbsIndicatorManager']:
+        """calculate 時會讀取的其他 manager，scheduler 依此決定 update 順序"""
+        return []
 
     def is_valid_last(self, now, last: Indicator):
         if last.datetime <= now - self.length:
@@ -45,26 +70,43 @@ class AbsIndicatorManager(ABC):
         new = self.calculate(now, last)
 
         if new:
-            self.dump_to_redis()
             self.buffer.append(new)
+            self._last = new
+            self.buffer.trim()
+
+    def snapshot(self) -> dict | None:
+        last = self._last
+        if last is None or not self.CHECKPOINTABLE:
+            return None
+
+        w = self.buffer.window(last.datetime - max(self.length, self.CHECKPOINT_HISTORY_SPAN), last.datetime)
+        return {
+            'last': last,
+            'history': {k: v.copy() for k, v in w.columns().items()},
+            'state': {k: getattr(self, k) for k in self.CHECKPOINT_FIELDS},
+        }
+
+    def restore(self, snapshot: dict):
+        """還原後下一次 update 會從 last 增量計算，不需再跑一次完整視窗"""
+        self.buffer = self._new_buffer()
+        self.buffer.extend_columns(snapshot['history'])
+        self.buffer.mark_spilled()
+        self._last = snapshot['last']
+        for k, v in snapshot['state'].items():
+            setattr(self, k, v)
 
     def change_rate(self, window_size=None):
         """
         方法:找窗口的左側，用最新值(右側)減掉，除以間隔數
         :return:
         """
-        if not (self.buffer and len(self.buffer) >= 2):
+        if len(self.buffer) < 2:
             return 0
 
         if not window_size:
             window_size = self.length
 
-        prev_index = get_by_time_range(
-            self.buffer,
-            0,
-            len(self.buffer),
-            self.last().datetime - window_size
-        )
+        prev_index = self.buffer.search(datetime_to_epoch_ns(self.last().datetime - window_size))
 
         if self.get(prev_index) == 0:
             return 0
@@ -89,34 +131,34 @@ class AbsIndicatorManager(ABC):
     def get_storage_key(self):
         return f'{self.storage_key_prefix}:{self.get_key_postfix()}'
 
+    def _spill(self, records: np.ndarray, first_ts_ns: int):
+        """IndicatorHistory 回收 / flush 的資料整批寫出，一個 chunk 只取一次 serial"""
+        chunk = IndicatorHistory.encode_chunk(records, get_serial(self.redis, self.get_serial_key()))
+        if self.redis is not None:
+            self.redis.zadd(self.get_storage_key(), {chunk: first_ts_ns / 1e9})
+        append_chunk_to_file(self.get_storage_key(), chunk)
+
     def dump_to_redis(self, anyway=False):
+        """
+        平時由 buffer 滿載時自動 spill，這裡只在 anyway=True (stop) 時把剩下的資料寫出
+        """
         if anyway:
-            data = {
-                idc.serialize(get_serial(self.redis, self.get_serial_key())): idc.datetime.timestamp()
-                for idc in self.buffer
-            }
-        elif len(self.buffer) > self.MAX_BUFFER_SIZE:
-            data = {
-                idc.serialize(get_serial(self.redis, self.get_serial_key())): idc.datetime.timestamp()
-                for idc in self.buffer[:self.MAX_BUFFER_SIZE / 2]
-            }
-            self.buffer = self.buffer[self.MAX_BUFFER_SIZE / 2:]
-        else:
-            return
-
-        self.redis.zadd(
-            self.get_storage_key(),
-            data
-        )
+            self.buffer.flush()
 
     def clear_buffer(self):
-        self.buffer.clear()
+        self.buffer = self._new_buffer()
+        self._last = None
 
     def get(self, idx=-1, return_indicator=False):
-        indicator = self.buffer[idx] if abs(idx) + (1 if idx > 0 else 0) <= len(self.buffer) else None
+        """
+        :param idx: 負數從最新一筆往回算，否則為絕對 index
+        """
+        if idx == -1 and self._last is not None:
+            return self._last if return_indicator else self._last.get()
 
-        if not indicator:
-            return None
         if return_indicator:
-            return indicator
-        return indicator.get()
+            try:
+                return self.buffer[idx]
+            except IndexError:
+                return None
+        return self.buffer.value_at(idx)
@@ -1,18 +1,22 @@
-from itertools import takewhile
-
+import numpy as np
 from redis.client import Redis
 
-from data.unified.bid_ask.bid_ask_fop import BidAskFOP
+from data_manager.rtm.extensions.columnar_ring_buffer import ColumnWindow
 from strategy.tools.indicator_provider.extensions.data.bid_ask_ratio import BidAskRatio
 from strategy.tools.indicator_provider.extensions.data.extensions.indicator_type import IndicatorType
 from strategy.tools.indicator_provider.extensions.indicator_manager.abs_indicator_manager import AbsIndicatorManager
 
 
 class BidAskRatioManager(AbsIndicatorManager):
+    INDICATOR_CLASS = BidAskRatio
+    # last 的 bid / ask 與 end_count / end_ts 假設 bid/ask 視窗還在，但 bid_ask_buffer 不在 checkpoint 中，
+    # 還原後 _deal_removed_ticks 減不到過期的 bid/ask，所以重啟時由 _calc_first 重新計算
+    CHECKPOINTABLE = False
+
     def __init__(self, length, symbol: str, start_time, redis: Redis, rtm):
         super().__init__(IndicatorType.BID_ASK_RATIO, length, symbol, start_time, redis, rtm)
         self.end_count = None
-        self.end_datetime = None
+        self.end_ts = None  # epoch ns
 
     def calculate(self, now, last: BidAskRatio):
         if not self.rtm.bid_ask_buffer:
@@ -61,18 +65,15 @@ class BidAskRatioManager(AbsIndicatorManager):
 
         return bid, ask
 
-    def _deal_added_ticks(self, added_ticks: list[BidAskFOP]):
-        left = 0
-        for e, ba in enumerate(added_ticks):
-            if not (ba.datetime <= self.end_datetime and e < self.end_count):
-                left = e
-                break
-
-        return self._deal(added_ticks[left:])
+    def _deal_added_ticks(self, added_ticks: ColumnWindow):
+        skip = 0
+        if self.end_count:
+            skip = min(int(np.searchsorted(added_ticks.ts, self.end_ts, side='right')), self.end_count)
+        return self._deal(added_ticks.view(skip))
 
     def _deal_removed_ticks(self, now, last):
         if now == last.datetime:
-            deprecated = []
+            return 0, 0
         elif now < last.datetime:
             raise Exception('now < last.datetime!')
         else:
@@ -85,25 +86,13 @@ class BidAskRatioManager(AbsIndicatorManager):
         return self._deal(deprecated)
 
     @staticmethod
-    def _deal(bidasks: list[BidAskFOP]):
-        bid = 0
-        ask = 0
-
-        for ba in bidasks:
-            bid += ba.bid_volume
-            ask += ba.ask_volume
+    def _deal(bidasks: ColumnWindow):
+        return int(bidasks.bid_volume.sum()), int(bidasks.ask_volume.sum())
 
-        return bid, ask
-
-    def _collect_end_count(self, bidasks: list[BidAskFOP]):
+    def _collect_end_count(self, bidasks: ColumnWindow):
         if not bidasks:
             self.end_count = 0
             return
 
-        last_dt = bidasks[-1].datetime
-        reversed_ = reversed(bidasks)
-
-        end_count = sum(1 for _ in takewhile(lambda tick: tick.datetime >= last_dt, reversed_))
-
-        self.end_count = end_count
-        self.end_datetime = last_dt
+        self.end_count = len(bidasks) - bidasks.tail_start()
+        self.end_ts = int(bidasks.ts[-1])
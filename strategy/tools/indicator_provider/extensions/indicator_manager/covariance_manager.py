@@ -1,18 +1,20 @@
-from itertools import takewhile
-
+import numpy as np
 from redis.client import Redis
 
-from data.unified.tick.tick_fop import TickFOP
+from data_manager.rtm.extensions.columnar_ring_buffer import ColumnWindow
 from strategy.tools.indicator_provider.extensions.data.covariance import Covariance
 from strategy.tools.indicator_provider.extensions.data.extensions.indicator_type import IndicatorType
 from strategy.tools.indicator_provider.extensions.indicator_manager.abs_indicator_manager import AbsIndicatorManager
 
 
 class CovarianceManager(AbsIndicatorManager):
+    INDICATOR_CLASS = Covariance
+    CHECKPOINT_FIELDS = ('end_count', 'end_ts')
+
     def __init__(self, length, symbol: str, start_time, redis: Redis, rtm):
         super().__init__(IndicatorType.COVARIANCE, length, symbol, start_time, redis, rtm)
         self.end_count = None
-        self.end_datetime = None
+        self.end_ts = None  # epoch ns
 
     def calculate(self, now, last: Covariance):
         new = Covariance()
@@ -46,13 +48,8 @@ class CovarianceManager(AbsIndicatorManager):
         if len(ticks) == 0:
             raise Exception('no data to calculate!')
 
-        count = sum(tick.volume for tick in ticks)
-        p_sum = sum(tick.close * tick.volume for tick in ticks)
-        t_sum = sum(tick.datetime.timestamp() * tick.volume for tick in ticks)
-        pt_sum = sum(tick.close * tick.datetime.timestamp() * tick.volume for tick in ticks)
-
         self._collect_end_count(ticks)
-        return count, p_sum, t_sum, pt_sum
+        return self._deal(ticks)
 
     def _calc_incr(self, last: Covariance, now):
         # 增量更新
@@ -71,58 +68,37 @@ class CovarianceManager(AbsIndicatorManager):
 
         return count, sp, st, spt
 
-    def _deal_added_ticks(self, added_ticks):
-
-        sp = 0
-        st = 0
-        spt = 0
-        count = 0
-
-        for e, t in enumerate(added_ticks):
-            if t.datetime <= self.end_datetime and e < self.end_count:
-                continue
-            sp += t.close * t.volume
-            st += t.datetime.timestamp() * t.volume
-            spt += t.close * t.datetime.timestamp() * t.volume
-            count += t.volume
+    @staticmethod
+    def _deal(ticks: ColumnWindow) -> tuple[int, float, float, float]:
+        t = ticks.ts / 1e9  # timestamp (s)
+        pv = ticks.close * ticks.volume
+        tv = t * ticks.volume
+        return int(ticks.volume.sum()), float(pv.sum()), float(tv.sum()), float(np.dot(pv, t))
 
-        return count, sp, st, spt
+    def _deal_added_ticks(self, added_ticks: ColumnWindow):
+        # 跳過上次已計入、與上次最後一筆同時間的資料
+        skip = 0
+        if self.end_count:
+            skip = min(int(np.searchsorted(added_ticks.ts, self.end_ts, side='right')), self.end_count)
+        return self._deal(added_ticks.view(skip))
 
     def _deal_removed_ticks(self, now, last):
         if now == last.datetime:
-            deprecated_ticks = []
+            return 0, 0, 0, 0
         elif now < last.datetime:
             raise Exception('now < last.datetime!')
-        else:
-            deprecated_ticks = self.rtm.get_ticks_by_time_range(
-                last.datetime - self.length,
-                now - self.length,
-                with_end=False
-            )
-
-        count = 0
-        sp = 0
-        st = 0
-        spt = 0
-
-        if deprecated_ticks:
-            for t in deprecated_ticks:
-                count += t.volume
-                sp += t.close * t.volume
-                st += t.datetime.timestamp() * t.volume
-                spt += t.datetime.timestamp() * t.close * t.volume
 
-        return count, sp, st, spt
+        deprecated_ticks = self.rtm.get_ticks_by_time_range(
+            last.datetime - self.length,
+            now - self.length,
+            with_end=False
+        )
+        return self._deal(deprecated_ticks)
 
-    def _collect_end_count(self, ticks: list[TickFOP]):
+    def _collect_end_count(self, ticks: ColumnWindow):
         if not ticks:
             self.end_count = 0
             return
 
-        last_dt = ticks[-1].datetime
-        reversed_ticks = reversed(ticks)
-
-        end_count = sum(1 for _ in takewhile(lambda tick: tick.datetime >= last_dt, reversed_ticks))
-
-        self.end_count = end_count
-        self.end_datetime = last_dt
+        self.end_count = len(ticks) - ticks.tail_start()
+        self.end_ts = int(ticks.ts[-1])
@@ -6,10 +6,12 @@ from redis.client import Redis
 from strategy.tools.indicator_provider.extensions.data.extensions.indicator_type import IndicatorType
 from strategy.tools.indicator_provider.extensions.data.donchian import Donchian
 from strategy.tools.indicator_provider.extensions.indicator_manager.abs_indicator_manager import AbsIndicatorManager
-from tools.utils import get_by_time_range
 
 
 class DonchianManager(AbsIndicatorManager):
+    INDICATOR_CLASS = Donchian
+    CHECKPOINT_FIELDS = ('h_deque', 'l_deque', 'pivot_price_serial_counter', 'last_add_idle_time')
+
     def __init__(self, length, symbol: str, start_time, redis: Redis, rtm):
         super().__init__(IndicatorType.DONCHIAN, length, symbol, start_time, redis, rtm)
         self.h_deque = deque()
@@ -123,13 +125,4 @@ class DonchianManager(AbsIndicatorManager):
         if not ticks:
             return None, None
 
-        h = ticks[0].close
-        l = ticks[0].close
-
-        for t in ticks[1:]:
-            if t.close > h:
-                h = t.close
-            if t.close < l:
-                l = t.close
-
-        return h, l
+        return float(ticks.close.max()), float(ticks.close.min())
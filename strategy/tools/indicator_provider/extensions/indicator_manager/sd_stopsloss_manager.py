@@ -30,6 +30,7 @@ class SDStopLossManager(AbsIndicatorManager):
     """
 
     """
+    INDICATOR_CLASS = SdStopLoss
 
     def __init__(self, rtm, symbol, start_time, redis: Redis,
                  sd_manager: StandardDeviationManager,
@@ -55,6 +56,9 @@ class SDStopLossManager(AbsIndicatorManager):
 
         self.now = None
 
+    def dependencies(self):
+        return [self.sd_manager, self.vma_manager, self.net_buy_ratio_manager, self.pma_manager]
+
     # @property
     # def _sensitivity(self):
     #     sd = float(self.sd_manager.get())  # 單位為點數
@@ -0,0 +1,133 @@
+"""
+Indicator scheduler — 依相依關係 (DAG) 排程 indicator manager 的 update
+
+取代原本 indicator_hierarchy + ThreadPoolExecutor 的分層做法:
+    - manager 透過 AbsIndicatorManager.dependencies() 宣告輸入的 manager
+    - add 時以拓撲順序插入 (相依的 manager 一定先 update)，不需手動指定 level
+    - 一般 manager 為 pure python，受 GIL 限制，直接在 strategy thread 上 inline 執行
+    - RELEASES_GIL = True 的 manager (numba nogil / 大型 numpy kernel) 才丟到 thread pool，
+      同一層 (depth) 的 offload manager 會並行，其餘仍 inline
+    - 上游 update 失敗時，下游本輪略過 (避免讀到過期的值)
+
+每個 manager 的 update 耗時記錄在 LatencyHistogram，summary() / dump() 輸出。
+"""
+import time
+import traceback
+from concurrent.futures.thread import ThreadPoolExecutor
+
+from strategy.tools.indicator_provider.extensions.indicator_manager.abs_indicator_manager import AbsIndicatorManager
+from tools.latency_tracer import LatencyHistogram
+
+
+class IndicatorScheduler:
+    def __init__(self, max_offload_workers=4):
+        self.max_offload_workers = max_offload_workers
+
+        self.order: list[AbsIndicatorManager] = []  # 拓撲順序
+        self.names: dict[AbsIndicatorManager, str] = {}
+        self.depth: dict[AbsIndicatorManager, int] = {}
+        self.update_hist: dict[AbsIndicatorManager, LatencyHistogram] = {}
+
+        # 依 depth 分組: (inline, offload)
+        self._stages: list[tuple[list[AbsIndicatorManager], list[AbsIndicatorManager]]] = []
+        self._pool: ThreadPoolExecutor | None = None
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, manager):
+        return manager in self.depth
+
+    def add(self, manager: AbsIndicatorManager, name: str = None):
+        if manager in self.depth:
+            return
+
+        deps = manager.dependencies()
+        for dep in deps:
+            if dep is manager:
+                raise Exception(f'{name or manager} depends on itself')
+            # 相依的 manager 尚未註冊時一併加入 (正常流程中 provider 會先建立它們)
+            self.add(dep)
+
+        self.order.append(manager)
+        self.names[manager] = name or f'{manager.indicator_type.value}{manager.length.total_seconds()}s'
+        self.depth[manager] = max((self.depth[d] + 1 for d in deps), default=0)
+        self.update_hist[manager] = LatencyHistogram()
+        self._rebuild_stages()
+
+    def _rebuild_stages(self):
+        stages = [([], []) for _ in range(max(self.depth.values()) + 1)]
+        for m in self.order:
+            inline, offload = stages[self.depth[m]]
+            (offload if m.RELEASES_GIL else inline).append(m)
+        self._stages = stages
+
+        if self._pool is None and any(offload for _, offload in stages):
+            self._pool = ThreadPoolExecutor(max_workers=self.max_offload_workers, thread_name_prefix='indicator')
+
+    # ── run ────────────────────────────────────────────────────────────────
+
+    def _timed_update(self, manager: AbsIndicatorManager, now):
+        t0 = time.perf_counter_ns()
+        manager.update(now)
+        self.update_hist[manager].record(time.perf_counter_ns() - t0)
+
+    def run(self, now):
+        failed = set()
+
+        def runnable(m):
+            return not any(d in failed for d in m.dependencies())
+
+        for inline, offload in self._stages:
+            futures = []
+            for m in offload:
+                if runnable(m):
+                    futures.append((m, self._pool.submit(self._timed_update, m, now)))
+                else:
+                    failed.add(m)
+
+            for m in inline:
+                if not runnable(m):
+                    failed.add(m)
+                    continue
+                try:
+                    self._timed_update(m, now)
+                except Exception:
+                    failed.add(m)
+                    print(f'[{self.names[m]}] 發生錯誤: {traceback.format_exc()}')
+
+            for m, future in futures:
+                try:
+                    future.result()
+                except Exception:
+                    failed.add(m)
+                    print(f'[{self.names[m]}] 發生錯誤: {traceback.format_exc()}')
+
+        return failed
+
+    def shutdown(self):
+        if self._pool:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    # ── report ─────────────────────────────────────────────────────────────
+
+    def summary(self) -> str:
+        lines = []
+        for m in self.order:
+            h = self.update_hist[m]
+            if h.count == 0:
+                continue
+            deps = ','.join(self.names[d] for d in m.dependencies()) or '-'
+            lines.append(
+                f'{self.names[m]:<24} n={h.count:<8} '
+                f'mean={h.mean() / 1e3:.1f} p50={h.percentile(50) / 1e3:.0f} '
+                f'p99={h.percentile(99) / 1e3:.0f} max={h.max / 1e3:.0f} (us) '
+                f'depth={self.depth[m]} deps={deps}'
+            )
+        return '\n'.join(lines)
+
+    def dump(self):
+        summary = self.summary()
+        if summary:
+            print(f'indicator update time:\n{summary}')
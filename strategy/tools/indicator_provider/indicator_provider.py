@@ -1,5 +1,3 @@
-import traceback
-from concurrent.futures.thread import ThreadPoolExecutor
 from datetime import timedelta, datetime
 
 from fontTools.ufoLib.utils import deprecated
@@ -8,6 +6,8 @@ from line_profiler_pycharm import profile
 from strategy.tools.indicator_provider.extensions.data.extensions.indicator_type import IndicatorType
 from strategy.tools.indicator_provider.extensions.data.donchian import Donchian
 from strategy.tools.indicator_provider.extensions.indicator_manager.abs_indicator_manager import AbsIndicatorManager
+from strategy.tools.indicator_provider.extensions.indicator_checkpoint import IndicatorCheckpoint
+from strategy.tools.indicator_provider.extensions.indicator_scheduler import IndicatorScheduler
 from strategy.tools.indicator_provider.extensions.indicator_manager.bid_ask_ratio_manager import BidAskRatioManager
 from strategy.tools.indicator_provider.extensions.indicator_manager.covariance_manager import CovarianceManager
 from strategy.tools.indicator_provider.extensions.indicator_manager.donchian_manager import DonchianManager
@@ -19,6 +19,7 @@ from strategy.tools.indicator_provider.extensions.indicator_manager.standard_dev
 from strategy.tools.indicator_provider.extensions.indicator_manager.vma_manager import VMAManager
 from strategy.tools.kbar_indicators.kbar_indicator_center import KbarIndicatorCenter
 from data_manager.rtm.realtime_tick_manager import RealtimeTickManager
+from tools.latency_tracer import latency_tracer
 from tools.utils import get_twse_date
 
 
@@ -32,21 +33,31 @@ class IndicatorProvider:
 
         self.indicator_managers: dict[tuple, AbsIndicatorManager] = {}
 
-        self.indicator_hierarchy: list[list] = []
-
-        self.tpe = ThreadPoolExecutor(max_workers=8)
+        # 依 manager.dependencies() 排序的 DAG，取代原本手動指定 level 的 indicator_hierarchy
+        self.scheduler = IndicatorScheduler()
 
         self.kbar_indicator_center: KbarIndicatorCenter = kbar_indicator_center
 
         self._last_update: datetime | None = None
 
+        # warm start
+        self.checkpoint = IndicatorCheckpoint(self.rtm.symbol)
+        self._pending_restore: dict[tuple, dict] = {}
+        self._checkpoint_anchor: tuple[int, int] | None = None
+        self._load_checkpoint()
+
     def start(self):
         self.rtm.start(wait_for_ready=True)
+        self._validate_checkpoint()
+        latency_tracer.start()
 
     def stop(self):
         self.rtm.stop()
         for m in self.indicator_managers.values():
             m.dump_to_redis(anyway=True)
+        self.scheduler.shutdown()
+        self.scheduler.dump()
+        latency_tracer.stop()
 
         print('ip stopped.')
 
@@ -71,11 +82,44 @@ class IndicatorProvider:
     def wait_for_update(self):
         valid = self.rtm.wait_for_tick()
         if valid:
+            latency_tracer.begin()
             self.now = self.rtm.latest_tick().datetime
             if self._is_time_to_update():
                 self.update()
+                latency_tracer.mark('indicator')
+                self.checkpoint.maybe_save(self._snapshot)
         return valid
 
+    # checkpoint
+    def _load_checkpoint(self):
+        data = self.checkpoint.load()
+        if not data:
+            return
+        self.rtm.restore_checkpoint(data['rtm'])
+        self._pending_restore = data['managers']
+        self._checkpoint_anchor = data['anchor']
+
+    def _validate_checkpoint(self):
+        """checkpoint 最後一筆 tick 必須出現在 tick buffer 中，manager 的狀態才接得上"""
+        if not self._pending_restore:
+            return
+        if not self.rtm.has_tick(self._checkpoint_anchor):
+            print('checkpoint does not match tick buffer, cold start.')
+            self._pending_restore.clear()
+            return
+        print(f'checkpoint validated, {len(self._pending_restore)} indicators to restore.')
+
+    def _snapshot(self) -> dict:
+        return {
+            'anchor': self.rtm.tick_anchor(),
+            'rtm': self.rtm.snapshot(),
+            'managers': {
+                k: snapshot
+                for k, m in self.indicator_managers.items()
+                if (snapshot := m.snapshot()) is not None
+            },
+        }
+
     # def update(self):
     #     for m in self.provider_indicator_managers.values():
     #         m.update(self.now)
@@ -85,33 +129,20 @@ class IndicatorProvider:
 
     @profile
     def update(self):
-        # 提交provider指标管理器的更新任务到线程池中
-
-        for level in self.indicator_hierarchy:
-            futures = [self.tpe.submit(m.update, self.now) for m in level]
+        self.scheduler.run(self.now)
 
-            for future in futures:
-                try:
-                    future.result()  # 获取结果，如果有异常会在这里抛出
-                except Exception as e:
-                    print(f"發生錯誤: {traceback.format_exc()}")
-
-    def _get_or_new_indicator(self, key, cls=None, params=None, level_idx=0):
-        # level 0 for 無依賴指標，有依賴則往後遞加
+    def _get_or_new_indicator(self, key, cls=None, params=None):
+        # 相依關係由 manager.dependencies() 宣告，scheduler 會排在其輸入之後 update
         if key in self.indicator_managers:
             return self.indicator_managers[key]
 
         elif params and cls:
             im = cls(*params)
+            if snapshot := self._pending_restore.pop(key, None):
+                im.restore(snapshot)
             im.update(self.now)
             self.indicator_managers[key] = im
-
-            not_enough = level_idx + 1 - len(self.indicator_hierarchy)
-            if not_enough > 0:
-                for _ in range(not_enough):
-                    self.indicator_hierarchy.append([])
-
-            self.indicator_hierarchy[level_idx].append(im)
+            self.scheduler.add(im, name='_'.join(str(k.value if isinstance(k, IndicatorType) else k) for k in key))
             return im
         else:
             return None
@@ -197,7 +228,7 @@ class IndicatorProvider:
     def bid_ask_diff(self):
         ba = self.rtm.latest_bidask()
 
-        return ba.bid_volume - ba.ask_volume
+        return ba.bid_volume[0] - ba.ask_volume[0]
 
     def bid_ask_ratio(self, length):
         key = (IndicatorType.BID_ASK_RATIO, length)
@@ -249,7 +280,7 @@ class IndicatorProvider:
                     net_buy_ratio_change_rate_length,
                     pma_manager
                 )
-                im = self._get_or_new_indicator(key, SDStopLossManager, params, level_idx=1)
+                im = self._get_or_new_indicator(key, SDStopLossManager, params)
 
         return im.get()
 
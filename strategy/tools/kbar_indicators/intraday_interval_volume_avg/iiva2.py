@@ -1,5 +1,4 @@
 from datetime import date, datetime, timedelta, time
-from functools import cache
 
 import numpy as np
 from psycopg import Connection
@@ -81,12 +80,11 @@ class IntradayIntervalVolumeAvg2:
 
 
     @staticmethod
-    @cache
     def _arr_from_npy(key):
+        # 由 npy_cache_manager 的 memory tier 快取 (有 byte 上限，取代原本無上限的 functools.cache)
         return npy_cache_manager.get(key)
 
     @staticmethod
-    @cache
     def _single_value_from_npy(key, index) -> dict[int, float]:
         val = IntradayIntervalVolumeAvg2._arr_from_npy(key)[index]  # 一天範圍的資料
         return val
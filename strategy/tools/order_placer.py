@@ -8,6 +8,7 @@ from shioaji.position import FuturePosition
 
 from strategy.strategies.data import StrategySuggestion
 from tools.backtracking.dummy_shioaji import DummyShioaji
+from tools.latency_tracer import latency_tracer
 from tools.ui_signal_emitter import ui_signal_emitter
 
 logger = logging.getLogger('Order Placer')
@@ -125,7 +126,9 @@ class OrderPlacer:
         order = self.get_default_order_data(qty, act)
         self._reset_counter(order.quantity)
 
-        return self.api.place_order(self.contract, order, cb=cb)
+        trade = self.api.place_order(self.contract, order, cb=cb)
+        latency_tracer.mark('place_order')
+        return trade
 
     def simple_buy(self, qty=1, cb=None):
         return self.place_order(qty, cb=cb)
@@ -0,0 +1,78 @@
+"""
+feature_matrix.build_matrix (train / valid 各一個矩陣) 與原本 f[mask] + np.hstack 的結果比對，並比較兩者的 heap 峰值 (tracemalloc)
+"""
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from backtesting.feature_builder.feature_builder import FeatureBuilder
+from backtesting.feature_builder.feature_matrix import build_matrix
+from data_manager.history.statics.tick.np_ticks import NPTicks
+from tools.time_utils import PG_EPOCH_OFFSET_S
+
+
+class ConstIIVA:
+    def get(self, ts):
+        return 1000.0
+
+
+def hstack_split(features, mask, valid_start, valid_end):
+    filtered_f = [v[mask] for v in features.values()]
+    X_valid = np.hstack([f[valid_start:valid_end].reshape(-1, 1) for f in filtered_f])
+    X_train = np.hstack([f[:valid_start].reshape(-1, 1) for f in filtered_f])
+    return X_train, X_valid
+
+
+def matrix_split(features, mask, valid_start, valid_end, dtype=np.float64):
+    rows = np.flatnonzero(mask)
+    return build_matrix(features, rows[:valid_start], dtype), build_matrix(features, rows[valid_start:valid_end], dtype)
+
+
+def peak_bytes(fn, *args):
+    tracemalloc.start()
+    result = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+rng = np.random.default_rng(0)
+n, k = 1_000_000, 12
+features = {f'f{j}': rng.standard_normal(n) for j in range(k)}
+features['flag'] = rng.random(n) > 0.5
+mask = rng.random(n) > 0.1
+n_valid = int(mask.sum())
+valid_start, valid_end = int(n_valid * 0.6), int(n_valid * 0.8)
+
+(ref_train, ref_valid), ref_peak = peak_bytes(hstack_split, features, mask, valid_start, valid_end)
+(train, valid), peak = peak_bytes(matrix_split, features, mask, valid_start, valid_end)
+assert np.array_equal(train, ref_train) and np.array_equal(valid, ref_valid)
+assert train.flags['F_CONTIGUOUS'] and valid.flags['F_CONTIGUOUS']  # lgb.Dataset 不需再複製
+
+(train32, valid32), peak32 = peak_bytes(matrix_split, features, mask, valid_start, valid_end, np.float32)
+assert train32.dtype == np.float32 and np.array_equal(train32, ref_train.astype(np.float32))
+
+print(f'peak heap: hstack {ref_peak / 2 ** 20:.0f} MB, matrix {peak / 2 ** 20:.0f} MB, '
+      f'matrix float32 {peak32 / 2 ** 20:.0f} MB')
+
+# FeatureBuilder.build_features(return_mtx=True) 與原本的 hstack 相同
+ts_s = datetime(2026, 3, 2, 8, 45).timestamp() + np.cumsum(rng.exponential(0.8, 20_000))
+close = 23000 + np.cumsum(rng.choice([-1.0, 0.0, 1.0], len(ts_s)))
+ticks = NPTicks(
+    ts=(ts_s - PG_EPOCH_OFFSET_S) * 10 ** 6,
+    close=close,
+    volume=rng.integers(1, 20, len(ts_s)).astype(np.int64),
+    tick_type=rng.integers(1, 3, len(ts_s)).astype(np.int32),
+    bid_price=close - 1,
+    ask_price=close,
+    bid_volume=rng.integers(0, 50, len(ts_s)).astype(np.int64),
+    ask_volume=rng.integers(0, 50, len(ts_s)).astype(np.int64),
+)
+iiva_lookups = {datetime.fromtimestamp(ts_s[0]).date(): ConstIIVA()}
+names = ['price', 'net_buy_ratio_m', 'sd', 'momentum_long', 'donchian_ha', 'is_op_30']
+data = FeatureBuilder(ticks, iiva_lookups).build_features(names)
+mtx = FeatureBuilder(ticks, iiva_lookups).build_features(names, return_mtx=True)
+assert mtx.flags['F_CONTIGUOUS']
+assert np.array_equal(mtx, np.hstack([data[k].reshape(-1, 1) for k in data]))
+print('feature matrix identical to hstack')
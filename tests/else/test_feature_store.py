@@ -0,0 +1,83 @@
+"""
+FeatureStore 逐日計算 (含前一天的 warmup) 與整段 FeatureBuilder 比對；第二次 build 應全部命中
+sd / ba_imb 為浮點累加，只比對到捨入誤差，其他需 bit-identical
+"""
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from backtesting.feature_builder.feature_builder import FeatureBuilder
+from backtesting.feature_builder.feature_store import FeatureStore, STORABLE_FEATURES, day_edges, warmup_seconds
+from data_manager.history.statics.tick.np_ticks import NPTicks
+from tools.time_utils import PG_EPOCH_OFFSET_S
+
+
+class ConstIIVA:
+    def get(self, ts):
+        return 1000.0
+
+
+def synthetic_day(dt: datetime, n=8_000, seed=0) -> NPTicks:
+    rng = np.random.default_rng(seed)
+    ts_s = dt.timestamp() + np.cumsum(rng.exponential(0.8, n) * (rng.random(n) > 0.2))
+    close = 23000 + np.cumsum(rng.choice([-1.0, 0.0, 1.0], n))
+    bid_price = close - rng.integers(0, 2, n)
+    return NPTicks(
+        ts=(ts_s - PG_EPOCH_OFFSET_S) * 10 ** 6,
+        close=close,
+        volume=rng.integers(1, 20, n).astype(np.int64),
+        tick_type=rng.integers(1, 3, n).astype(np.int32),
+        bid_price=bid_price,
+        ask_price=bid_price + 1,
+        bid_volume=rng.integers(0, 50, n).astype(np.int64),
+        ask_volume=rng.integers(0, 50, n).astype(np.int64),
+    )
+
+
+# 各段時間相連 (約 85 分鐘一段)，讓 warmup 落在前一段；日期標籤只用於 store 的 key
+starts = [datetime(2026, 3, 2, 8, 45) + timedelta(minutes=90 * i) for i in range(3)]
+days = [(starts[0] + timedelta(days=i)).date() for i in range(3)]
+slices = [synthetic_day(s, seed=i) for i, s in enumerate(starts)]
+ticks = NPTicks.merge_slices(slices)
+iiva_lookups = {datetime.fromtimestamp(t).date(): ConstIIVA() for t in ticks.ts_seconds()[::500]}
+names = [str(n) for n in STORABLE_FEATURES] + ['price', 'donchian_ha']
+
+
+
+def assert_match(got: dict, expected: dict):
+    for n in names:
+        if n in ('sd', 'ba_imb'):
+            assert np.allclose(got[n], expected[n], rtol=1e-9, atol=1e-9), n
+        else:
+            diff = np.flatnonzero(got[n] != expected[n])
+            assert len(diff) == 0, f'{n}: {len(diff)} rows differ, first at {diff[0]}'
+
+
+def build(store: FeatureStore, day_slices: list[NPTicks], day_labels) -> tuple[dict, dict]:
+    data = NPTicks.merge_slices(day_slices)
+    edges = day_edges(data.ts_seconds(), [s.ts_seconds()[-1] for s in day_slices])
+    assert list(np.diff(edges)) == [len(s) for s in day_slices]
+    got = FeatureBuilder(data, iiva_lookups).attach_store(store.bind('TMFR1', day_labels, edges)).build_features(names)
+    return got, FeatureBuilder(data, iiva_lookups).build_features(names)
+
+
+config = FeatureBuilder(ticks, iiva_lookups)._config
+
+with tempfile.TemporaryDirectory() as root:
+    store = FeatureStore(root)
+
+    # 先 build 較小的範圍：第一天 (days[1]) 沒有前一天的資料，冷啟動的值不能存入，
+    # 否則之後較大範圍的 build 會讀到它
+    assert_match(*build(store, slices[1:], days[1:]))
+
+    for run in range(2):
+        assert_match(*build(store, slices, days))
+
+    # 範圍第一天有回看窗口的特徵不存入
+    missing = set(store.cache.missing([store.key('TMFR1', dt, 0, n, config) for n in STORABLE_FEATURES for dt in days]))
+    assert missing == {
+        store.key('TMFR1', days[0], 0, n, config) for n in STORABLE_FEATURES if warmup_seconds(n, config) > 0
+    }
+
+print(f'{len(names)} features x {len(ticks)} ticks over {len(days)} days match')
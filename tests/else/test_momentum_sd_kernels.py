@@ -0,0 +1,85 @@
+"""
+momentum / sd 雙指標 numba kernel 與原本逐筆 np.searchsorted 版本比對 (需 bit-identical)，
+多窗口版本與逐窗口呼叫比對
+"""
+import time
+
+import numpy as np
+
+from backtesting.feature_builder._feature_calculators.momentum import momentum, momentum_multi
+from backtesting.feature_builder._feature_calculators.sd import sd, sd_multi
+
+
+def momentum_ref(n, window_seconds, times, closes):
+    result = np.full(n, 0.0, dtype=np.float64)
+
+    for i in range(n):
+        hi = times[i]
+        lo = hi - window_seconds
+        left = int(np.searchsorted(times, lo, side='right'))
+
+        if left < i:
+            past_price = closes[left]
+            if past_price > 0:
+                result[i] = (closes[i] - past_price) / past_price
+            else:
+                result[i] = 0.0
+
+    return result
+
+
+def sd_ref(n, window_seconds, times, closes):
+    result = np.full(n, 0.0, dtype=np.float64)
+
+    cum_c = np.zeros(n + 1, dtype=np.float64)
+    cum_c2 = np.zeros(n + 1, dtype=np.float64)
+    np.cumsum(closes, out=cum_c[1:])
+    np.cumsum(closes ** 2, out=cum_c2[1:])
+
+    for i in range(n):
+        lo = times[i] - window_seconds
+        left = int(np.searchsorted(times, lo, side='right'))
+        right = i + 1
+        n = right - left
+        if n <= 1:
+            result[i] = 0.0
+            continue
+
+        mean = (cum_c[right] - cum_c[left]) / n
+        mean2 = (cum_c2[right] - cum_c2[left]) / n
+        var = mean2 - mean * mean
+        result[i] = np.sqrt(var) if var > 0 else 0.0
+
+    return result
+
+
+rng = np.random.default_rng(0)
+n = 50_000
+times = 1.7e9 + np.cumsum(rng.exponential(0.8, n) * (rng.random(n) > 0.2))  # 含同秒多筆、間隔不固定
+times[20_000:] += 3600  # 盤間空檔
+closes = 23000 + np.cumsum(rng.choice([-1.0, 0.0, 1.0], n))
+closes[100:110] = 0.0  # past_price <= 0 的分支
+
+windows = [1.0, 5.0, 60.0, 300.0, 900.0, 2700.0]
+
+for w in windows:
+    for name, fast, ref in (('momentum', momentum, momentum_ref), ('sd', sd, sd_ref)):
+        st = time.time()
+        expected = ref(n, w, times, closes)
+        ref_s = time.time() - st
+
+        st = time.time()
+        got = fast(n, w, times, closes)
+        fast_s = time.time() - st
+
+        assert np.array_equal(got, expected), f'{name} window={w}: {np.flatnonzero(got != expected)[:10]}'
+        print(f'{name:<8} window={w:>6}: identical  ref {ref_s:.3f}s  kernel {fast_s:.3f}s')
+
+for name, multi, single in (('momentum', momentum_multi, momentum), ('sd', sd_multi, sd)):
+    got = multi(n, windows, times, closes)
+    assert got.shape == (len(windows), n)
+    for j, w in enumerate(windows):
+        assert np.array_equal(got[j], single(n, w, times, closes)), f'{name}_multi window={w}'
+    print(f'{name}_multi: identical for {len(windows)} windows')
+
+print('all passed.')
@@ -0,0 +1,74 @@
+"""
+多窗口 kernel (一次掃描 / prange) 與逐窗口呼叫比對 (需 bit-identical)
+"""
+import time
+from datetime import datetime
+
+import numpy as np
+
+from backtesting.feature_builder._feature_calculators.donchian import donchian, donchian_multi
+from backtesting.feature_builder._feature_calculators.momentum import momentum, momentum_multi
+from backtesting.feature_builder._feature_calculators.net_buy_ratio import net_buy_ratio, net_buy_ratio_multi
+from backtesting.feature_builder._feature_calculators.sd import sd, sd_multi
+from backtesting.feature_builder._feature_calculators.volume_ratio import volume_ratio, volume_ratio_multi
+
+
+class ConstIIVA:
+    def get(self, ts):
+        return 1000.0
+
+
+rng = np.random.default_rng(1)
+n = 200_000
+times = datetime(2026, 3, 2, 8, 45).timestamp() + np.cumsum(rng.exponential(0.3, n) * (rng.random(n) > 0.2))
+closes = 23000 + np.cumsum(rng.choice([-1.0, 0.0, 1.0], n))
+volumes = rng.integers(1, 20, n).astype(np.int64)
+tick_types = rng.integers(0, 3, n).astype(np.int32)
+iiva_lookups = {
+    datetime.fromtimestamp(t).date(): ConstIIVA()
+    for t in (times[0], times[-1])
+}
+
+windows = [5.0, 60.0, 300.0, 600.0, 1800.0, 2700.0]
+
+cases = {
+    'net_buy_ratio': (
+        lambda w: net_buy_ratio(times, tick_types, volumes, w),
+        lambda ws, p: net_buy_ratio_multi(times, tick_types, volumes, ws, parallel=p),
+    ),
+    'momentum': (
+        lambda w: momentum(n, w, times, closes),
+        lambda ws, p: momentum_multi(n, ws, times, closes, parallel=p),
+    ),
+    'sd': (
+        lambda w: sd(n, w, times, closes),
+        lambda ws, p: sd_multi(n, ws, times, closes, parallel=p),
+    ),
+    'volume_ratio': (
+        lambda w: volume_ratio(n, w, times, volumes, iiva_lookups),
+        lambda ws, p: volume_ratio_multi(n, ws, times, volumes, iiva_lookups, parallel=p),
+    ),
+    'donchian': (
+        lambda w: np.stack(donchian(n, w, closes, times)),
+        lambda ws, p: np.stack(donchian_multi(n, ws, closes, times, parallel=p), axis=1),
+    ),
+}
+
+for name, (single, multi) in cases.items():
+    single(windows[0]), multi(windows, False), multi(windows, True)  # jit 編譯
+
+    st = time.time()
+    expected = [single(w) for w in windows]
+    single_s = time.time() - st
+
+    for parallel in (False, True):
+        st = time.time()
+        got = multi(windows, parallel)
+        multi_s = time.time() - st
+
+        assert len(got) == len(windows)
+        for j, w in enumerate(windows):
+            assert np.array_equal(got[j], expected[j]), f'{name} parallel={parallel} window={w}'
+        print(f'{name:<14} parallel={parallel!s:<5}: identical  per-window {single_s:.3f}s  multi {multi_s:.3f}s')
+
+print('all passed.')
@@ -0,0 +1,88 @@
+"""
+build_features_parallel (依交易日 / 盤別分段，process pool) 與整段 FeatureBuilder 比對
+sd / ba_imb 為浮點累加，只比對到捨入誤差，其他需 bit-identical
+"""
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from backtesting.feature_builder._feature_config import FeatureConfig
+from backtesting.feature_builder.feature_builder import FeatureBuilder
+from backtesting.feature_builder.feature_store import STORABLE_FEATURES
+from backtesting.feature_builder.parallel_feature_build import build_features_parallel, shard_edges
+from data_manager.history.statics.tick.np_ticks import NPTicks
+from tools.time_utils import PG_EPOCH_OFFSET_S, SJ_OFFSET_S
+
+
+class ConstIIVA:
+    def get(self, ts):
+        return 1000.0
+
+
+def synthetic_session(open_s: float, close_s: float, rng) -> np.ndarray:
+    n = int((close_s - open_s) / 0.6)  # 平均間隔 0.7 秒，多產生的部分截掉
+    ts_s = open_s + np.cumsum(rng.exponential(0.875, n) * (rng.random(n) > 0.2))
+    return ts_s[ts_s < close_s]
+
+
+def synthetic_ticks(n_days=3, seed=0) -> NPTicks:
+    rng = np.random.default_rng(seed)
+    base = datetime(2026, 3, 2).timestamp() - SJ_OFFSET_S  # 台北時間 00:00
+    hours = 3600
+    ts_s = np.concatenate([
+        part
+        for d in range(n_days)
+        for part in (
+            synthetic_session(base + d * 86400 + 8.75 * hours, base + d * 86400 + 13.75 * hours, rng),
+            synthetic_session(base + d * 86400 + 15 * hours, base + d * 86400 + 29 * hours, rng),
+        )
+    ])
+    n = len(ts_s)
+    close = 23000 + np.cumsum(rng.choice([-1.0, 0.0, 1.0], n))
+    bid_price = close - rng.integers(0, 2, n)
+    return NPTicks(
+        ts=(ts_s - PG_EPOCH_OFFSET_S) * 10 ** 6,
+        close=close,
+        volume=rng.integers(1, 20, n).astype(np.int64),
+        tick_type=rng.integers(1, 3, n).astype(np.int32),
+        bid_price=bid_price,
+        ask_price=bid_price + 1,
+        bid_volume=rng.integers(0, 50, n).astype(np.int64),
+        ask_volume=rng.integers(0, 50, n).astype(np.int64),
+    )
+
+
+if __name__ == '__main__':
+    ticks = synthetic_ticks()
+    times = ticks.ts_seconds()
+    iiva_lookups = {datetime.fromtimestamp(t).date(): ConstIIVA() for t in times[::500]}
+    names = [str(n) for n in STORABLE_FEATURES] + ['price', 'donchian_ha']
+    # 盤與盤之間最短隔 75 分鐘，拉長部分窗口讓 warmup 跨到前一段
+    config = FeatureConfig(momentum_window_long=timedelta(hours=2), net_buy_window_l=timedelta(hours=4))
+
+    st = time.time()
+    expected = FeatureBuilder(ticks, iiva_lookups, config).build_features(names, return_mtx=True)
+    print(f'serial: {time.time() - st:.2f}s, {len(ticks)} ticks')
+
+    for by, n_shards in (('day', 4), ('session', 6)):
+        assert len(shard_edges(times, by)) - 1 == n_shards, by
+
+        st = time.time()
+        got = build_features_parallel(FeatureBuilder(ticks, iiva_lookups, config), names, by=by, workers=2, return_mtx=True)
+        print(f'{by}: {time.time() - st:.2f}s')
+
+        for j, n in enumerate(names):
+            if n in ('sd', 'ba_imb'):
+                assert np.allclose(got[:, j], expected[:, j], rtol=1e-9, atol=1e-9), n
+            else:
+                diff = np.flatnonzero(got[:, j] != expected[:, j])
+                assert len(diff) == 0, f'{by} {n}: {len(diff)} rows differ, first at {diff[0]}'
+
+    # warmup 不足時跨段的窗口特徵會不同
+    got = build_features_parallel(
+        FeatureBuilder(ticks, iiva_lookups, config), ['momentum_long'], warmup=timedelta(0), workers=2, return_mtx=True
+    )
+    assert not np.array_equal(got[:, 0], expected[:, names.index('momentum_long')])
+
+    print(f'{len(names)} features identical for day / session shards')
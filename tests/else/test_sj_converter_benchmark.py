@@ -0,0 +1,69 @@
+"""
+MarketDataBase.sj_converter 與 from_sj 逐欄位建立的比較
+
+    TickFOP   : 約 3.6x (SJ_FIELDS)
+    BidAskFOP : 約 1.1x ~ 1.8x，依機器而定；from_sj 只做 getattr、保留 Decimal，
+                converter 省下 __init__ 但要多做五檔價格 list 逐一 float() 的轉換，抵掉大部分的差距
+"""
+import timeit
+from dataclasses import fields
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from data.unified.bid_ask.bid_ask_fop import BidAskFOP
+from data.unified.tick.tick_fop import TickFOP
+
+
+def from_sj_generic(cls, sj_data):
+    # MarketDataBase.from_sj 去掉型別檢查 (SimpleNamespace 過不了檢查)
+    return cls(**{f.name: getattr(sj_data, f.name) for f in fields(cls)})
+
+
+def fake_sj(cls, **values):
+    data = {f.name: f.default for f in fields(cls)}
+    data.update(values)
+    return SimpleNamespace(**data)
+
+
+sj_tick = fake_sj(
+    TickFOP,
+    code='TMFR1',
+    datetime=datetime.now(),
+    close=Decimal('23001'),
+    volume=2,
+    total_volume=12345,
+    tick_type=1,
+    bid_side_total_vol=6000,
+    ask_side_total_vol=6345,
+    underlying_price=Decimal('23010.55'),
+)
+sj_bidask = fake_sj(
+    BidAskFOP,
+    code='TMFR1',
+    datetime=datetime.now(),
+    bid_price=[Decimal(23000 - i) for i in range(5)],
+    bid_volume=[3, 5, 8, 2, 1],
+    ask_price=[Decimal(23001 + i) for i in range(5)],
+    ask_volume=[4, 6, 1, 9, 2],
+    bid_total_vol=20,
+    ask_total_vol=22,
+)
+
+n = 200_000
+repeat = 5
+for cls, sj_data in ((TickFOP, sj_tick), (BidAskFOP, sj_bidask)):
+    fast = cls.sj_converter()
+    fast_all = cls.sj_converter([f.name for f in fields(cls)])
+
+    # 取多次中最快的一次，單次量測的倍數浮動很大
+    t_generic = min(timeit.repeat(lambda: from_sj_generic(cls, sj_data), number=n, repeat=repeat))
+    t_fast = min(timeit.repeat(lambda: fast(sj_data), number=n, repeat=repeat))
+    t_fast_all = min(timeit.repeat(lambda: fast_all(sj_data), number=n, repeat=repeat))
+
+    print(
+        f'{cls.__name__:<10} '
+        f'generic: {t_generic / n * 1e6:.2f} us | '
+        f'converter(SJ_FIELDS): {t_fast / n * 1e6:.2f} us ({t_generic / t_fast:.1f}x) | '
+        f'converter(all): {t_fast_all / n * 1e6:.2f} us ({t_generic / t_fast_all:.1f}x)'
+    )
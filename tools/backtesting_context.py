@@ -14,7 +14,7 @@ class BacktestingContext:
         self.app = App()
         self.contract = self.app.api.Contracts.Futures.TMF.TMFR1  # todo: 不知道怎麼做成讓使用者輸入，暫時寫死
         self.htm = self.app.history_tick_manager
-        self.npy_htm = NpyCachedHistoryTickManager(self.app.api)
+        self.npy_htm = NpyCachedHistoryTickManager(self.app.api, mmap_mode='r')  # 之後一律 merge_slices，不需要可寫
         self.kbm = KBarManager2(self.app.api) # 暫時沒用到
         self.iiva = IntradayIntervalVolumeAvg2(self.app.api)
 
@@ -5,6 +5,7 @@ from typing_extensions import override
 
 from data.unified.tick.tick_fop import TickFOP
 from data_manager.history.history_tick_manager import HistoryTickManager
+from data_manager.rtm.extensions.columnar_ring_buffer import BidAskRingBuffer, TickRingBuffer
 from data_manager.rtm.rtm_base import RealtimeTickManagerBase
 from data_manager.rtm.extensions.backtracking_time_getter import BacktrackingTimeGetter
 from tools.utils import get_now
@@ -44,6 +45,10 @@ class DummyRealtimeTickManager(RealtimeTickManagerBase):
     def start(self, *args, **kwargs):
         h_ticks = self.htm.get_data(contract=self.contract, start=self.simu_date, time_ranges=self.simu_ranges)
 
+        # 回測資料一次載入，直接配置足夠的容量避免反覆擴張
+        self.tick_buffer = TickRingBuffer(capacity=max(len(h_ticks), 1))
+        self.bid_ask_buffer = BidAskRingBuffer(capacity=max(len(h_ticks), 1))
+
         for t in h_ticks:
             tick, bidask = t.to_tick_bidask_v1d1()
             self.tick_buffer.append(tick)
@@ -0,0 +1,210 @@
+"""
+Latency tracer — live pipeline 每個階段的延遲統計
+
+stages (依序):
+    callback     交易所時間 → shioaji callback 收到
+    append       callback 收到 → consumer 寫入 tick buffer
+    indicator    寫入 buffer → IndicatorProvider.update 完成
+    in_signal    → strategy.in_signal 判斷完成
+    out_signal   → strategy.out_signal 判斷完成
+    place_order  → OrderPlacer.place_order 送出
+
+每個 stage 記錄兩個 histogram:
+    stage 本身的耗時 (與上一個 mark 的差)、以及從交易所時間起算的累計延遲 (e2e)。
+
+thread model:
+    callback / append 由 rtm consumer thread 記錄，其餘由 strategy thread 記錄，
+    同一個 histogram 只會有一個 writer。
+    定期 dump 由背景 thread (start / stop) 執行，mark 只做 record，不在量測的路徑上寫檔。
+    dump 不重置 histogram (會與 consumer thread 的寫入互相干擾)，而是整組換成新的，
+    writer 每次記錄前取一次目前的那組，dump 再讀換下來的舊的
+    (替換當下正在記錄的那一筆可能落在舊的一組而不計入，每個 writer 最多一筆)。
+
+log 預設寫入 tools/logger/logs/latency.log (LATENCY_LOG_PATH 可改)，與 cwd 無關。
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from tools.constants import DEFAULT_TIMEZONE
+from tools.logger.custom_logger import LOG_DIR
+
+
+class LatencyHistogram:
+    """
+    HDR histogram 的簡化版: log-linear bucket，
+    每個 2 的次方區間再切成 2^(sub_bits-1) 格，相對誤差 < 2^-(sub_bits-1)。
+    record 為 O(1)，不需保存原始資料。
+    """
+
+    def __init__(self, sub_bits=7, max_bits=40):
+        self.sub_bits = sub_bits
+        self.half = 1 << (sub_bits - 1)
+        self.max_value = (1 << max_bits) - 1  # ns, 約 18 分鐘
+        self.counts = np.zeros((max_bits - sub_bits + 2) * self.half, dtype=np.int64)
+        self.count = 0
+        self.max = 0
+        self.total = 0
+
+    def _index(self, v: int) -> int:
+        e = v.bit_length() - self.sub_bits
+        if e <= 0:
+            return v
+        return (e + 1) * self.half + (v >> e) - self.half
+
+    def _value_at(self, idx: int) -> int:
+        """bucket 的上界 (HDR 慣例，percentile 不會低估)"""
+        if idx < 2 * self.half:
+            return idx
+        e = idx // self.half - 1
+        sub = idx % self.half + self.half
+        return ((sub + 1) << e) - 1
+
+    def record(self, v: int):
+        if v < 0:
+            v = 0
+        elif v > self.max_value:
+            v = self.max_value
+        self.counts[self._index(v)] += 1
+        self.count += 1
+        self.total += v
+        if v > self.max:
+            self.max = v
+
+    def percentile(self, p: float) -> int:
+        if self.count == 0:
+            return 0
+        target = max(int(np.ceil(self.count * p / 100)), 1)
+        idx = int(np.searchsorted(np.cumsum(self.counts), target, side='left'))
+        return min(self._value_at(idx), self.max)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    def reset(self):
+        self.counts[:] = 0
+        self.count = 0
+        self.max = 0
+        self.total = 0
+
+
+class LatencyTracer:
+    STAGES = ('callback', 'append', 'indicator', 'in_signal', 'out_signal', 'place_order')
+
+    def __init__(self, dump_path=None, dump_interval_s=60, enabled=True):
+        self.enabled = enabled
+        self.dump_path = Path(dump_path or os.getenv('LATENCY_LOG_PATH') or LOG_DIR / 'latency.log')
+        self.dump_interval_s = dump_interval_s
+        # (stage_hist, e2e_hist)，dump 時整組替換 (tuple 的 attribute 賦值是 atomic 的)
+        self._hists = self._new_hists()
+
+        self._latest: tuple[int, int] | None = None  # 最新一筆 tick 的 (exchange_ns, append_ns)
+        self._exchange_ns = None  # strategy thread 目前追蹤中的 tick
+        self._last_mark_ns = None
+        self._dump_lock = threading.Lock()
+        self._dump_thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+
+    def _new_hists(self) -> tuple[dict[str, LatencyHistogram], dict[str, LatencyHistogram]]:
+        return {s: LatencyHistogram() for s in self.STAGES}, {s: LatencyHistogram() for s in self.STAGES}
+
+    @property
+    def stage_hist(self) -> dict[str, LatencyHistogram]:
+        return self._hists[0]
+
+    @property
+    def e2e_hist(self) -> dict[str, LatencyHistogram]:
+        return self._hists[1]
+
+    # ── rtm consumer thread ────────────────────────────────────────────────
+
+    def on_tick_appended(self, exchange_ns: int, recv_ns: int, append_ns: int):
+        if not self.enabled:
+            return
+        stage_hist, e2e_hist = self._hists
+        stage_hist['callback'].record(recv_ns - exchange_ns)
+        e2e_hist['callback'].record(recv_ns - exchange_ns)
+        stage_hist['append'].record(append_ns - recv_ns)
+        e2e_hist['append'].record(append_ns - exchange_ns)
+        self._latest = (exchange_ns, append_ns)
+
+    # ── strategy thread ────────────────────────────────────────────────────
+
+    def begin(self):
+        """strategy thread 取得新 tick 時呼叫，之後的 mark 都以這筆 tick 為準"""
+        latest = self._latest
+        if not self.enabled or latest is None:
+            self._exchange_ns = None
+            return
+        self._exchange_ns, self._last_mark_ns = latest
+
+    def mark(self, stage: str):
+        if self._exchange_ns is None:
+            return
+        now = time.time_ns()
+        stage_hist, e2e_hist = self._hists
+        stage_hist[stage].record(now - self._last_mark_ns)
+        e2e_hist[stage].record(now - self._exchange_ns)
+        self._last_mark_ns = now
+
+    # ── dump thread ────────────────────────────────────────────────────────
+
+    def start(self):
+        """每 dump_interval_s 秒在背景 thread dump 一次"""
+        if not self.enabled or self._dump_thread is not None:
+            return
+        self._stop_event.clear()
+        self._dump_thread = threading.Thread(target=self._dump_loop, name='latency-dump', daemon=True)
+        self._dump_thread.start()
+
+    def stop(self):
+        """停止背景 thread 並 dump 最後一段"""
+        thread, self._dump_thread = self._dump_thread, None
+        if thread is not None:
+            self._stop_event.set()
+            thread.join()
+        self.dump()
+
+    def _dump_loop(self):
+        while not self._stop_event.wait(self.dump_interval_s):
+            self.dump()
+
+    # ── report ─────────────────────────────────────────────────────────────
+
+    def summary(self, hists=None) -> str:
+        stage_hist, e2e_hist = hists or self._hists
+
+        def fmt(h: LatencyHistogram):
+            return (
+                f'p50={h.percentile(50) / 1e3:.0f} '
+                f'p99={h.percentile(99) / 1e3:.0f} '
+                f'max={h.max / 1e3:.0f}'
+            )
+
+        lines = []
+        for s in self.STAGES:
+            h = stage_hist[s]
+            if h.count == 0:
+                continue
+            lines.append(f'{s:<12} n={h.count:<8} stage(us): {fmt(h):<40} e2e(us): {fmt(e2e_hist[s])}')
+        return '\n'.join(lines)
+
+    def dump(self, now_ns: int = None):
+        """寫入目前統計，之後的記錄進新的一組 histogram，每個區間各自獨立"""
+        with self._dump_lock:
+            now_ns = now_ns or time.time_ns()
+            hists, self._hists = self._hists, self._new_hists()
+            summary = self.summary(hists)
+            if not summary:
+                return
+            ts = datetime.fromtimestamp(now_ns / 1e9, tz=DEFAULT_TIMEZONE)
+            self.dump_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.dump_path, 'a', encoding='utf-8') as f:
+                f.write(f'[{ts.isoformat()}]\n{summary}\n')
+
+
+latency_tracer = LatencyTracer()
@@ -1,8 +1,12 @@
 import logging
 import threading
+from pathlib import Path
 
 from tools.logger._custom_logging_formatter import CustomFormatter
 
+# 寫檔的 log (例如 latency.log) 統一放這裡
+LOG_DIR = Path(__file__).resolve().parent / 'logs'
+
 
 class CustomLogger:
     _instance_lock = threading.Lock()
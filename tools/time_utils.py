@@ -1,4 +1,6 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+from tools.constants import DEFAULT_TIMEZONE
 
 SJ_OFFSET_S = 28_800
 SJ_OFFSET_US = SJ_OFFSET_S * 1_000_000
@@ -42,3 +44,24 @@ def datetime_to_pg_us(dt: datetime):
     ts -= PG_EPOCH_OFFSET_S
     ts *= 10 ** 6
     return ts
+
+
+_UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def datetime_to_epoch_ns(dt: datetime):
+    """
+    轉為 unix epoch ns (int)，不經過 float 以免失去微秒精度\n
+    naive datetime 視為台灣時間
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=DEFAULT_TIMEZONE)
+    return timedelta_to_ns(dt - _UNIX_EPOCH)
+
+
+def timedelta_to_ns(td: timedelta):
+    return (td.days * 86_400 + td.seconds) * 1_000_000_000 + td.microseconds * 1_000
+
+
+def epoch_ns_to_datetime(ns: int, tz=DEFAULT_TIMEZONE):
+    return (_UNIX_EPOCH + timedelta(microseconds=int(ns) // 1_000)).astimezone(tz)